@@ -1,12 +1,15 @@
-from flask import Flask, render_template, request, redirect, url_for, session, flash, send_from_directory, make_response
+from flask import Flask, render_template, request, redirect, url_for, session, flash, send_from_directory, make_response, jsonify
 import json
 import os
 import csv
+import time
 from datetime import datetime, timedelta
 from functools import wraps
 import io
 from dotenv import load_dotenv
-from database import DatabaseManager, get_db, init_db
+from werkzeug.local import LocalProxy
+from database import DatabaseManager, SERVER_PATIENT_FIELDS, get_db, init_db
+from bootstrap import seed_defaults
 from bson import ObjectId
 
 # Load environment variables
@@ -26,79 +29,8 @@ def convert_to_json_serializable(obj):
 app = Flask(__name__)
 app.secret_key = os.getenv('SECRET_KEY', 'your-secret-key-change-this-in-production')
 
-# Initialize MongoDB connection
-db_manager = get_db()
-init_db(app)
-
-# Initialize MongoDB and ensure default data
-def ensure_mongodb_data():
-    """Ensure MongoDB has default data"""
-    print("🔍 Initializing MongoDB database...")
-    
-    if not db_manager.is_connected():
-        print("❌ MongoDB not connected. Using fallback data.")
-        return False
-    
-    # Check if we have any hospitals configured
-    hospitals = db_manager.get_all_hospitals_config()
-    if not hospitals:
-        print("📋 Creating default hospitals in MongoDB...")
-        # Default hospitals data
-        default_hospitals = [
-            {'hospital_id': 'hospital1', 'name': 'City General Hospital', 'description': 'Emergency & Trauma Center'},
-            {'hospital_id': 'hospital2', 'name': 'Central Medical Center', 'description': 'Comprehensive Healthcare Services'},
-            {'hospital_id': 'hospital3', 'name': 'Specialized Cardiac Care', 'description': 'Heart & Cardiovascular Treatment'},
-            {'hospital_id': 'hospital4', 'name': 'Women\'s Health Clinic', 'description': 'Gynecology & Maternity Care'},
-            {'hospital_id': 'hospital5', 'name': 'Pediatric Medical Center', 'description': 'Children\'s Healthcare & Family Medicine'}
-        ]
-        
-        for hospital in default_hospitals:
-            db_manager.add_hospital_config(hospital)
-        print(f"✅ Created {len(default_hospitals)} default hospitals in MongoDB")
-    
-    # Check if we have any users configured
-    doctors = db_manager.get_all_users('doctor')
-    if not doctors:
-        print("👩‍⚕️ Creating default doctors in MongoDB...")
-        # Default doctors
-        default_doctors = [
-            {'username': 'dr_smith', 'password': 'doctor123', 'display_name': 'Dr. Smith', 'department': 'General Medicine'},
-            {'username': 'dr_johnson', 'password': 'medical456', 'display_name': 'Dr. Johnson', 'department': 'Cardiology'},
-            {'username': 'dr_brown', 'password': 'doctor789', 'display_name': 'Dr. Brown', 'department': 'MBBS,MD'},
-            {'username': 'dr_davis', 'password': 'doctor456', 'display_name': 'Dr. Davis', 'department': 'Gynecologist'}
-        ]
-        
-        for doctor in default_doctors:
-            db_manager.create_user(doctor['username'], doctor['password'], 'doctor', {
-                'display_name': doctor['display_name'],
-                'department': doctor['department'],
-                'status': 'active'
-            })
-        print(f"✅ Created {len(default_doctors)} default doctors in MongoDB")
-    
-    # Check if we have any admins configured
-    admins = db_manager.get_all_users('admin')
-    if not admins:
-        print("👨‍💼 Creating default admins in MongoDB...")
-        # Default admins
-        default_admins = [
-            {'username': 'admin', 'password': 'admin123', 'display_name': 'System Admin'},
-            {'username': 'superadmin', 'password': 'super456', 'display_name': 'Super Admin'},
-            {'username': 'hospital_admin', 'password': 'hospital789', 'display_name': 'Hospital Admin'}
-        ]
-        
-        for admin in default_admins:
-            db_manager.create_user(admin['username'], admin['password'], 'admin', {
-                'display_name': admin['display_name'],
-                'status': 'active'
-            })
-        print(f"✅ Created {len(default_admins)} default admins in MongoDB")
-    
-    print("✅ MongoDB initialization completed successfully")
-    return True
-
-# Initialize MongoDB data
-ensure_mongodb_data()
+# MongoDB connection, created on first use in each worker process (after any fork)
+db_manager = LocalProxy(get_db)
 
 # MongoDB Helper Functions
 def get_users_from_mongodb():
@@ -168,13 +100,44 @@ def get_hospitals_from_mongodb():
     hospitals = db_manager.get_all_hospitals_config()
     return [{'id': h.get('hospital_id'), 'name': h.get('name'), 'description': h.get('description')} for h in hospitals]
 
-def get_patients_from_mongodb(hospital_name=None):
-    """Get patients from MongoDB, optionally filtered by hospital"""
+def get_patients_from_mongodb(hospital_name=None, projection=None):
+    """Get patients from MongoDB, optionally filtered by hospital and projected to a profile"""
     if not db_manager.is_connected():
         print("❌ MongoDB not connected, returning empty patients list")
         return []
     
-    return db_manager.get_patients(hospital_name)
+    return db_manager.get_patients(hospital_name, projection=projection)
+
+# Keyset pagination defaults for patient list pages
+PATIENTS_PAGE_SIZE = 25
+MAX_PATIENTS_PAGE_SIZE = 100
+# Search results are ranked by relevance and paged with skip, so cap the depth
+MAX_SEARCH_PAGES = 20
+
+def get_patients_page_from_request(hospital_name=None, projection=None):
+    """Get the page of patients selected by the after/before/offset/limit/sort URL parameters"""
+    limit = request.args.get('limit', PATIENTS_PAGE_SIZE, type=int)
+    limit = min(max(limit, 1), MAX_PATIENTS_PAGE_SIZE)
+    sort = 'oldest' if request.args.get('sort') == 'oldest' else 'newest'
+    offset = max(request.args.get('offset', 0, type=int), 0)
+    
+    page = db_manager.get_patients_page(
+        hospital_name or None,
+        after=request.args.get('after'),
+        limit=limit,
+        sort='asc' if sort == 'oldest' else 'desc',
+        before=request.args.get('before'),
+        projection=projection
+    )
+    
+    page.update({
+        'limit': limit,
+        'sort': sort,
+        'offset': offset,
+        'next_offset': offset + len(page['patients']),
+        'prev_offset': max(offset - limit, 0)
+    })
+    return page
 
 def save_patient_to_mongodb(patient_data):
     """Save patient data to MongoDB"""
@@ -183,9 +146,10 @@ def save_patient_to_mongodb(patient_data):
             print("❌ MongoDB not connected")
             return {'success': False, 'error': 'MongoDB not connected'}
         
-        # Add timestamp and unique ID
-        patient_data['timestamp'] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        patient_data['created_at'] = datetime.now()
+        # Add timestamp (display string) and created_at (native datetime for range queries)
+        now = datetime.now()
+        patient_data['timestamp'] = now.strftime("%Y-%m-%d %H:%M:%S")
+        patient_data['created_at'] = now
         
         result = db_manager.save_patient(patient_data)
         if result:
@@ -196,14 +160,14 @@ def save_patient_to_mongodb(patient_data):
         print(f"❌ Error saving patient: {e}")
         return {'success': False, 'error': str(e)}
 
-def get_next_token_number(hospital_name):
-    """Get next token number for hospital using MongoDB"""
+def get_next_token_number(hospital_name, date_str=None):
+    """Reserve the next token number for hospital using the MongoDB token counter"""
     if not db_manager.is_connected():
-        print("❌ MongoDB not connected, using fallback token numbering")
-        # Fallback: use simple incremental numbering
-        return 1
+        # A made-up number would collide with the real counter (unique_hospital_day_token)
+        print("❌ MongoDB not connected, cannot assign a token number")
+        return None
     
-    current_date = datetime.now().strftime('%Y-%m-%d')
+    current_date = date_str or datetime.now().strftime('%Y-%m-%d')
     return db_manager.get_next_token_number(hospital_name, current_date)
 
 def authenticate_user_mongodb(username, password, role):
@@ -248,14 +212,10 @@ def get_hospital_stats_mongodb(selected_hospital=None):
             'selected_hospital': selected_hospital
         }
     
-    patients = db_manager.get_patients(selected_hospital)
-    
-    total_patients = len(patients)
-    today = datetime.now().strftime('%Y-%m-%d')
-    
-    # Count today's patients
-    today_patients = [p for p in patients if p.get('timestamp', '').startswith(today)]
-    patients_today = len(today_patients)
+    # Indexed counts on (selected_hospital, created_at) instead of loading every patient
+    today_start = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+    total_patients = db_manager.count_patients(selected_hospital)
+    patients_today = db_manager.count_patients(selected_hospital, start=today_start)
     
     # Get unique hospitals from patients
     if selected_hospital:
@@ -271,11 +231,6 @@ def get_hospital_stats_mongodb(selected_hospital=None):
         'selected_hospital': selected_hospital
     }
 
-# Get users (from MongoDB)
-print("🔍 Loading users at app startup...")
-USERS = get_users_from_mongodb()
-print(f"🔍 Loaded USERS: {sum(len(users) for users in USERS.values())} total users")
-
 @app.route('/favicon.ico')
 def favicon():
     """Serve favicon - fallback to SVG"""
@@ -427,20 +382,14 @@ def doctor_dashboard():
     
     # Get statistics for doctor's assigned hospital
     if assigned_hospital and assigned_hospital != 'No Hospital Assigned':
-        hospital_data = get_hospital_data(assigned_hospital)
         stats = get_hospital_stats_mongodb(assigned_hospital)
         
-        # Add additional statistics
-        total_patients = len(hospital_data)
-        today = datetime.now().strftime('%Y-%m-%d')
-        today_patients = len([p for p in hospital_data if p.get('timestamp', '').startswith(today)])
-        
-        # Recent patients (last 5)
-        recent_patients = hospital_data[-5:] if hospital_data else []
+        # Recent patients (last 5), newest first
+        recent_patients = db_manager.get_patients_by_date_range(assigned_hospital, limit=5)
         
         dashboard_stats = {
-            'total_patients': total_patients,
-            'patients_today': today_patients,
+            'total_patients': stats['total_patients'],
+            'patients_today': stats['patients_today'],
             'recent_patients': recent_patients,
             'hospital_name': assigned_hospital
         }
@@ -464,6 +413,43 @@ def logout():
     flash(f'Goodbye, {user_name}! You have been logged out.', 'info')
     return redirect(url_for('login_choice'))
 
+def prepare_patient_form_data(data, selected_hospital):
+    """Normalize a submitted patient form (age, phone, hospital, emergency contact)"""
+    # Process date of birth and calculate age
+    if 'dateOfBirth' in data and data['dateOfBirth']:
+        try:
+            dob = datetime.strptime(data['dateOfBirth'], '%Y-%m-%d')
+            today = datetime.now()
+            age = today.year - dob.year - ((today.month, today.day) < (dob.month, dob.day))
+            data['age'] = age
+            data['dateOfBirth'] = data['dateOfBirth']  # Keep the original date
+        except (ValueError, TypeError):
+            # If date parsing fails, use age if provided
+            if 'age' not in data:
+                data['age'] = 0
+    
+    # Combine country code and phone number
+    if 'countryCode' in data and 'phone' in data:
+        data['fullPhone'] = data['countryCode'] + data['phone']
+        data['phone'] = data['fullPhone']  # Update phone to include country code
+    
+    # Add hospital information
+    data['selected_hospital'] = selected_hospital
+    
+    # Combine emergency contact fields for compatibility with admin view
+    emergency_parts = []
+    if data.get('emergencyName'):
+        emergency_parts.append(data.get('emergencyName'))
+    if data.get('emergencyPhone'):
+        emergency_parts.append(data.get('emergencyPhone'))
+    if data.get('emergencyRelation'):
+        emergency_parts.append(f"({data.get('emergencyRelation')})")
+    
+    if emergency_parts:
+        data['emergency_contact'] = ' '.join(emergency_parts)
+    
+    return data
+
 @app.route('/patient/form', methods=['GET', 'POST'])
 def patient_form():
     # Set default patient session if not already set
@@ -478,48 +464,20 @@ def patient_form():
     
     if request.method == 'POST':
         # Get form data
-        data = request.form.to_dict()
-        
-        # Process date of birth and calculate age
-        if 'dateOfBirth' in data and data['dateOfBirth']:
-            try:
-                dob = datetime.strptime(data['dateOfBirth'], '%Y-%m-%d')
-                today = datetime.now()
-                age = today.year - dob.year - ((today.month, today.day) < (dob.month, dob.day))
-                data['age'] = age
-                data['dateOfBirth'] = data['dateOfBirth']  # Keep the original date
-            except ValueError:
-                # If date parsing fails, use age if provided
-                if 'age' not in data:
-                    data['age'] = 0
-        
-        # Combine country code and phone number
-        if 'countryCode' in data and 'phone' in data:
-            data['fullPhone'] = data['countryCode'] + data['phone']
-            data['phone'] = data['fullPhone']  # Update phone to include country code
-        
-        # Add hospital information
-        data['selected_hospital'] = session.get('selected_hospital', 'Unknown Hospital')
-        
-        # Combine emergency contact fields for compatibility with admin view
-        emergency_parts = []
-        if data.get('emergencyName'):
-            emergency_parts.append(data.get('emergencyName'))
-        if data.get('emergencyPhone'):
-            emergency_parts.append(data.get('emergencyPhone'))
-        if data.get('emergencyRelation'):
-            emergency_parts.append(f"({data.get('emergencyRelation')})")
-        
-        if emergency_parts:
-            data['emergency_contact'] = ' '.join(emergency_parts)
+        data = prepare_patient_form_data(request.form.to_dict(),
+                                         session.get('selected_hospital', 'Unknown Hospital'))
         
         # Add timestamp
         data['timestamp'] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
         
-        # Save to JSON file (optional)
-        save_form_data(data)
+        if save_form_data(data) is None:
+            flash('Registration could not be completed right now. Please try again in a moment.', 'error')
+            return render_template('ai_form.html',
+                                 selected_hospital=session.get('selected_hospital'),
+                                 user_role=session.get('user_role'),
+                                 today=datetime.now().strftime('%Y-%m-%d'))
         
-        return render_template('ai_success.html', data=data)
+        return render_template('ai_success.html', data=data, slot_capacity=db_manager.config.get('patients_per_slot'))
     
     # Pass today's date for date picker max value
     today = datetime.now().strftime('%Y-%m-%d')
@@ -588,8 +546,9 @@ def legacy_form():
         
         print(f"🔍 Final form data: {data}")
         
-        # Save to JSON file (optional)
-        save_form_data(data)
+        if save_form_data(data) is None:
+            flash('Registration could not be completed right now. Please try again in a moment.', 'error')
+            return render_template('form.html', today=datetime.now().strftime('%Y-%m-%d'))
         
         return render_template('success.html', data=data)
     
@@ -597,11 +556,11 @@ def legacy_form():
     today = datetime.now().strftime('%Y-%m-%d')
     return render_template('form.html', today=today)
 
-def get_hospital_data(hospital_name=None):
+def get_hospital_data(hospital_name=None, projection=None):
     """Get patient data for a specific hospital or all hospitals"""
     print(f"🔍 get_hospital_data called with hospital_name: {hospital_name}")
     
-    patients = get_patients_from_mongodb(hospital_name)
+    patients = get_patients_from_mongodb(hospital_name, projection)
     print(f"🔍 get_hospital_data returning {len(patients)} patients")
     
     return patients
@@ -609,13 +568,11 @@ def get_hospital_data(hospital_name=None):
 def get_all_hospital_files():
     """Get list of all hospitals with patient data"""
     hospitals = get_hospitals_from_mongodb()
-    all_patients = get_patients_from_mongodb()
     
-    # Count patients per hospital
+    # Count patients per hospital with a server-side $group
     hospital_patient_count = {}
-    for patient in all_patients:
-        hospital = patient.get('selected_hospital', 'Unknown')
-        hospital_patient_count[hospital] = hospital_patient_count.get(hospital, 0) + 1
+    for hospital in db_manager.get_hospitals_list():
+        hospital_patient_count[hospital['hospital_name'] or 'Unknown'] = hospital['patient_count']
     
     # Convert to the format expected by templates
     hospital_files = []
@@ -646,29 +603,24 @@ def get_hospital_data_by_filename(filename):
                 return []
     return []
 
+def format_slot_time(hour, minute):
+    """12-hour clock label for an hour of the day (24 wraps to midnight)"""
+    hour = hour % 24
+    suffix = 'PM' if hour >= 12 else 'AM'
+    return f"{hour % 12 or 12}:{minute:02d} {suffix}"
+
 def get_time_slots():
-    """Generate time slots from 7:30 AM to 8:30 PM (13 slots of 1 hour each)"""
+    """Generate one-hour time slots (13 from 7:30 AM unless system_config overrides the layout)"""
     slots = []
-    start_hour = 7
-    start_minute = 30
+    # Served from the in-memory config snapshot, no round trip; values are range-checked there
+    slot_count = db_manager.config.get('slot_count')
+    start_hour = db_manager.config.get('slot_start_hour')
+    start_minute = db_manager.config.get('slot_start_minute')
     
-    for i in range(13):  # 13 slots
+    for i in range(slot_count):
         current_hour = start_hour + i
-        if current_hour > 12:
-            slot_time = f"{current_hour - 12}:{start_minute:02d} PM"
-        elif current_hour == 12:
-            slot_time = f"12:{start_minute:02d} PM"
-        else:
-            slot_time = f"{current_hour}:{start_minute:02d} AM"
-        
-        # Next slot time
-        next_hour = current_hour + 1
-        if next_hour > 12:
-            next_slot_time = f"{next_hour - 12}:{start_minute:02d} PM"
-        elif next_hour == 12:
-            next_slot_time = f"12:{start_minute:02d} PM"
-        else:
-            next_slot_time = f"{next_hour}:{start_minute:02d} AM"
+        slot_time = format_slot_time(current_hour, start_minute)
+        next_slot_time = format_slot_time(current_hour + 1, start_minute)
         
         slots.append({
             'slot_number': i + 1,
@@ -683,19 +635,31 @@ def assign_token_and_slot(hospital_name):
     """Assign token number and time slot for a hospital"""
     print(f"🔍 DEBUG assign_token_and_slot: Called for hospital '{hospital_name}'")
     
-    # Get next token number for this hospital
-    token_number = get_next_token_number(hospital_name)
+    # Reserve next token number for this hospital (one atomic counter increment)
+    token_date = datetime.now().strftime('%Y-%m-%d')
+    token_number = get_next_token_number(hospital_name, token_date)
+    if token_number is None:
+        return None
     print(f"🔍 DEBUG assign_token_and_slot: Assigned token number {token_number} for '{hospital_name}'")
     
-    # Calculate slot (each slot accommodates 60 patients)
-    slot_index = ((token_number - 1) // 60) % 13  # 13 slots available, cycle through them
+    token_info = get_slot_for_token(token_number)
+    token_info['token_date'] = token_date
+    return token_info
+
+def get_slot_for_token(token_number):
+    """Work out the time slot and queue position for a token number"""
+    patients_per_slot = db_manager.config.get('patients_per_slot')
+    minutes_per_patient = db_manager.config.get('minutes_per_patient')
     
     # Get time slots
     time_slots = get_time_slots()
+    
+    # Calculate slot (each slot accommodates patients_per_slot patients), cycling through the slots
+    slot_index = ((token_number - 1) // patients_per_slot) % len(time_slots)
     assigned_slot = time_slots[slot_index]
     
-    # Calculate position in slot (1-60)
-    position_in_slot = ((token_number - 1) % 60) + 1
+    # Calculate position in slot (1-patients_per_slot)
+    position_in_slot = ((token_number - 1) % patients_per_slot) + 1
     
     return {
         'token_number': token_number,
@@ -704,7 +668,7 @@ def assign_token_and_slot(hospital_name):
         'start_time': assigned_slot['start_time'],
         'end_time': assigned_slot['end_time'],
         'position_in_slot': position_in_slot,
-        'estimated_wait_time': f"{(position_in_slot - 1) * 5} minutes"  # Assuming 5 min per patient
+        'estimated_wait_time': f"{(position_in_slot - 1) * minutes_per_patient} minutes"
     }
 
 def save_form_data(data):
@@ -717,6 +681,9 @@ def save_form_data(data):
     
     # Assign token and slot before saving
     token_info = assign_token_and_slot(selected_hospital)
+    if token_info is None:
+        print(f"❌ Could not assign a token for {selected_hospital}, patient not saved")
+        return None
     print(f"🔍 DEBUG save_form_data: Token info received: {token_info}")
     
     # Add token information to patient data
@@ -732,29 +699,122 @@ def save_form_data(data):
         print(f"❌ Failed to save to MongoDB: {result.get('error', 'Unknown error')}")
         return None
 
+# Upper bound on records accepted by one bulk ingestion request
+MAX_BULK_PATIENTS = 5000
+
+# Form fields that must be text; numbers sent in JSON are converted
+BULK_TEXT_FIELDS = ('firstName', 'lastName', 'dateOfBirth', 'gender', 'countryCode', 'phone', 'address',
+                    'symptoms', 'allergies', 'medications', 'medicalHistory', 'selected_hospital',
+                    'emergencyName', 'emergencyPhone', 'emergencyRelation')
+
+def normalize_bulk_record(record):
+    """Copy of a JSON patient record with text fields as strings; raises TypeError on other types
+    
+    ``_id`` and the fields the server stamps (SERVER_PATIENT_FIELDS) are dropped.
+    """
+    record = {key: value for key, value in record.items()
+              if key != '_id' and key not in SERVER_PATIENT_FIELDS}
+    for field in BULK_TEXT_FIELDS:
+        value = record.get(field)
+        if value is None or isinstance(value, str):
+            continue
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            record[field] = str(value)
+        else:
+            raise TypeError(f"{field} must be a string, not {type(value).__name__}")
+    return record
+
+@app.route('/api/patients/bulk', methods=['POST'])
+@require_login(['doctor', 'admin'])
+def bulk_patient_ingest():
+    """Register a batch of patient forms in one request (registration desk bursts)"""
+    payload = request.get_json(silent=True)
+    records = payload.get('patients') if isinstance(payload, dict) else payload
+    
+    if not isinstance(records, list) or not records:
+        return jsonify({'success': False, 'error': 'Expected a JSON list of patients'}), 400
+    if len(records) > MAX_BULK_PATIENTS:
+        return jsonify({'success': False, 'error': f'At most {MAX_BULK_PATIENTS} patients per request'}), 413
+    if not db_manager.is_connected():
+        return jsonify({'success': False, 'error': 'MongoDB not connected'}), 503
+    
+    # Doctors can only register patients for their assigned hospital
+    assigned_hospital = session.get('assigned_hospital') if session.get('user_role') == 'doctor' else None
+    
+    results = [None] * len(records)
+    valid_indices = []
+    valid_patients = []
+    for i, record in enumerate(records):
+        if not isinstance(record, dict) or not record.get('firstName'):
+            results[i] = {'index': i, 'success': False, 'error': 'Each patient needs at least a firstName'}
+            continue
+        
+        try:
+            record = normalize_bulk_record(record)
+        except TypeError as e:
+            results[i] = {'index': i, 'success': False, 'error': str(e)}
+            continue
+        
+        hospital_name = assigned_hospital or record.get('selected_hospital')
+        if not hospital_name:
+            results[i] = {'index': i, 'success': False, 'error': 'Missing selected_hospital'}
+            continue
+        
+        try:
+            patient = prepare_patient_form_data(record, hospital_name)
+        except (TypeError, ValueError) as e:
+            results[i] = {'index': i, 'success': False, 'error': f'Invalid patient data: {e}'}
+            continue
+        valid_indices.append(i)
+        valid_patients.append(patient)
+    
+    started = time.perf_counter()
+    saved = db_manager.save_patients_bulk(valid_patients, assign_slot=get_slot_for_token)
+    elapsed = time.perf_counter() - started
+    
+    for i, result in zip(valid_indices, saved):
+        result['index'] = i
+        results[i] = result
+    
+    inserted = sum(1 for r in results if r['success'])
+    
+    db_manager.log_admin_action({
+        'action': 'bulk_patient_ingest',
+        'admin': session.get('user_name', 'Unknown'),
+        'timestamp': datetime.now(),
+        'records_submitted': len(records),
+        'records_inserted': inserted
+    })
+    
+    print(f"📥 Bulk ingest: {inserted}/{len(records)} patients in {elapsed:.3f}s")
+    
+    return jsonify({
+        'success': inserted == len(records),
+        'inserted': inserted,
+        'failed': len(records) - inserted,
+        'elapsed_ms': round(elapsed * 1000, 2),
+        'patients_per_second': round(inserted / elapsed, 1) if elapsed > 0 else None,
+        'results': results
+    })
+
 @app.route('/view_submissions')
 @require_login(['doctor', 'admin'])
 def view_submissions():
     """View all form submissions (doctor and admin access)"""
     if session.get('user_role') == 'admin':
         # Admin sees all patients from all hospitals
-        data = get_hospital_data()
-        print(f"🔍 DEBUG view_submissions: Admin sees {len(data)} patients from all hospitals")
+        hospital_name = None
     else:
         # Doctor sees only patients from their assigned hospital
-        assigned_hospital = session.get('assigned_hospital')
-        if assigned_hospital:
-            print(f"🔍 DEBUG view_submissions: Doctor restricted to hospital: {assigned_hospital}")
-            data = get_hospital_data(assigned_hospital)
-            print(f"🔍 DEBUG view_submissions: Found {len(data)} patients for hospital: {assigned_hospital}")
-        else:
-            print(f"🔍 DEBUG view_submissions: Doctor has no assigned hospital, showing all patients")
-            # If doctor has no assigned hospital, show all patients (fallback)
-            data = get_hospital_data()
-            print(f"🔍 DEBUG view_submissions: Showing {len(data)} patients (no hospital filter)")
+        # (all patients if the doctor has no assigned hospital)
+        hospital_name = session.get('assigned_hospital')
     
-    print(f"🔍 DEBUG view_submissions: Final data count: {len(data)}")
-    return render_template('admin.html', submissions=data, session=session)
+    total_submissions = db_manager.count_patients(hospital_name)
+    page = get_patients_page_from_request(hospital_name)
+    data = page['patients']
+    
+    return render_template('admin.html', submissions=data, page=page,
+                           total_submissions=total_submissions, session=session)
 
 @app.route('/doctor/patients')
 @require_login(['doctor', 'admin'])
@@ -768,43 +828,17 @@ def patient_management():
         selected_hospital = session.get('assigned_hospital')
         print(f"🔍 DEBUG patient_management: Doctor restricted to hospital: {selected_hospital}")
     
-    if selected_hospital:
-        # Get data for specific hospital
-        data = get_hospital_data(selected_hospital)
-    else:
-        # Get data from all hospitals (admins only)
-        data = get_hospital_data()
-    
-    # DEBUG: Print what data we're getting
-    print(f"🔍 DEBUG patient_management: Found {len(data)} patients")
-    for i, patient in enumerate(data[:3]):
-        print(f"   - Patient {i+1}: {patient.get('firstName', 'Unknown')} at {patient.get('selected_hospital', 'Unknown')}")
-    
-    # Calculate statistics using MongoDB data
-    stats = get_hospital_stats_mongodb(selected_hospital)
-    
-    # Add additional statistics
-    total_patients = len(data)
-    this_month = datetime.now().strftime('%Y-%m')
-    this_month_count = len([d for d in data if d.get('timestamp', '').startswith(this_month)])
-    male_patients = len([d for d in data if d.get('gender', '').lower() == 'male'])
-    female_patients = len([d for d in data if d.get('gender', '').lower() == 'female'])
-    
-    # Calculate token statistics
-    patients_with_tokens = len([d for d in data if d.get('token_number')])
-    today = datetime.now().strftime('%Y-%m-%d')
-    today_tokens = len([d for d in data if d.get('timestamp', '').startswith(today) and d.get('token_number')])
-    
-    # Update stats
+    # All counters in one server-side $facet round trip
+    stats = db_manager.get_patient_management_stats(selected_hospital or None)
     stats.update({
-        'total_patients': total_patients,
-        'this_month': this_month_count,
-        'male_patients': male_patients,
-        'female_patients': female_patients,
-        'patients_with_tokens': patients_with_tokens,
-        'today_tokens': today_tokens
+        'total_hospitals': 1 if selected_hospital else len(db_manager.get_all_hospitals_config()),
+        'selected_hospital': selected_hospital
     })
     
+    # Only the current page of patients is loaded
+    page = get_patients_page_from_request(selected_hospital, projection='card')
+    data = page['patients']
+    
     # Get list of hospitals for filter dropdown
     hospital_files = get_all_hospital_files()
     
@@ -812,11 +846,62 @@ def patient_management():
     
     return render_template('patient_management.html', 
                          patients=data, 
+                         page=page,
                          stats=stats, 
                          hospital_files=hospital_files,
                          selected_hospital=selected_hospital,
                          session=session)
 
+@app.route('/doctor/patients/search')
+@require_login(['doctor', 'admin'])
+def patient_search():
+    """Full-text patient search, best match first, scoped like patient_management"""
+    search_query = request.args.get('q', '').strip()
+    selected_hospital = request.args.get('hospital', '')
+    
+    # Doctors only ever search their assigned hospital
+    if session.get('user_role') == 'doctor':
+        selected_hospital = session.get('assigned_hospital')
+        if not selected_hospital:
+            flash('Error: No hospital assigned to your account.', 'error')
+            return redirect(url_for('doctor_dashboard'))
+    
+    if not search_query:
+        return redirect(url_for('patient_management', hospital=selected_hospital or None))
+    
+    limit = request.args.get('limit', PATIENTS_PAGE_SIZE, type=int)
+    limit = min(max(limit, 1), MAX_PATIENTS_PAGE_SIZE)
+    number = min(max(request.args.get('page', 1, type=int), 1), MAX_SEARCH_PAGES)
+    offset = (number - 1) * limit
+    
+    page = db_manager.search_patients(search_query, selected_hospital or None, limit=limit,
+                                      skip=offset, projection='card')
+    if page['error']:
+        flash('Patient search is unavailable right now. Please try again later or browse the patient list.', 'error')
+    page.update({
+        'query': search_query,
+        'number': number,
+        'limit': limit,
+        'offset': offset,
+        'next_offset': offset + len(page['patients']),
+        'has_next': page['has_next'] and number < MAX_SEARCH_PAGES
+    })
+    
+    stats = db_manager.get_patient_management_stats(selected_hospital or None)
+    stats.update({
+        'total_hospitals': 1 if selected_hospital else len(db_manager.get_all_hospitals_config()),
+        'selected_hospital': selected_hospital
+    })
+    
+    return render_template('patient_management.html',
+                         patients=page['patients'],
+                         page=page,
+                         stats=stats,
+                         hospital_files=get_all_hospital_files(),
+                         selected_hospital=selected_hospital,
+                         search_query=search_query,
+                         session=session)
+
 # Add admin-specific route for patient management
 @app.route('/admin/patients')
 @require_login('admin')
@@ -836,48 +921,20 @@ def reports():
         selected_hospital = session.get('assigned_hospital')
         print(f"🔍 DEBUG reports: Doctor restricted to hospital: {selected_hospital}")
     
-    if selected_hospital:
-        # Get data for specific hospital
-        data = get_hospital_data(selected_hospital)
-    else:
-        # Get data from all hospitals (admins only)
-        data = get_hospital_data()
-    
-    # Generate basic statistics
-    total_patients = len(data)
-    recent_submissions = len([d for d in data if d.get('timestamp', '').startswith('2025-06')])
-    
-    # Count by gender
-    gender_stats = {}
-    for patient in data:
-        gender = patient.get('gender', 'unknown')
-        gender_stats[gender] = gender_stats.get(gender, 0) + 1
-    
-    # Count by age groups
-    age_groups = {'0-18': 0, '19-35': 0, '36-60': 0, '60+': 0}
-    for patient in data:
-        age = patient.get('age')
-        if age:
-            try:
-                age = int(age)
-                if age <= 18:
-                    age_groups['0-18'] += 1
-                elif age <= 35:
-                    age_groups['19-35'] += 1
-                elif age <= 60:
-                    age_groups['36-60'] += 1
-                else:
-                    age_groups['60+'] += 1
-            except ValueError:
-                pass
+    # Statistics from the daily_stats rollup, independent of patient volume
+    month_start = datetime.now().replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+    summary = db_manager.get_daily_stats_summary(selected_hospital or None, recent_since=month_start)
     
     stats = {
-        'total_patients': total_patients,
-        'recent_submissions': recent_submissions,
-        'gender_stats': gender_stats,
-        'age_groups': age_groups
+        'total_patients': summary['total_patients'],
+        'recent_submissions': summary['recent_patients'],
+        'gender_stats': summary['gender_stats'],
+        'age_groups': summary['age_groups']
     }
     
+    # Only the most recent patients are listed on the page
+    data = db_manager.get_patients(selected_hospital or None, limit=10)
+    
     # Get list of hospitals for filter dropdown
     hospital_files = get_all_hospital_files()
     
@@ -894,7 +951,7 @@ def settings():
     """System settings page for doctors"""
     return render_template('settings.html')
 
-@app.route('/doctor/patient/<int:patient_id>')
+@app.route('/doctor/patient/<patient_id>')
 @require_login(['doctor', 'admin'])
 def patient_detail(patient_id):
     """View detailed information for a specific patient (doctor and admin access)"""
@@ -906,16 +963,12 @@ def patient_detail(patient_id):
         selected_hospital = session.get('assigned_hospital')
         print(f"🔍 DEBUG patient_detail: Doctor restricted to hospital: {selected_hospital}")
     
-    if selected_hospital:
-        # Get data for specific hospital
-        data = get_hospital_data(selected_hospital)
-    else:
-        # Get data from all hospitals (admins only)
-        data = get_hospital_data()
+    # One indexed lookup by ObjectId; the hospital is part of the filter
+    patient = db_manager.get_patient_by_id(patient_id, selected_hospital or None)
     
-    if patient_id < len(data):
-        patient = data[patient_id]
-        return render_template('patient_detail.html', patient=patient, patient_id=patient_id, session=session)
+    if patient:
+        return render_template('patient_detail.html', patient=patient, patient_id=patient_id,
+                               slot_capacity=db_manager.config.get('patients_per_slot'), session=session)
     else:
         flash('Patient not found', 'error')
         return redirect(url_for('patient_management'))
@@ -923,9 +976,9 @@ def patient_detail(patient_id):
 @app.route('/admin/export/csv')
 @require_login('admin')
 def export_csv():
-    """Export patient data as CSV file (Admin only)"""
-    # Get data from MongoDB instead of JSON files
-    data = get_hospital_data()
+    """Export patient data as CSV file (Admin only), optionally for one hospital"""
+    selected_hospital = request.args.get('hospital', '')
+    data = get_hospital_data(selected_hospital or None, projection='export')
     
     if not data:
         flash('No patient data available to export.', 'warning')
@@ -962,7 +1015,7 @@ def export_csv():
 def export_filtered_csv():
     """Export filtered patient data as CSV file (Admin only)"""
     # Get data from MongoDB instead of JSON files
-    data = get_hospital_data()
+    data = get_hospital_data(projection='export')
     
     # Get filter parameters from URL
     gender_filter = request.args.get('gender', '').lower()
@@ -1030,9 +1083,6 @@ def export_filtered_csv():
 @require_login('admin')
 def admin_dashboard():
     """Admin dashboard with comprehensive system overview"""
-    # Get data from all hospitals
-    patient_data = get_hospital_data()
-    
     # Get user counts from MongoDB
     doctors_data = get_all_users_mongodb('doctor')
     admins_data = get_all_users_mongodb('admin')
@@ -1042,55 +1092,20 @@ def admin_dashboard():
     total_admins = len(admins_data)
     total_patients_users = len(patients_users_data)
     
-    # Calculate comprehensive statistics
-    total_patients = len(patient_data)
-    
-    # Recent activity (last 7 days)
-    from datetime import datetime, timedelta
-    seven_days_ago = (datetime.now() - timedelta(days=7)).strftime('%Y-%m-%d')
-    recent_patients = len([d for d in patient_data if d.get('timestamp', '') >= seven_days_ago])
+    # Patient statistics (last 7 days, gender, age buckets, per hospital) in one aggregation
+    seven_days_ago = (datetime.now() - timedelta(days=7)).replace(hour=0, minute=0, second=0, microsecond=0)
+    stats = db_manager.get_admin_dashboard_stats(recent_since=seven_days_ago)
     
-    # Gender distribution
-    male_patients = len([d for d in patient_data if d.get('gender', '').lower() == 'male'])
-    female_patients = len([d for d in patient_data if d.get('gender', '').lower() == 'female'])
-    
-    # Age distribution
-    age_groups = {'0-18': 0, '19-35': 0, '36-60': 0, '60+': 0}
-    for patient in patient_data:
-        age = patient.get('age')
-        if age:
-            try:
-                age = int(age)
-                if age <= 18:
-                    age_groups['0-18'] += 1
-                elif age <= 35:
-                    age_groups['19-35'] += 1
-                elif age <= 60:
-                    age_groups['36-60'] += 1
-                else:
-                    age_groups['60+'] += 1
-            except ValueError:
-                pass
-    
-    # Hospital-wise statistics
-    hospital_stats = {}
-    for patient in patient_data:
-        hospital = patient.get('selected_hospital', 'Unknown')
-        hospital_stats[hospital] = hospital_stats.get(hospital, 0) + 1
-    
-    stats = {
-        'total_patients': total_patients,
+    stats.update({
         'total_doctors': total_doctors,
         'total_admins': total_admins,
-        'total_patients_users': total_patients_users,
-        'recent_patients': recent_patients,
-        'male_patients': male_patients,
-        'female_patients': female_patients,
-        'age_groups': age_groups,
-        'hospital_stats': hospital_stats
-    }
+        'total_patients_users': total_patients_users
+    })
     
-    return render_template('admin_dashboard.html', stats=stats, patients=patient_data[:5])  # Show last 5 patients
+    # Show last 5 patients (indexed sort + limit)
+    recent_patient_list = db_manager.get_patients(limit=5)
+    
+    return render_template('admin_dashboard.html', stats=stats, patients=recent_patient_list)
 
 @app.route('/admin/doctors')
 @require_login('admin')
@@ -1172,7 +1187,49 @@ def system_settings():
         'uptime': 'N/A'  # In a real system, track server uptime
     }
     
-    return render_template('admin_system.html', system_info=system_info)
+    # Cached heartbeat state, so flapping connections are visible to admins
+    db_status = db_manager.get_connection_status()
+    audit_status = db_manager.get_audit_log_status()
+    login_status = db_manager.get_last_login_status()
+    query_stats = db_manager.get_query_stats()
+    index_build = db_manager.get_index_build_status()
+    pool_stats = db_manager.get_pool_stats()
+    cache_stats = db_manager.get_cache_stats()
+    purge_job = db_manager.get_purge_status()
+    
+    return render_template('admin_system.html', system_info=system_info, db_status=db_status,
+                           audit_status=audit_status, login_status=login_status,
+                           query_stats=query_stats, index_build=index_build, pool_stats=pool_stats,
+                           cache_stats=cache_stats, purge_job=purge_job)
+
+@app.route('/api/admin/query-stats')
+@require_login('admin')
+def query_stats_api():
+    """Per-method DatabaseManager timings and the most recent slow queries as JSON"""
+    limit = request.args.get('limit', 50, type=int)
+    
+    return jsonify({
+        'query_stats': db_manager.get_query_stats(),
+        'slow_queries': db_manager.get_slow_queries(limit=max(1, min(limit, 500)))
+    })
+
+@app.route('/api/admin/pool-stats')
+@require_login('admin')
+def pool_stats_api():
+    """MongoDB connection pool settings, checkout wait times and timeout counters as JSON"""
+    return jsonify(db_manager.get_pool_stats())
+
+@app.route('/api/admin/cache-stats')
+@require_login('admin')
+def cache_stats_api():
+    """Hit/miss counters and versions of the in-process caches as JSON"""
+    return jsonify(db_manager.get_cache_stats())
+
+@app.route('/api/admin/purge-status')
+@require_login('admin')
+def purge_status_api():
+    """Progress of the latest background patient purge as JSON"""
+    return jsonify(db_manager.get_purge_status())
 
 @app.route('/admin/reports')
 @require_login('admin')
@@ -1191,7 +1248,7 @@ def admin_reports():
     
     # Generate comprehensive statistics
     total_patients = len(data)
-    total_doctors = len(USERS['doctors'])
+    total_doctors = len(get_users_from_mongodb()['doctors'])
     
     # Monthly breakdown
     monthly_stats = {}
@@ -1228,7 +1285,7 @@ def doctor_export_basic():
     assigned_hospital = session.get('assigned_hospital')
     if assigned_hospital:
         print(f"🔍 DEBUG doctor_export: Doctor restricted to hospital: {assigned_hospital}")
-        data = get_hospital_data(assigned_hospital)
+        data = get_hospital_data(assigned_hospital, projection='export')
     else:
         print(f"🔍 DEBUG doctor_export: Doctor has no assigned hospital")
         data = []
@@ -1357,15 +1414,16 @@ def view_tokens():
     
     if selected_hospital:
         # Get data for specific hospital
-        data = get_hospital_data(selected_hospital)
+        data = get_hospital_data(selected_hospital, projection='token_board')
         hospital_name = selected_hospital
     else:
         # Get data from all hospitals for overview (admins only)
-        data = get_hospital_data()
+        data = get_hospital_data(projection='token_board')
         hospital_name = 'All Hospitals'
     
     # Get time slots for reference
     time_slots = get_time_slots()
+    slot_capacity = db_manager.config.get('patients_per_slot')
     
     # Organize data by slots
     slot_data = {}
@@ -1373,7 +1431,8 @@ def view_tokens():
         slot_data[slot['slot_number']] = {
             'time_range': slot['time_range'],
             'patients': [],
-            'total_patients': 0
+            'total_patients': 0,
+            'capacity': slot_capacity
         }
     
     # Group patients by slots
@@ -1393,56 +1452,44 @@ def view_tokens():
                          selected_hospital=selected_hospital,
                          hospital_name=hospital_name,
                          total_patients=len(data),
+                         minutes_per_patient=db_manager.config.get('minutes_per_patient'),
                          session=session)
 
 def get_doctors_by_hospital():
-    """Get doctors assigned to each hospital"""
+    """Get doctors assigned to each hospital (cached hospital -> doctors index)"""
     if not db_manager.is_connected():
         return {}
     
-    doctors_data = db_manager.get_all_users('doctor')
-    
-    doctors_by_hospital = {}
-    for doctor in doctors_data:
-        hospital = doctor.get('assigned_hospital')
-        doctor_name = doctor.get('display_name', doctor.get('username', '').replace('_', ' ').title())
-        department = doctor.get('department', 'General Medicine')
-        
-        if hospital:
-            if hospital not in doctors_by_hospital:
-                doctors_by_hospital[hospital] = []
-            doctors_by_hospital[hospital].append({
-                'name': doctor_name,
-                'department': department,
-                'id': doctor.get('username', doctor.get('_id'))
-            })
-    
-    return doctors_by_hospital
+    return db_manager.get_doctors_by_hospital()
 
 # System Management Routes
 @app.route('/admin/clear-data', methods=['POST'])
 @require_login('admin')
 def clear_system_data():
-    """Clear all system data (patients, form submissions)"""
+    """Start a background purge of all patient data (chunked, or drop + rebuild indexes)"""
     try:
         if not db_manager.is_connected():
             flash('MongoDB not connected. Cannot clear system data.', 'error')
             return redirect(url_for('system_settings'))
         
-        # Clear patients data from MongoDB
-        result = db_manager.clear_all_patients()
-        patients_cleared = result if isinstance(result, int) else 0
+        mode = 'drop' if request.form.get('mode') == 'drop' else 'chunked'
+        admin_name = session.get('user_name', 'Unknown')
+        job_id = db_manager.start_patient_purge(mode=mode, requested_by=admin_name)
+        if job_id is None:
+            flash('A patient data purge is already running.', 'warning')
+            return redirect(url_for('system_settings'))
         
         # Log the action
         db_manager.log_admin_action({
             'action': 'clear_system_data',
-            'admin': session.get('user_name', 'Unknown'),
+            'admin': admin_name,
             'timestamp': datetime.now(),
-            'records_cleared': patients_cleared
+            'mode': mode,
+            'job_id': job_id
         })
         
-        flash(f'System data cleared successfully! Removed {patients_cleared} patient records.', 'success')
-        print(f"🧹 SYSTEM: Data cleared by admin. {patients_cleared} records removed.")
+        flash('Patient data purge started. Progress is shown below.', 'success')
+        print(f"🧹 SYSTEM: Data purge ({mode}) started by admin, job {job_id}.")
         
     except Exception as e:
         flash(f'Error clearing system data: {str(e)}', 'error')
@@ -1450,6 +1497,22 @@ def clear_system_data():
     
     return redirect(url_for('system_settings'))
 
+@app.route('/admin/clear-data/cancel', methods=['POST'])
+@require_login('admin')
+def cancel_system_data_clear():
+    """Stop the running patient purge after its current chunk"""
+    if db_manager.cancel_patient_purge():
+        db_manager.log_admin_action({
+            'action': 'cancel_clear_system_data',
+            'admin': session.get('user_name', 'Unknown'),
+            'timestamp': datetime.now()
+        })
+        flash('Patient data purge will stop after the current chunk.', 'info')
+    else:
+        flash('No patient data purge is running.', 'warning')
+    
+    return redirect(url_for('system_settings'))
+
 @app.route('/admin/clear-cache', methods=['POST'])
 @require_login('admin')
 def clear_system_cache():
@@ -1560,16 +1623,13 @@ def update_system():
     
     return redirect(url_for('system_settings'))
 
-@app.route('/doctor/patient/<int:patient_id>/delete', methods=['POST'])
+@app.route('/doctor/patient/<patient_id>/delete', methods=['POST'])
 @require_login(['doctor', 'admin'])
 def delete_patient(patient_id):
     """Delete a specific patient record"""
     try:
-        # Debug session information
-        print(f"🔍 DELETE DEBUG: Session contents: {dict(session)}")
         print(f"🔍 DELETE DEBUG: User role: {session.get('user_role')}")
         print(f"🔍 DELETE DEBUG: Assigned hospital: {session.get('assigned_hospital')}")
-        print(f"🔍 DELETE DEBUG: Form data: {dict(request.form)}")
         print(f"🔍 DELETE DEBUG: Patient ID: {patient_id}")
         
         # Determine hospital based on user role
@@ -1588,66 +1648,18 @@ def delete_patient(patient_id):
             print(f"❌ Delete failed: Doctor has no assigned hospital")
             return redirect(url_for('patient_management'))
         
-        # Get data for specific hospital (filtered from main patients file)
-        data = get_hospital_data(selected_hospital)
-        print(f"🔍 DELETE DEBUG: Data length for hospital '{selected_hospital}': {len(data)}")
-        
-        # Check if patient exists
-        if patient_id >= len(data):
-            flash('Patient not found.', 'error')
-            print(f"❌ Patient not found: ID {patient_id} >= length {len(data)}")
-            return redirect(url_for('patient_management', hospital=selected_hospital))
-        
-        # Get patient info for logging
-        patient_to_delete = data[patient_id]
-        patient_name = patient_to_delete.get('name', patient_to_delete.get('firstName', 'Unknown'))
-        patient_age = patient_to_delete.get('age', 'Unknown')
-        patient_hospital = patient_to_delete.get('selected_hospital', 'Unknown')
-        
-        print(f"🔍 DELETE DEBUG: Deleting patient: {patient_name} (Age: {patient_age}) from {patient_hospital}")
-        
-        # For deletion, we need to find this patient in MongoDB and remove it
         if not db_manager.is_connected():
             flash('Database not connected. Cannot delete patient.', 'error')
             return redirect(url_for('patient_management', hospital=selected_hospital))
         
-        # Get all patients from MongoDB
-        all_patients = db_manager.get_patients()
-        
-        # Find the actual patient in the list by matching the data
-        patient_found = False
-        patient_object_id = None
-        
-        for patient in all_patients:
-            if (patient.get('firstName') == patient_name.split(' ')[0] if ' ' in patient_name else patient_name and
-                str(patient.get('age')) == str(patient_age) and
-                patient.get('selected_hospital') == patient_hospital):
-                
-                # For doctors, verify this patient is from their hospital
-                if session.get('user_role') == 'doctor' and patient.get('selected_hospital') != selected_hospital:
-                    flash('Error: You can only delete patients from your assigned hospital.', 'error')
-                    print(f"❌ Delete denied: Doctor tried to delete patient from different hospital")
-                    return redirect(url_for('patient_management', hospital=selected_hospital))
-                
-                # Found the patient
-                patient_object_id = patient.get('_id')
-                patient_found = True
-                print(f"🔍 DELETE DEBUG: Found patient with ObjectId: {patient_object_id}")
-                break
-        
-        if not patient_found or not patient_object_id:
-            flash('Error: Patient not found in database.', 'error')
-            print(f"❌ Patient not found in MongoDB")
-            return redirect(url_for('patient_management', hospital=selected_hospital))
-        
-        # Delete the patient from MongoDB
-        delete_result = db_manager.delete_patient(patient_object_id)
-        if delete_result:
-            flash(f'Patient "{patient_name}" has been successfully deleted.', 'success')
-            print(f"🗑️ Patient deleted: {patient_name} (Age: {patient_age}) from {patient_hospital} by {session.get('user_role')} {session.get('user_name')}")
+        # One indexed delete by ObjectId; the hospital in the filter keeps doctors
+        # from deleting patients of other hospitals
+        if db_manager.delete_patient(patient_id, selected_hospital or None):
+            flash('Patient record has been successfully deleted.', 'success')
+            print(f"🗑️ Patient deleted: {patient_id} from {selected_hospital or 'any hospital'} by {session.get('user_role')} {session.get('user_name')}")
         else:
-            flash('Error deleting patient from database.', 'error')
-            print(f"❌ Failed to delete patient from MongoDB")
+            flash('Error: Patient not found in database.', 'error')
+            print(f"❌ Patient {patient_id} not found in {selected_hospital or 'any hospital'}")
         
     except Exception as e:
         flash(f'Error deleting patient: {str(e)}', 'error')
@@ -1658,5 +1670,130 @@ def delete_patient(patient_id):
     
     return redirect(url_for('patient_management', hospital=selected_hospital))
 
+# Field updates behind the patient_management bulk actions
+BULK_PATIENT_UPDATES = {
+    'mark_reviewed': {'reviewed': True},
+    'mark_new': {'reviewed': False}
+}
+
+@app.route('/doctor/patients/bulk', methods=['POST'])
+@require_login(['doctor', 'admin'])
+def bulk_patient_action():
+    """Apply one action to the selected patients, or to every patient matching the filter"""
+    action = request.form.get('action', '')
+    scope = 'filtered' if request.form.get('scope') == 'filtered' else 'selected'
+    patient_ids = request.form.getlist('patient_ids')
+    
+    # Doctors only ever touch their assigned hospital
+    if session.get('user_role') == 'doctor':
+        selected_hospital = session.get('assigned_hospital')
+        if not selected_hospital:
+            flash('Error: No hospital assigned to your account.', 'error')
+            return redirect(url_for('patient_management'))
+    else:
+        selected_hospital = request.form.get('hospital', '')
+    
+    if action != 'delete' and action not in BULK_PATIENT_UPDATES:
+        flash('Unknown bulk action.', 'error')
+        return redirect(url_for('patient_management', hospital=selected_hospital))
+    if scope == 'filtered':
+        return bulk_patient_action_filtered(action, selected_hospital)
+    if not patient_ids:
+        flash('No patients selected.', 'warning')
+        return redirect(url_for('patient_management', hospital=selected_hospital))
+    if len(patient_ids) > MAX_BULK_PATIENTS:
+        flash(f'Too many patients selected (max {MAX_BULK_PATIENTS}).', 'error')
+        return redirect(url_for('patient_management', hospital=selected_hospital))
+    if not db_manager.is_connected():
+        flash('Database not connected. Cannot update patients.', 'error')
+        return redirect(url_for('patient_management', hospital=selected_hospital))
+    
+    # One bulk_write for the whole selection, scoped to the hospital in the filter
+    started = time.perf_counter()
+    if action == 'delete':
+        affected = db_manager.delete_patients(patient_ids, hospital_name=selected_hospital or None)
+    else:
+        affected = db_manager.update_patients(BULK_PATIENT_UPDATES[action], patient_ids,
+                                              hospital_name=selected_hospital or None)
+    elapsed = time.perf_counter() - started
+    
+    # One audit entry for the whole batch
+    db_manager.log_admin_action({
+        'action': f'bulk_{action}_patients',
+        'admin': session.get('user_name', 'Unknown'),
+        'role': session.get('user_role'),
+        'timestamp': datetime.now(),
+        'hospital': selected_hospital or None,
+        'records_selected': len(patient_ids),
+        'records_affected': affected,
+        'patient_ids': patient_ids
+    })
+    
+    verb = 'deleted' if action == 'delete' else 'updated'
+    flash(f'{affected} of {len(patient_ids)} selected patients {verb}.', 'success' if affected else 'warning')
+    print(f"📦 Bulk {action}: {affected}/{len(patient_ids)} patients in {elapsed:.3f}s by {session.get('user_role')} {session.get('user_name')}")
+    return redirect(url_for('patient_management', hospital=selected_hospital))
+
+def bulk_patient_action_filtered(action, selected_hospital):
+    """Apply a bulk action to all patients of the hospital filter registered in an optional date range"""
+    try:
+        start = datetime.strptime(request.form['registered_from'], '%Y-%m-%d') if request.form.get('registered_from') else None
+        end = datetime.strptime(request.form['registered_to'], '%Y-%m-%d') + timedelta(days=1) if request.form.get('registered_to') else None
+    except ValueError:
+        flash('Invalid date range.', 'error')
+        return redirect(url_for('patient_management', hospital=selected_hospital))
+    
+    # Emptying every hospital at once is the admin purge job's task
+    if not selected_hospital and start is None and end is None:
+        flash('Choose a hospital or a date range to act on all matching patients.', 'warning')
+        return redirect(url_for('patient_management', hospital=selected_hospital))
+    if not db_manager.is_connected():
+        flash('Database not connected. Cannot update patients.', 'error')
+        return redirect(url_for('patient_management', hospital=selected_hospital))
+    
+    started = time.perf_counter()
+    if action == 'delete':
+        affected = db_manager.delete_patients_in_range(selected_hospital or None, start, end)
+    else:
+        affected = db_manager.update_patients_in_range(BULK_PATIENT_UPDATES[action], selected_hospital or None,
+                                                       start, end)
+    elapsed = time.perf_counter() - started
+    
+    db_manager.log_admin_action({
+        'action': f'bulk_{action}_patients',
+        'admin': session.get('user_name', 'Unknown'),
+        'role': session.get('user_role'),
+        'timestamp': datetime.now(),
+        'hospital': selected_hospital or None,
+        'scope': 'filtered',
+        'registered_from': start,
+        'registered_to': end,
+        'records_affected': affected
+    })
+    
+    verb = 'deleted' if action == 'delete' else 'updated'
+    flash(f'{affected} matching patients {verb}.', 'success' if affected else 'warning')
+    print(f"📦 Bulk {action} (filter): {affected} patients in {elapsed:.3f}s by {session.get('user_role')} {session.get('user_name')}")
+    return redirect(url_for('patient_management', hospital=selected_hospital))
+
+def create_app():
+    """Application factory: register lifecycle hooks without touching MongoDB
+    
+    The connection is opened lazily by the first request in each worker, so
+    importing this module and forking workers stays cheap. WSGI servers
+    should load ``app:create_app()``; seed default data with bootstrap.py.
+    """
+    if not app.extensions.get('hospital_db'):
+        init_db(app)
+        app.extensions['hospital_db'] = True
+    return app
+
+@app.cli.command('seed')
+def seed_command():
+    """Create default hospitals, doctors and admins (flask --app app seed)"""
+    seed_defaults(get_db())
+
 if __name__ == '__main__':
-    app.run(debug=True, host='0.0.0.0', port=5000)
\ No newline at end of file
+    # Development server: seed a fresh database so the default logins work
+    seed_defaults(get_db())
+    create_app().run(debug=True, host='0.0.0.0', port=5000)
\ No newline at end of file
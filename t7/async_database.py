@@ -0,0 +1,1383 @@
+"""
+Async MongoDB Database Helper Module
+Motor-based counterpart of database.DatabaseManager for async servers
+"""
+
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import ReturnDocument, DeleteOne, UpdateMany, UpdateOne
+from pymongo.errors import DuplicateKeyError, BulkWriteError
+from datetime import datetime
+import asyncio
+import os
+import time
+from bson import ObjectId
+import json
+
+from database import (AuditLogWriter, ConnectionMonitor, DatabaseManager, LastLoginBatcher, CACHE_VERSIONS_KEY,
+                      CONFIG_SUM_LIMITS, DAILY_STATS_FIELDS, DAILY_STATS_STAGING, DOCTOR_INDEX_FIELDS, INDEX_SPECS,
+                      TEXT_SCORE, index_name, index_options, resolve_projection, typed_config_value)
+
+class AsyncConnectionMonitor(ConnectionMonitor):
+    """Heartbeat monitor that pings from an asyncio task instead of a thread"""
+    
+    def __init__(self, client, interval=None, failure_threshold=None, on_recover=None):
+        super().__init__(client, interval, failure_threshold, on_recover)
+        self._task = None
+    
+    async def check(self):
+        """Ping the server once and update the cached state"""
+        started = time.perf_counter()
+        try:
+            await self.client.admin.command('ping')
+            self._record_success((time.perf_counter() - started) * 1000)
+        except Exception as e:
+            self._record_failure(e)
+        return self.connected
+    
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            await self.check()
+    
+    def start(self):
+        """Start the heartbeat task on the running event loop"""
+        if self._task is not None and not self._task.done():
+            return
+        self._task = asyncio.get_running_loop().create_task(self._run(), name='mongodb-heartbeat')
+    
+    async def stop(self):
+        """Stop the heartbeat task"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+class AsyncLastLoginBatcher(LastLoginBatcher):
+    """last_login batcher that flushes from an asyncio task instead of a thread"""
+    
+    def __init__(self, db, flush_interval=None):
+        super().__init__(db, flush_interval)
+        self._task = None
+    
+    async def flush(self):
+        """Write all pending stamps and return how many users were updated"""
+        pending, by_collection = self._take_pending()
+        if not pending:
+            return 0
+        
+        written = 0
+        for collection_name, operations in by_collection.items():
+            try:
+                await self.db[collection_name].bulk_write(operations, ordered=False)
+                written += len(operations)
+            except Exception as e:
+                self._record_failure(collection_name, operations, e)
+        
+        self._record_flush(pending, written)
+        return written
+    
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            await self.flush()
+    
+    def start(self):
+        """Start the flush task on the running event loop"""
+        if self._task is not None and not self._task.done():
+            return
+        self._task = asyncio.get_running_loop().create_task(self._run(), name='last-login-flusher')
+    
+    async def stop(self):
+        """Stop the flush task and write any pending stamps"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+
+class AsyncAuditLogWriter(AuditLogWriter):
+    """Write-behind log buffer on an asyncio.Queue, written by an asyncio task instead of a thread"""
+    
+    def __init__(self, collection, max_queue=None, batch_size=None, flush_interval=None, name='admin-log-writer'):
+        super().__init__(collection, max_queue, batch_size, flush_interval, name)
+        self._queue = asyncio.Queue(maxsize=self.max_queue)
+        self._stopping = False
+        self._task = None
+    
+    def submit(self, entry):
+        """Queue an entry for writing; returns False if it had to be dropped"""
+        try:
+            self._queue.put_nowait(entry)
+        except asyncio.QueueFull:
+            with self._lock:
+                self.dropped += 1
+            return False
+        with self._lock:
+            self.enqueued += 1
+        return True
+    
+    async def _write(self, batch):
+        try:
+            await self.collection.insert_many(batch, ordered=False)
+            with self._lock:
+                self.written += len(batch)
+                self.batches += 1
+                self.last_flush = datetime.now()
+        except Exception as e:
+            with self._lock:
+                self.failed += len(batch)
+                self.last_error = str(e)
+            print(f"❌ Error writing {len(batch)} {self.collection.name} entries: {e}")
+    
+    async def _next_batch(self):
+        """Collect up to batch_size entries, waiting at most flush_interval"""
+        batch = []
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+        return batch
+    
+    async def _run(self):
+        while not self._stopping:
+            batch = await self._next_batch()
+            if batch:
+                await self._write(batch)
+    
+    async def flush(self):
+        """Write everything currently queued and return how many entries were taken"""
+        taken = 0
+        while True:
+            batch = []
+            try:
+                while len(batch) < self.batch_size:
+                    batch.append(self._queue.get_nowait())
+            except asyncio.QueueEmpty:
+                pass
+            if not batch:
+                return taken
+            await self._write(batch)
+            taken += len(batch)
+    
+    def start(self):
+        """Start the writer task on the running event loop"""
+        if self._task is not None and not self._task.done():
+            return
+        self._stopping = False
+        self._task = asyncio.get_running_loop().create_task(self._run(), name=self.name)
+    
+    async def stop(self):
+        """Stop the writer task and flush whatever is still queued"""
+        self._stopping = True
+        if self._task is not None:
+            # The task exits after its current batch, within flush_interval
+            try:
+                await asyncio.wait_for(self._task, self.flush_interval + 5)
+            except (asyncio.TimeoutError, asyncio.CancelledError):
+                pass
+            self._task = None
+        flushed = await self.flush()
+        if flushed:
+            print(f"📝 Flushed {flushed} queued {self.collection.name} entries")
+
+class AsyncDatabaseManager:
+    """Async mirror of DatabaseManager on Motor
+    
+    Public methods have the same name, arguments and return values as their
+    DatabaseManager counterparts and are coroutines, except the in-memory
+    status accessors (is_connected, get_*_status). Call ``connect()`` from
+    the event loop before use.
+    
+    SYNC_ONLY_METHODS are not mirrored: index management and the query,
+    pool and cache diagnostics belong to the sync manager and the CLIs, and
+    the patient purge job runs in a DatabaseManager background thread.
+    """
+    
+    SYNC_ONLY_METHODS = frozenset({
+        'ensure_indexes', 'check_indexes', 'get_collscan_queries', 'get_index_build_status',
+        'get_query_stats', 'get_slow_queries', 'get_pool_stats', 'get_cache_stats',
+        'start_patient_purge', 'cancel_patient_purge', 'get_purge_status'
+    })
+    
+    # Query builders and document helpers are shared with the sync manager
+    _page_query = DatabaseManager._page_query
+    _fill_page = staticmethod(DatabaseManager._fill_page)
+    _date_range_query = DatabaseManager._date_range_query
+    _search_query = DatabaseManager._search_query
+    _group_by_hospital = staticmethod(DatabaseManager._group_by_hospital)
+    _stamp_bulk_tokens = staticmethod(DatabaseManager._stamp_bulk_tokens)
+    _record_bulk_batch = staticmethod(DatabaseManager._record_bulk_batch)
+    _patient_management_pipeline = DatabaseManager._patient_management_pipeline
+    _merge_facet_counters = staticmethod(DatabaseManager._merge_facet_counters)
+    _age_group = staticmethod(DatabaseManager._age_group)
+    _daily_stats_key = DatabaseManager._daily_stats_key
+    _daily_stats_increments = DatabaseManager._daily_stats_increments
+    _daily_stats_bulk_operations = DatabaseManager._daily_stats_bulk_operations
+    _build_daily_stats = DatabaseManager._build_daily_stats
+    _daily_stats_key_query = staticmethod(DatabaseManager._daily_stats_key_query)
+    _summarize_daily_stats = DatabaseManager._summarize_daily_stats
+    _token_seed_pipeline = DatabaseManager._token_seed_pipeline
+    _cache_version_bump = staticmethod(DatabaseManager._cache_version_bump)
+    _doctors_index = staticmethod(DatabaseManager._doctors_index)
+    _patient_id_filter = staticmethod(DatabaseManager._patient_id_filter)
+    _patients_bulk_filter = staticmethod(DatabaseManager._patients_bulk_filter)
+    
+    def __init__(self, connection_string=None, database_name=None):
+        """Create the Motor client; no I/O happens until connect()"""
+        self.connection_string = connection_string or os.getenv('MONGODB_URI', 'mongodb://localhost:27017/')
+        self.database_name = database_name or os.getenv('DATABASE_NAME', 'hospital_management')
+        
+        self.monitor = None
+        self.last_logins = None
+        self.audit_log = None
+        
+        try:
+            self.client = AsyncIOMotorClient(self.connection_string)
+            self.db = self.client[self.database_name]
+            self.monitor = AsyncConnectionMonitor(self.client)
+            # last_login stamps are batched off the authentication path, as in DatabaseManager
+            self.last_logins = AsyncLastLoginBatcher(self.db)
+            # Admin actions are written behind the caller, as in DatabaseManager
+            self.audit_log = AsyncAuditLogWriter(self.db.admin_logs)
+        except Exception as e:
+            print(f"❌ MongoDB connection failed: {e}")
+            self.client = None
+            self.db = None
+    
+    async def connect(self):
+        """Test the connection and start the heartbeat task"""
+        if self.monitor is None:
+            return False
+        
+        if await self.monitor.check():
+            print(f"✅ Connected to MongoDB (async): {self.database_name}")
+        else:
+            print(f"❌ MongoDB connection failed: {self.monitor.last_error}")
+            print("📝 Make sure MongoDB is installed and running on your system")
+        self.monitor.start()
+        self.last_logins.start()
+        self.audit_log.start()
+        return self.monitor.connected
+    
+    def is_connected(self):
+        """Check if database is connected (cached by the heartbeat monitor, no round trip)"""
+        if self.client is None or self.db is None or self.monitor is None:
+            return False
+        return self.monitor.is_healthy()
+    
+    def get_connection_status(self):
+        """Get connection health details from the heartbeat monitor"""
+        if self.monitor is None:
+            return {
+                'connected': False,
+                'circuit_state': 'open',
+                'last_error': 'MongoDB client not initialized'
+            }
+        return self.monitor.get_status()
+    
+    def get_audit_log_status(self):
+        """Get backlog and dropped counters from the admin log writer"""
+        if self.audit_log is None:
+            return {}
+        return self.audit_log.get_status()
+    
+    def get_last_login_status(self):
+        """Get pending and staleness figures for batched last_login stamps"""
+        if self.last_logins is None:
+            return {}
+        return self.last_logins.get_status()
+    
+    async def _bump_cache_version(self, name):
+        """Bump a cache version so the sync workers' caches reload"""
+        try:
+            await self.db.system_config.update_one({'config_key': CACHE_VERSIONS_KEY},
+                                                   self._cache_version_bump(name), upsert=True)
+        except Exception as e:
+            print(f"⚠️ Error bumping {name} cache version: {e}")
+    
+    @staticmethod
+    def _user_collection(role):
+        """Collection holding users of a role"""
+        collection_name = f"{role}s" if role != 'admin' else 'admins'
+        if role == 'patient':
+            collection_name = 'patients_users'
+        return collection_name
+    
+    @staticmethod
+    def _stringify_ids(patients):
+        for patient in patients:
+            patient['_id'] = str(patient['_id'])
+        return patients
+    
+    # =========================
+    # USER MANAGEMENT METHODS
+    # =========================
+    
+    async def create_user(self, username, password, role, additional_info=None):
+        """Create a new user (patient, doctor, or admin)"""
+        if not self.is_connected():
+            return False
+        
+        try:
+            user_data = {
+                'username': username,
+                'password': password,  # In production, hash this password
+                'role': role,
+                'created_at': datetime.now(),
+                'status': 'active',
+                'last_login': None
+            }
+            
+            if additional_info:
+                user_data.update(additional_info)
+            
+            result = await self.db[self._user_collection(role)].insert_one(user_data)
+            if role == 'doctor':
+                await self._bump_cache_version('doctors_by_hospital')
+            print(f"✅ User created: {username} ({role})")
+            return result.inserted_id
+        except Exception as e:
+            print(f"❌ Error creating user: {e}")
+            return False
+    
+    async def authenticate_user(self, username, password, role):
+        """Authenticate a user"""
+        if not self.is_connected():
+            return False
+        
+        try:
+            collection = self.db[self._user_collection(role)]
+            user = await collection.find_one({
+                'username': username,
+                'password': password,  # In production, use hashed password comparison
+                'status': 'active'
+            })
+            
+            if user:
+                # Stamped by the batcher on its next flush
+                if self.last_logins:
+                    self.last_logins.record(self._user_collection(role), user['_id'])
+                return user
+            return False
+        except Exception as e:
+            print(f"❌ Error authenticating user: {e}")
+            return False
+    
+    async def get_all_users(self, role=None):
+        """Get all users or users of a specific role"""
+        if not self.is_connected():
+            return []
+        
+        try:
+            if role:
+                return await self.db[self._user_collection(role)].find({'status': 'active'}).to_list(None)
+            
+            # Get all users from all collections
+            all_users = []
+            for collection in ['doctors', 'admins', 'patients_users']:
+                all_users.extend(await self.db[collection].find({'status': 'active'}).to_list(None))
+            return all_users
+        except Exception as e:
+            print(f"❌ Error getting users: {e}")
+            return []
+    
+    async def update_user(self, username, role, updates):
+        """Update user information"""
+        if not self.is_connected():
+            return False
+        
+        try:
+            updates['updated_at'] = datetime.now()
+            result = await self.db[self._user_collection(role)].update_one(
+                {'username': username},
+                {'$set': updates}
+            )
+            if role == 'doctor' and result.matched_count:
+                await self._bump_cache_version('doctors_by_hospital')
+            return result.modified_count > 0
+        except Exception as e:
+            print(f"❌ Error updating user: {e}")
+            return False
+    
+    async def delete_user(self, username, role):
+        """Soft delete a user (mark as inactive)"""
+        if not self.is_connected():
+            return False
+        
+        try:
+            result = await self.db[self._user_collection(role)].update_one(
+                {'username': username},
+                {'$set': {'status': 'inactive', 'deleted_at': datetime.now()}},
+                upsert=False
+            )
+            if role == 'doctor' and result.modified_count:
+                await self._bump_cache_version('doctors_by_hospital')
+            return result.modified_count > 0
+        except Exception as e:
+            print(f"❌ Error deleting user: {e}")
+            return False
+    
+    async def get_doctors_by_hospital(self):
+        """Get active doctors grouped by assigned hospital"""
+        if not self.is_connected():
+            return {}
+        
+        try:
+            doctors = await self.db.doctors.find({'status': 'active', 'assigned_hospital': {'$nin': [None, '']}},
+                                                 DOCTOR_INDEX_FIELDS).to_list(None)
+            return self._doctors_index(doctors)
+        except Exception as e:
+            print(f"❌ Error getting doctors by hospital: {e}")
+            return {}
+    
+    # =========================
+    # HOSPITAL MANAGEMENT METHODS
+    # =========================
+    
+    async def create_hospital(self, hospital_data):
+        """Create a new hospital configuration"""
+        if not self.is_connected():
+            return False
+        
+        try:
+            hospital_data['created_at'] = datetime.now()
+            hospital_data['status'] = 'active'
+            result = await self.db.hospitals.insert_one(hospital_data)
+            await self._bump_cache_version('hospitals')
+            print(f"✅ Hospital created: {hospital_data.get('name', 'Unknown')}")
+            return result.inserted_id
+        except Exception as e:
+            print(f"❌ Error creating hospital: {e}")
+            return False
+    
+    async def add_hospital_config(self, hospital_data):
+        """Add a new hospital configuration"""
+        if not self.is_connected():
+            return False
+        
+        try:
+            hospital_data['created_at'] = datetime.now()
+            hospital_data['status'] = 'active'
+            result = await self.db.hospitals.insert_one(hospital_data)
+            await self._bump_cache_version('hospitals')
+            print(f"✅ Hospital config added: {hospital_data.get('name', 'Unknown')}")
+            return result.inserted_id
+        except Exception as e:
+            print(f"❌ Error adding hospital config: {e}")
+            return False
+    
+    async def get_all_hospitals_config(self):
+        """Get all hospital configurations"""
+        if not self.is_connected():
+            return []
+        
+        try:
+            return await self.db.hospitals.find({'status': 'active'}).to_list(None)
+        except Exception as e:
+            print(f"❌ Error getting hospitals: {e}")
+            return []
+    
+    async def update_hospital(self, hospital_id, updates):
+        """Update hospital configuration"""
+        if not self.is_connected():
+            return False
+        
+        try:
+            updates['updated_at'] = datetime.now()
+            result = await self.db.hospitals.update_one(
+                {'hospital_id': hospital_id},
+                {'$set': updates}
+            )
+            if result.matched_count:
+                await self._bump_cache_version('hospitals')
+            return result.modified_count > 0
+        except Exception as e:
+            print(f"❌ Error updating hospital: {e}")
+            return False
+    
+    # =========================
+    # SYSTEM CONFIGURATION METHODS
+    # =========================
+    
+    async def save_config(self, config_key, config_value):
+        """Save system configuration"""
+        if not self.is_connected():
+            return False
+        
+        try:
+            now = datetime.now()
+            await self.db.system_config.update_one(
+                {'config_key': config_key},
+                {'$set': {'config_value': config_value, 'updated_at': now},
+                 '$setOnInsert': {'created_at': now}},
+                upsert=True
+            )
+            await self._bump_cache_version('system_config')
+            return True
+        except Exception as e:
+            print(f"❌ Error saving config: {e}")
+            return False
+    
+    async def get_config(self, config_key, default_value=None):
+        """Get system configuration"""
+        if not self.is_connected():
+            return default_value
+        
+        try:
+            # Range checks on some keys depend on another key's value
+            keys = [config_key] + [CONFIG_SUM_LIMITS[config_key][0]] if config_key in CONFIG_SUM_LIMITS else [config_key]
+            configs = {config['config_key']: config.get('config_value')
+                       async for config in self.db.system_config.find({'config_key': {'$in': keys}})}
+            return typed_config_value(config_key, configs.get(config_key), default_value, configs)
+        except Exception as e:
+            print(f"❌ Error getting config: {e}")
+            return default_value
+    
+    async def get_all_configs(self):
+        """Get all system configurations"""
+        if not self.is_connected():
+            return {}
+        
+        try:
+            configs = await self.db.system_config.find({'config_key': {'$ne': CACHE_VERSIONS_KEY}}).to_list(None)
+            return {config['config_key']: config['config_value'] for config in configs}
+        except Exception as e:
+            print(f"❌ Error getting all configs: {e}")
+            return {}
+    
+    # PATIENT OPERATIONS
+    async def save_patient(self, patient_data):
+        """Save patient data to MongoDB"""
+        try:
+            if not self.is_connected():
+                raise Exception("Database not connected")
+            
+            # created_at is the native datetime used for range queries
+            if not isinstance(patient_data.get('created_at'), datetime):
+                patient_data['created_at'] = datetime.now()
+            
+            # Keep the display timestamp string in step with created_at
+            if 'timestamp' not in patient_data:
+                patient_data['timestamp'] = patient_data['created_at'].strftime("%Y-%m-%d %H:%M:%S")
+            
+            result = await self.db.patients.insert_one(patient_data)
+            patient_data['_id'] = str(result.inserted_id)
+            
+            # Keep the daily rollup in step
+            await self._update_daily_stats(patient_data, 1)
+            
+            print(f"✅ Patient saved: {patient_data.get('firstName', 'Unknown')} {patient_data.get('lastName', '')}")
+            return patient_data
+        
+        except Exception as e:
+            print(f"❌ Error saving patient: {e}")
+            return None
+    
+    async def save_patients_bulk(self, patients, assign_slot=None, batch_size=500):
+        """Save many patients at once with contiguous per-hospital token ranges"""
+        results = [None] * len(patients)
+        
+        if not self.is_connected():
+            return [{'index': i, 'success': False, 'error': 'Database not connected'} for i in range(len(patients))]
+        
+        now = datetime.now()
+        date_str = now.strftime('%Y-%m-%d')
+        
+        # Reserve one contiguous token range per hospital
+        by_hospital = self._group_by_hospital(patients)
+        for hospital_name, indices in by_hospital.items():
+            first_token = await self.reserve_token_range(hospital_name, date_str, len(indices))
+            if first_token is None:
+                for i in indices:
+                    results[i] = {'index': i, 'success': False, 'error': 'Could not reserve token numbers'}
+                continue
+            
+            self._stamp_bulk_tokens(patients, indices, hospital_name, first_token, date_str, now, assign_slot)
+        
+        # Insert in unordered batches; one bad record does not stop the rest
+        ready = [i for i in range(len(patients)) if results[i] is None]
+        for start in range(0, len(ready), batch_size):
+            batch_indices = ready[start:start + batch_size]
+            documents = [patients[i] for i in batch_indices]
+            
+            failed = {}
+            try:
+                await self.db.patients.insert_many(documents, ordered=False)
+            except BulkWriteError as e:
+                for error in e.details.get('writeErrors', []):
+                    failed[error['index']] = error.get('errmsg', 'Write error')
+            except Exception as e:
+                failed = {k: str(e) for k in range(len(documents))}
+            
+            inserted = self._record_bulk_batch(results, batch_indices, documents, failed)
+            await self._update_daily_stats_bulk(inserted)
+        
+        saved = sum(1 for r in results if r['success'])
+        print(f"✅ Bulk saved {saved}/{len(patients)} patients across {len(by_hospital)} hospitals")
+        return results
+    
+    async def get_patients(self, hospital_name=None, limit=None, projection=None):
+        """Get patients from MongoDB, optionally limited to a projection profile"""
+        try:
+            if not self.is_connected():
+                raise Exception("Database not connected")
+            
+            query = {}
+            if hospital_name:
+                query['selected_hospital'] = hospital_name
+            
+            cursor = self.db.patients.find(query, resolve_projection(projection)).sort([("timestamp", -1), ("_id", -1)])
+            if limit:
+                cursor = cursor.limit(limit)
+            
+            return self._stringify_ids(await cursor.to_list(None))
+        
+        except Exception as e:
+            print(f"❌ Error retrieving patients: {e}")
+            return []
+    
+    async def get_patients_page(self, hospital_name=None, after=None, limit=25, sort='desc', before=None, projection=None):
+        """Get one page of patients using keyset pagination on (timestamp, _id)"""
+        page = {
+            'patients': [],
+            'next_cursor': None,
+            'prev_cursor': None,
+            'has_next': False,
+            'has_prev': False
+        }
+        
+        try:
+            if not self.is_connected():
+                raise Exception("Database not connected")
+            
+            query, scan_direction, backwards, position = self._page_query(hospital_name, after, before, sort)
+            
+            cursor = self.db.patients.find(query, resolve_projection(projection)).sort([
+                ("timestamp", scan_direction),
+                ("_id", scan_direction)
+            ]).limit(limit + 1)
+            
+            self._fill_page(page, await cursor.to_list(None), limit, backwards, position)
+            
+            return page
+        
+        except Exception as e:
+            print(f"❌ Error retrieving patients page: {e}")
+            return page
+    
+    async def search_patients(self, query, hospital_name=None, limit=25, skip=0, projection=None):
+        """Full-text search over names, symptoms, medications and medical history, best match first"""
+        page = {'patients': [], 'has_next': False, 'has_prev': skip > 0, 'error': None}
+        query = (query or '').strip()
+        if not query:
+            return page
+        
+        try:
+            if not self.is_connected():
+                raise Exception("Database not connected")
+            
+            fields = dict(resolve_projection(projection) or {})
+            fields['score'] = TEXT_SCORE
+            cursor = self.db.patients.find(self._search_query(query, hospital_name), fields).sort([
+                ('score', TEXT_SCORE),
+                ('_id', 1)
+            ]).skip(skip).limit(limit + 1)
+            
+            patients = await cursor.to_list(None)
+            page['has_next'] = len(patients) > limit
+            page['patients'] = self._stringify_ids(patients[:limit])
+            
+            return page
+        
+        except Exception as e:
+            print(f"❌ Error searching patients: {e}")
+            # An empty page alone would read as "no matches"
+            page['error'] = str(e)
+            return page
+    
+    async def count_patients(self, hospital_name=None, start=None, end=None, filters=None):
+        """Count patients registered in [start, end)"""
+        try:
+            if not self.is_connected():
+                raise Exception("Database not connected")
+            
+            query = self._date_range_query(hospital_name, start, end)
+            if filters:
+                query.update(filters)
+            
+            return await self.db.patients.count_documents(query)
+        
+        except Exception as e:
+            print(f"❌ Error counting patients: {e}")
+            return 0
+    
+    async def get_patients_by_date_range(self, hospital_name=None, start=None, end=None, limit=None):
+        """Get patients registered in [start, end), newest first"""
+        try:
+            if not self.is_connected():
+                raise Exception("Database not connected")
+            
+            query = self._date_range_query(hospital_name, start, end)
+            cursor = self.db.patients.find(query).sort("created_at", -1)
+            if limit:
+                cursor = cursor.limit(limit)
+            
+            return self._stringify_ids(await cursor.to_list(None))
+        
+        except Exception as e:
+            print(f"❌ Error retrieving patients by date range: {e}")
+            return []
+    
+    async def migrate_patient_timestamps(self, batch_size=1000):
+        """Backfill created_at as a native datetime parsed from the legacy timestamp string"""
+        if not self.is_connected():
+            return 0
+        
+        try:
+            # Documents without a usable created_at, or whose created_at is the JSON import time
+            query = {
+                'timestamp': {'$type': 'string'},
+                'timestamp_migrated': {'$ne': True},
+                '$or': [
+                    {'created_at': {'$exists': False}},
+                    {'created_at': {'$not': {'$type': 'date'}}},
+                    {'migrated_from_json': True}
+                ]
+            }
+            
+            migrated = 0
+            operations = []
+            async for patient in self.db.patients.find(query, {'timestamp': 1}):
+                try:
+                    created_at = datetime.strptime(patient['timestamp'], "%Y-%m-%d %H:%M:%S")
+                except ValueError:
+                    print(f"⚠️ Skipping patient {patient['_id']}: unparseable timestamp '{patient['timestamp']}'")
+                    continue
+                
+                operations.append(UpdateOne(
+                    {'_id': patient['_id']},
+                    {'$set': {'created_at': created_at, 'timestamp_migrated': True}}
+                ))
+                
+                if len(operations) >= batch_size:
+                    migrated += (await self.db.patients.bulk_write(operations, ordered=False)).modified_count
+                    operations = []
+            
+            if operations:
+                migrated += (await self.db.patients.bulk_write(operations, ordered=False)).modified_count
+            
+            print(f"✅ Migrated {migrated} patient timestamps to native datetime")
+            if migrated:
+                # Patients may have moved to a different rollup date
+                await self.rebuild_daily_stats()
+            return migrated
+        
+        except Exception as e:
+            print(f"❌ Error migrating patient timestamps: {e}")
+            return 0
+    
+    async def get_patient_by_id(self, patient_id, hospital_name=None, projection=None):
+        """Get single patient by MongoDB ObjectId, optionally only if it belongs to hospital_name"""
+        try:
+            if not self.is_connected():
+                raise Exception("Database not connected")
+            
+            query = self._patient_id_filter(patient_id, hospital_name)
+            if query is None:
+                return None
+            
+            patient = await self.db.patients.find_one(query, resolve_projection(projection))
+            if patient:
+                patient['_id'] = str(patient['_id'])
+                return patient
+            
+            return None
+        
+        except Exception as e:
+            print(f"❌ Error retrieving patient by ID: {e}")
+            return None
+    
+    async def update_patient(self, patient_id, update_data):
+        """Update patient data"""
+        try:
+            if not self.is_connected():
+                raise Exception("Database not connected")
+            
+            update_data['updated_at'] = datetime.now()
+            
+            if any(field in update_data for field in DAILY_STATS_FIELDS):
+                # Move the patient between rollup counters using the pre-update document
+                before = await self.db.patients.find_one_and_update(
+                    {"_id": ObjectId(patient_id)},
+                    {"$set": update_data},
+                    projection={field: 1 for field in DAILY_STATS_FIELDS},
+                    return_document=ReturnDocument.BEFORE
+                )
+                if before is None:
+                    return False
+                
+                await self._update_daily_stats(before, -1)
+                await self._update_daily_stats({**before, **update_data}, 1)
+                return True
+            
+            result = await self.db.patients.update_one(
+                {"_id": ObjectId(patient_id)},
+                {"$set": update_data}
+            )
+            
+            return result.modified_count > 0
+        
+        except Exception as e:
+            print(f"❌ Error updating patient: {e}")
+            return False
+    
+    async def delete_patient(self, patient_id, hospital_name=None):
+        """Delete patient by ID, optionally only if it belongs to hospital_name"""
+        try:
+            if not self.is_connected():
+                raise Exception("Database not connected")
+            
+            query = self._patient_id_filter(patient_id, hospital_name)
+            if query is None:
+                return False
+            
+            deleted = await self.db.patients.find_one_and_delete(
+                query,
+                projection={field: 1 for field in DAILY_STATS_FIELDS}
+            )
+            if deleted is None:
+                return False
+            
+            await self._update_daily_stats(deleted, -1)
+            return True
+        
+        except Exception as e:
+            print(f"❌ Error deleting patient: {e}")
+            return False
+    
+    async def delete_patients(self, patient_ids=None, hospital_name=None, query=None):
+        """Delete many patients with unordered bulk_writes in batches; returns the number deleted"""
+        removed = 0
+        try:
+            if not self.is_connected():
+                raise Exception("Database not connected")
+            
+            conditions = self._patients_bulk_filter(patient_ids, hospital_name, query)
+            if conditions is None:
+                print("⚠️ delete_patients needs patient ids or a filter")
+                return 0
+            
+            batch_size = int(os.getenv('MONGODB_BULK_DELETE_BATCH', '5000'))
+            projection = {field: 1 for field in DAILY_STATS_FIELDS}
+            while True:
+                targets = await self.db.patients.find(conditions, projection).limit(batch_size).to_list(None)
+                if not targets:
+                    break
+                
+                result = await self.db.patients.bulk_write(
+                    [DeleteOne({'_id': patient['_id']}) for patient in targets], ordered=False
+                )
+                await self._remove_from_daily_stats(targets, result.deleted_count)
+                removed += result.deleted_count
+                if len(targets) < batch_size or result.deleted_count == 0:
+                    break
+            
+            print(f"🗑️ Bulk deleted {removed} patients")
+            return removed
+        
+        except Exception as e:
+            print(f"❌ Error deleting patients: {e}")
+            return removed
+    
+    async def update_patients(self, update_data, patient_ids=None, hospital_name=None, query=None):
+        """Apply the same $set to many patients with one bulk_write; returns the number modified"""
+        try:
+            if not self.is_connected():
+                raise Exception("Database not connected")
+            
+            conditions = self._patients_bulk_filter(patient_ids, hospital_name, query)
+            if conditions is None:
+                print("⚠️ update_patients needs patient ids or a filter")
+                return 0
+            
+            update_data = dict(update_data, updated_at=datetime.now())
+            
+            if not any(field in update_data for field in DAILY_STATS_FIELDS):
+                result = await self.db.patients.bulk_write([UpdateMany(conditions, {'$set': update_data})])
+                return result.modified_count
+            
+            # Rollup counters move, so the pre-update documents are needed
+            before = await self.db.patients.find(conditions, {field: 1 for field in DAILY_STATS_FIELDS}).to_list(None)
+            if not before:
+                return 0
+            
+            result = await self.db.patients.bulk_write(
+                [UpdateOne({'_id': patient['_id']}, {'$set': update_data}) for patient in before], ordered=False
+            )
+            await self._update_daily_stats_bulk([{**patient, **update_data} for patient in before], 1, previous=before)
+            return result.modified_count
+        
+        except Exception as e:
+            print(f"❌ Error updating patients: {e}")
+            return 0
+    
+    async def delete_patients_in_range(self, hospital_name=None, start=None, end=None):
+        """delete_patients() for the patients of a hospital registered in [start, end)"""
+        query = self._date_range_query(hospital_name, start, end)
+        if not query:
+            print("⚠️ delete_patients_in_range needs a hospital or a date range")
+            return 0
+        return await self.delete_patients(hospital_name=hospital_name, query=query)
+    
+    async def update_patients_in_range(self, update_data, hospital_name=None, start=None, end=None):
+        """update_patients() for the patients of a hospital registered in [start, end)"""
+        query = self._date_range_query(hospital_name, start, end)
+        if not query:
+            print("⚠️ update_patients_in_range needs a hospital or a date range")
+            return 0
+        return await self.update_patients(update_data, hospital_name=hospital_name, query=query)
+    
+    # HOSPITAL STATISTICS
+    async def get_hospital_stats(self, hospital_name=None):
+        """Get statistics for hospitals (read from the daily_stats rollup)"""
+        try:
+            if not self.is_connected():
+                raise Exception("Database not connected")
+            
+            summary = await self.get_daily_stats_summary(hospital_name)
+            
+            return {
+                'total_patients': summary['total_patients'],
+                'male_patients': summary['male_patients'],
+                'female_patients': summary['female_patients'],
+                'patients_with_tokens': summary['patients_with_tokens']
+            }
+        
+        except Exception as e:
+            print(f"❌ Error getting hospital stats: {e}")
+            return {}
+    
+    async def get_patient_management_stats(self, hospital_name=None, today_start=None, month_start=None):
+        """Get all patient management counters from a single $facet aggregation"""
+        stats = {
+            'total_patients': 0,
+            'male_patients': 0,
+            'female_patients': 0,
+            'patients_with_tokens': 0,
+            'this_month': 0,
+            'patients_today': 0,
+            'today_tokens': 0
+        }
+        
+        try:
+            if not self.is_connected():
+                raise Exception("Database not connected")
+            
+            pipeline = self._patient_management_pipeline(hospital_name, today_start, month_start)
+            result = await self.db.patients.aggregate(pipeline).to_list(None)
+            self._merge_facet_counters(stats, result, ('overall', 'this_month'))
+            
+            return stats
+        
+        except Exception as e:
+            print(f"❌ Error getting patient management stats: {e}")
+            return stats
+    
+    async def get_admin_dashboard_stats(self, recent_since=None):
+        """Get the admin dashboard statistics (read from the daily_stats rollup)"""
+        summary = await self.get_daily_stats_summary(recent_since=recent_since)
+        
+        return {
+            'total_patients': summary['total_patients'],
+            'recent_patients': summary['recent_patients'],
+            'male_patients': summary['male_patients'],
+            'female_patients': summary['female_patients'],
+            'age_groups': summary['age_groups'],
+            'hospital_stats': summary['hospital_stats']
+        }
+    
+    async def get_hospitals_list(self):
+        """Get list of all hospitals with patient counts"""
+        try:
+            if not self.is_connected():
+                raise Exception("Database not connected")
+            
+            pipeline = [
+                {
+                    "$group": {
+                        "_id": "$selected_hospital",
+                        "patient_count": {"$sum": 1},
+                        "latest_patient": {"$max": "$timestamp"}
+                    }
+                },
+                {
+                    "$sort": {"patient_count": -1}
+                }
+            ]
+            
+            results = await self.db.patients.aggregate(pipeline).to_list(None)
+            
+            return [
+                {
+                    'hospital_name': result['_id'],
+                    'patient_count': result['patient_count'],
+                    'latest_patient': result['latest_patient']
+                }
+                for result in results
+            ]
+        
+        except Exception as e:
+            print(f"❌ Error getting hospitals list: {e}")
+            return []
+    
+    # DAILY STATISTICS ROLLUP
+    async def _update_daily_stats(self, patient, sign=1):
+        """Apply a patient's contribution to the daily_stats rollup with an atomic $inc"""
+        try:
+            await self.db.daily_stats.update_one(
+                self._daily_stats_key(patient),
+                {
+                    '$inc': self._daily_stats_increments(patient, sign),
+                    '$set': {'updated_at': datetime.now()}
+                },
+                upsert=True
+            )
+        except Exception as e:
+            print(f"⚠️ Error updating daily stats: {e}")
+    
+    async def _update_daily_stats_bulk(self, patients, sign=1, previous=None):
+        """Apply many patients to the daily_stats rollup with one unordered bulk_write"""
+        if not patients:
+            return
+        
+        operations = self._daily_stats_bulk_operations(patients, sign)
+        if previous:
+            operations = self._daily_stats_bulk_operations(previous, -sign) + operations
+        
+        try:
+            await self.db.daily_stats.bulk_write(operations, ordered=False)
+        except Exception as e:
+            print(f"⚠️ Error updating daily stats: {e}")
+    
+    async def _remove_from_daily_stats(self, targets, deleted_count):
+        """Take deleted patients out of the rollup, recomputing it if some were already gone"""
+        if deleted_count == len(targets):
+            await self._update_daily_stats_bulk(targets, -1)
+        else:
+            print(f"⚠️ {len(targets) - deleted_count} patients were deleted concurrently; recomputing their rollups")
+            await self.recompute_daily_stats([self._daily_stats_key(patient) for patient in targets])
+    
+    async def recompute_daily_stats(self, keys):
+        """Recompute some (hospital, date) rollups from the patients collection; returns how many"""
+        if not self.is_connected():
+            return 0
+        
+        projection = {field: 1 for field in DAILY_STATS_FIELDS}
+        unique_keys = {(key['hospital'], key['date']): key for key in keys}
+        try:
+            for key in unique_keys.values():
+                key = {'hospital': key['hospital'], 'date': key['date']}
+                patients = await self.db.patients.find(self._daily_stats_key_query(key), projection).to_list(None)
+                rollups = self._build_daily_stats(patient for patient in patients if self._daily_stats_key(patient) == key)
+                doc = rollups.get((key['hospital'], key['date']))
+                if doc:
+                    await self.db.daily_stats.replace_one(key, doc, upsert=True)
+                else:
+                    await self.db.daily_stats.delete_one(key)
+            return len(unique_keys)
+        except Exception as e:
+            print(f"❌ Error recomputing daily stats: {e}")
+            return 0
+    
+    async def rebuild_daily_stats(self):
+        """Recompute the daily_stats rollup in a staging collection and rename it over daily_stats"""
+        if not self.is_connected():
+            return 0
+        
+        staging = self.db[DAILY_STATS_STAGING]
+        try:
+            started_at = datetime.now()
+            projection = {field: 1 for field in DAILY_STATS_FIELDS}
+            rollups = self._build_daily_stats(await self.db.patients.find({}, projection).to_list(None))
+            
+            await staging.drop()
+            for spec in INDEX_SPECS['daily_stats']:
+                await staging.create_index(spec['keys'], name=index_name(spec), **index_options(spec))
+            if rollups:
+                await staging.insert_many(list(rollups.values()))
+            await staging.rename('daily_stats', dropTarget=True)
+            
+            # Registrations after the scan were counted in the collection just replaced
+            late = await self.db.patients.find({'created_at': {'$gte': started_at}}, projection).to_list(None)
+            await self.recompute_daily_stats([self._daily_stats_key(patient) for patient in late])
+            
+            print(f"✅ Rebuilt daily stats: {len(rollups)} (hospital, date) rollups")
+            return len(rollups)
+        
+        except Exception as e:
+            print(f"❌ Error rebuilding daily stats: {e}")
+            try:
+                await staging.drop()
+            except Exception:
+                pass
+            return 0
+    
+    async def ensure_daily_stats(self):
+        """Build the daily_stats rollup once if patients exist but no rollup does"""
+        if not self.is_connected():
+            return False
+        
+        try:
+            if await self.db.daily_stats.estimated_document_count() == 0 and \
+                    await self.db.patients.estimated_document_count() > 0:
+                print("📊 Daily stats rollup is empty, rebuilding from patients...")
+                await self.rebuild_daily_stats()
+            return True
+        except Exception as e:
+            print(f"❌ Error checking daily stats: {e}")
+            return False
+    
+    async def get_daily_stats_summary(self, hospital_name=None, recent_since=None):
+        """Sum the daily_stats rollup documents into dashboard counters"""
+        try:
+            if not self.is_connected():
+                raise Exception("Database not connected")
+            
+            query = {}
+            if hospital_name:
+                query['hospital'] = hospital_name
+            
+            docs = await self.db.daily_stats.find(query).to_list(None)
+            return self._summarize_daily_stats(docs, recent_since)
+        
+        except Exception as e:
+            print(f"❌ Error getting daily stats summary: {e}")
+            return self._summarize_daily_stats([])
+    
+    # TOKEN AND SLOT MANAGEMENT
+    async def get_next_token_for_hospital(self, hospital_name):
+        """Get next available token number for a hospital"""
+        try:
+            if not self.is_connected():
+                raise Exception("Database not connected")
+            
+            result = await self.db.patients.find_one(
+                {"selected_hospital": hospital_name},
+                sort=[("token_number", -1)]
+            )
+            
+            if result and 'token_number' in result:
+                return result['token_number'] + 1
+            
+            return 1  # First token for this hospital
+        
+        except Exception as e:
+            print(f"❌ Error getting next token: {e}")
+            return 1
+    
+    async def get_patients_in_slot(self, hospital_name, slot_number, projection=None):
+        """Get all patients in a specific time slot for a hospital"""
+        try:
+            if not self.is_connected():
+                raise Exception("Database not connected")
+            
+            cursor = self.db.patients.find({
+                "selected_hospital": hospital_name,
+                "slot_number": slot_number
+            }, resolve_projection(projection)).sort("token_number", 1)
+            
+            return self._stringify_ids(await cursor.to_list(None))
+        
+        except Exception as e:
+            print(f"❌ Error getting patients in slot: {e}")
+            return []
+    
+    # USER MANAGEMENT (for future expansion)
+    async def save_user(self, user_data, user_type):
+        """Save user data (doctors, admins)"""
+        try:
+            if not self.is_connected():
+                raise Exception("Database not connected")
+            
+            user_data['created_at'] = datetime.now()
+            
+            result = await self.db[f"{user_type}s"].insert_one(user_data)
+            user_data['_id'] = str(result.inserted_id)
+            if user_type == 'doctor':
+                await self._bump_cache_version('doctors_by_hospital')
+            
+            return user_data
+        
+        except Exception as e:
+            print(f"❌ Error saving {user_type}: {e}")
+            return None
+    
+    # DATA MIGRATION FROM JSON
+    async def migrate_from_json(self, json_file_path):
+        """Migrate existing JSON data to MongoDB"""
+        try:
+            if not self.is_connected():
+                raise Exception("Database not connected")
+            
+            if not os.path.exists(json_file_path):
+                print(f"⚠️ JSON file not found: {json_file_path}")
+                return False
+            
+            with open(json_file_path, 'r') as f:
+                json_data = json.load(f)
+            
+            if not json_data:
+                print(f"⚠️ No data found in {json_file_path}")
+                return True
+            
+            for patient_data in json_data:
+                if '_id' in patient_data:
+                    del patient_data['_id']
+                
+                patient_data['created_at'] = datetime.now()
+                patient_data['migrated_from_json'] = True
+            
+            result = await self.db.patients.insert_many(json_data)
+            
+            print(f"✅ Migrated {len(result.inserted_ids)} patients from {json_file_path}")
+            await self.rebuild_daily_stats()
+            return True
+        
+        except Exception as e:
+            print(f"❌ Error migrating from JSON: {e}")
+            return False
+    
+    async def close_connection(self):
+        """Close MongoDB connection"""
+        if self.audit_log:
+            await self.audit_log.stop()
+        if self.last_logins:
+            await self.last_logins.stop()
+        if self.monitor:
+            await self.monitor.stop()
+        if self.client:
+            self.client.close()
+            print("🔐 MongoDB connection closed")
+    
+    async def clear_all_patients(self):
+        """Clear all patient records in bounded _id-range chunks; returns the number removed
+        
+        Background purge jobs (start_patient_purge) are run by the sync manager.
+        """
+        if not self.is_connected():
+            return 0
+        
+        try:
+            removed = await self._purge_patients_chunked()
+            print(f"🧹 Cleared {removed} patient records")
+            return removed
+        except Exception as e:
+            print(f"❌ Error clearing patients: {e}")
+            return 0
+    
+    async def _purge_patients_chunked(self, chunk_size=None):
+        """Delete every patient in ascending _id-range chunks, taking each chunk out of daily_stats"""
+        chunk_size = chunk_size or int(os.getenv('MONGODB_PURGE_CHUNK_SIZE', '5000'))
+        projection = {field: 1 for field in DAILY_STATS_FIELDS}
+        
+        removed = 0
+        last_id = None
+        while True:
+            query = {'_id': {'$gt': last_id}} if last_id is not None else {}
+            targets = await self.db.patients.find(query, projection).sort('_id', 1).limit(chunk_size).to_list(None)
+            if not targets:
+                break
+            
+            ids = [patient['_id'] for patient in targets]
+            result = await self.db.patients.delete_many({'_id': {'$gte': ids[0], '$lte': ids[-1], '$in': ids}})
+            await self._remove_from_daily_stats(targets, result.deleted_count)
+            removed += result.deleted_count
+            last_id = ids[-1]
+        
+        return removed
+    
+    async def log_admin_action(self, action_data):
+        """Queue an admin action for the audit log; returns False if it was not accepted"""
+        if not self.is_connected() or self.audit_log is None:
+            return False
+        
+        action_data['logged_at'] = datetime.now()
+        return self.audit_log.submit(action_data)
+    
+    async def _seed_token_counter(self, hospital_name, date_str):
+        """Create the day's token counter, starting after any tokens already issued that day"""
+        pipeline = self._token_seed_pipeline(hospital_name, date_str)
+        result = await self.db.patients.aggregate(pipeline).to_list(None)
+        issued = result[0]['max_token'] if result and result[0]['max_token'] is not None else 0
+        
+        try:
+            await self.db.token_counters.insert_one({
+                'hospital': hospital_name,
+                'date': date_str,
+                'seq': int(issued),
+                'created_at': datetime.now()
+            })
+        except DuplicateKeyError:
+            # Another worker seeded the counter first
+            pass
+    
+    async def _increment_token_counter(self, hospital_name, date_str, count=1):
+        """Atomically advance the (hospital, date) token counter and return its new value"""
+        counter = await self.db.token_counters.find_one_and_update(
+            {'hospital': hospital_name, 'date': date_str},
+            {'$inc': {'seq': count}, '$set': {'updated_at': datetime.now()}},
+            return_document=ReturnDocument.AFTER
+        )
+        
+        if counter is None:
+            # First token of the day for this hospital
+            await self._seed_token_counter(hospital_name, date_str)
+            counter = await self.db.token_counters.find_one_and_update(
+                {'hospital': hospital_name, 'date': date_str},
+                {'$inc': {'seq': count}, '$set': {'updated_at': datetime.now()}},
+                return_document=ReturnDocument.AFTER
+            )
+        
+        return counter['seq']
+    
+    async def reserve_token_range(self, hospital_name, date_str, count):
+        """Atomically reserve ``count`` consecutive token numbers and return the first one"""
+        if not self.is_connected():
+            return None
+        
+        try:
+            last_token = await self._increment_token_counter(hospital_name, date_str, count)
+            first_token = last_token - count + 1
+            
+            print(f"🎫 Reserved tokens {first_token}-{last_token} for {hospital_name} on {date_str}")
+            return first_token
+        
+        except Exception as e:
+            print(f"❌ Error reserving token range: {e}")
+            return None
+    
+    async def get_next_token_number(self, hospital_name, date_str):
+        """Get next token number for a specific hospital and date, or None if none could be reserved"""
+        if not self.is_connected():
+            return None
+        
+        try:
+            next_token = await self._increment_token_counter(hospital_name, date_str)
+            
+            print(f"🎫 Next token for {hospital_name} on {date_str}: {next_token}")
+            return next_token
+        
+        except Exception as e:
+            print(f"❌ Error getting next token number: {e}")
+            return None
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Bulk Ingestion Benchmark
+Compares the single-form registration path (assign_token_and_slot + insert_one
+per patient) against DatabaseManager.save_patients_bulk on the same data, and
+per-patient delete_patient calls against one delete_patients bulk_write.
+
+Usage:
+    python benchmark_bulk_ingest.py --count 2000
+"""
+
+import argparse
+import time
+
+from app import db_manager, save_form_data, prepare_patient_form_data, get_slot_for_token
+
+def make_patients(count, hospital):
+    """Build count synthetic patient forms"""
+    return [
+        prepare_patient_form_data({
+            'firstName': f"Bench{i}",
+            'lastName': 'Patient',
+            'dateOfBirth': '1985-06-15',
+            'gender': 'female' if i % 2 else 'male',
+            'countryCode': '+91',
+            'phone': '9000000000',
+            'symptoms': 'benchmark'
+        }, hospital)
+        for i in range(count)
+    ]
+
+def patient_ids(hospital):
+    """ObjectIds of the benchmark patients"""
+    return [p['_id'] for p in db_manager.db.patients.find({'selected_hospital': hospital}, {'_id': 1})]
+
+def cleanup(hospital):
+    """Remove benchmark patients, counters and rollups"""
+    db_manager.db.patients.delete_many({'selected_hospital': hospital})
+    db_manager.db.token_counters.delete_many({'hospital': hospital})
+    db_manager.db.daily_stats.delete_many({'hospital': hospital})
+
+def main():
+    parser = argparse.ArgumentParser(description='Single-form vs bulk patient ingestion benchmark')
+    parser.add_argument('--count', type=int, default=2000, help='Patients per run')
+    parser.add_argument('--hospital', default='Bulk Benchmark Hospital', help='Hospital name used for the runs')
+    args = parser.parse_args()
+
+    if not db_manager.is_connected():
+        print('MongoDB not connected')
+        return 1
+
+    cleanup(args.hospital)
+
+    print(f"=== Single-form path: {args.count} patients ===")
+    patients = make_patients(args.count, args.hospital)
+    started = time.perf_counter()
+    for patient in patients:
+        save_form_data(patient)
+    single_elapsed = time.perf_counter() - started
+    
+    ids = patient_ids(args.hospital)
+    started = time.perf_counter()
+    for patient_id in ids:
+        db_manager.delete_patient(patient_id, args.hospital)
+    single_delete_elapsed = time.perf_counter() - started
+    cleanup(args.hospital)
+
+    print(f"\n=== Bulk path: {args.count} patients ===")
+    patients = make_patients(args.count, args.hospital)
+    started = time.perf_counter()
+    results = db_manager.save_patients_bulk(patients, assign_slot=get_slot_for_token)
+    bulk_elapsed = time.perf_counter() - started
+    failed = sum(1 for r in results if not r['success'])
+    
+    ids = patient_ids(args.hospital)
+    started = time.perf_counter()
+    deleted = db_manager.delete_patients(ids, hospital_name=args.hospital)
+    bulk_delete_elapsed = time.perf_counter() - started
+    cleanup(args.hospital)
+
+    single_rate = args.count / single_elapsed
+    bulk_rate = args.count / bulk_elapsed
+
+    print("\n=== Results ===")
+    print(f"Single-form: {single_elapsed:.2f}s ({single_rate:.1f} patients/s)")
+    print(f"Bulk:        {bulk_elapsed:.2f}s ({bulk_rate:.1f} patients/s, {failed} failed)")
+    print(f"Speedup:     {bulk_rate / single_rate:.1f}x")
+    print(f"Delete one by one: {single_delete_elapsed:.2f}s")
+    print(f"delete_patients:   {bulk_delete_elapsed:.2f}s ({deleted} deleted, "
+          f"{single_delete_elapsed / max(bulk_delete_elapsed, 1e-9):.1f}x faster)")
+    return 0
+
+if __name__ == '__main__':
+    raise SystemExit(main())
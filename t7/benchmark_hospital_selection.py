@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Hospital Selection Render Benchmark
+Renders /patient/hospital-selection through the Flask test client and counts
+the MongoDB commands each render sends, with the hospital and doctor caches
+cold (invalidated before every render) and warm.
+
+Usage:
+    python benchmark_hospital_selection.py --renders 200
+"""
+
+import argparse
+import threading
+import time
+
+from pymongo import monitoring
+
+class CommandCounter(monitoring.CommandListener):
+    """Counts commands sent from the benchmark thread (heartbeats and writers are ignored)"""
+    
+    def __init__(self):
+        self.thread_id = threading.get_ident()
+        self.commands = {}
+    
+    def started(self, event):
+        if threading.get_ident() == self.thread_id:
+            self.commands[event.command_name] = self.commands.get(event.command_name, 0) + 1
+    
+    def succeeded(self, event):
+        pass
+    
+    def failed(self, event):
+        pass
+    
+    def take(self):
+        commands, self.commands = self.commands, {}
+        return commands
+
+def run(client, db, counter, renders, cold):
+    """Render the page ``renders`` times; returns (avg ms, commands per render, command mix)"""
+    counter.take()
+    elapsed = 0.0
+    for _ in range(renders):
+        if cold:
+            for cache in db.caches.values():
+                cache.invalidate()
+        started = time.perf_counter()
+        response = client.get('/patient/hospital-selection')
+        elapsed += time.perf_counter() - started
+        if response.status_code != 200:
+            raise RuntimeError(f"hospital-selection returned {response.status_code}")
+    commands = counter.take()
+    return elapsed * 1000 / renders, sum(commands.values()) / renders, commands
+
+def main():
+    parser = argparse.ArgumentParser(description='DB commands per hospital-selection render, cold vs warm caches')
+    parser.add_argument('--renders', type=int, default=200, help='Renders per phase')
+    args = parser.parse_args()
+    
+    # Must be registered before the MongoClient is created
+    counter = CommandCounter()
+    monitoring.register(counter)
+    
+    from app import create_app
+    from database import get_db
+    
+    app = create_app()
+    db = get_db()
+    if not db.is_connected():
+        print('MongoDB not connected')
+        return 1
+    
+    client = app.test_client()
+    client.get('/patient/hospital-selection')
+    
+    print(f"=== /patient/hospital-selection, {args.renders} renders per phase ===")
+    print(f"{'phase':<8} {'avg ms':>8} {'cmds/render':>12}  commands")
+    for phase, cold in (('cold', True), ('warm', False)):
+        avg_ms, per_render, commands = run(client, db, counter, args.renders, cold)
+        mix = ', '.join(f"{name}={count}" for name, count in sorted(commands.items())) or 'none'
+        print(f"{phase:<8} {avg_ms:8.2f} {per_render:12.2f}  {mix}")
+    
+    print("\nWarm renders only re-check cache versions (one find_one on system_config per cache)")
+    print("every MONGODB_CACHE_VERSION_CHECK_INTERVAL seconds; in between they send no commands.")
+    for status in db.get_cache_stats():
+        print(f"   {status['name']}: {status['hits']} hits, {status['misses']} misses, "
+              f"{status['version_checks']} version checks")
+    return 0
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+"""
+Patient Search Benchmark
+Seeds a scratch database with synthetic patients, builds the INDEX_SPECS
+indexes (including the patient_text_search text index) and times
+DatabaseManager.search_patients for a mix of name, symptom, medication and
+history queries, scoped to one hospital as /doctor/patients/search does.
+A case-insensitive $regex scan over the same fields is timed as the baseline.
+
+Usage:
+    python benchmark_patient_search.py --count 1000000
+    python benchmark_patient_search.py --count 1000000 --reuse --no-baseline
+"""
+
+import argparse
+import os
+import random
+import re
+import time
+from datetime import datetime, timedelta
+
+from database import DatabaseManager, PATIENT_PROJECTIONS
+
+FIRST_NAMES = ['Aarav', 'Priya', 'Rohan', 'Ananya', 'Vikram', 'Meera', 'Arjun', 'Kavya', 'Rahul', 'Sneha',
+               'Karan', 'Isha', 'Aditya', 'Pooja', 'Nikhil', 'Divya', 'Sanjay', 'Neha', 'Amit', 'Riya']
+LAST_NAMES = ['Sharma', 'Patel', 'Reddy', 'Iyer', 'Gupta', 'Nair', 'Singh', 'Khan', 'Das', 'Mehta',
+              'Joshi', 'Rao', 'Kulkarni', 'Bose', 'Menon', 'Chopra', 'Verma', 'Pillai', 'Shah', 'Malhotra']
+SYMPTOMS = ['fever', 'persistent cough', 'headache', 'chest pain', 'shortness of breath', 'nausea',
+            'back pain', 'dizziness', 'fatigue', 'sore throat', 'abdominal pain', 'skin rash',
+            'joint swelling', 'blurred vision', 'palpitations', 'insomnia']
+MEDICATIONS = ['paracetamol', 'ibuprofen', 'amoxicillin', 'metformin', 'amlodipine', 'atorvastatin',
+               'omeprazole', 'salbutamol', 'cetirizine', 'levothyroxine', 'none']
+HISTORY = ['diabetes', 'hypertension', 'asthma', 'thyroid disorder', 'appendectomy', 'migraine',
+           'tuberculosis', 'kidney stones', 'none']
+
+# Common, rare, name and multi-term queries
+QUERIES = ['fever', 'cough', 'palpitations', 'tuberculosis', 'metformin', 'Sharma', 'Kavya Menon',
+           'chest pain hypertension', 'asthma salbutamol', 'blurred vision diabetes']
+
+def percentile(values, pct):
+    """Nearest-rank percentile of a sorted list"""
+    if not values:
+        return 0.0
+    rank = max(int(round(pct / 100.0 * len(values))) - 1, 0)
+    return values[min(rank, len(values) - 1)]
+
+def make_patient(rng, hospitals, now):
+    created_at = now - timedelta(minutes=rng.randrange(60 * 24 * 365))
+    return {
+        'firstName': rng.choice(FIRST_NAMES),
+        'lastName': rng.choice(LAST_NAMES),
+        'age': rng.randrange(1, 95),
+        'gender': rng.choice(['male', 'female']),
+        'phone': f"9{rng.randrange(10 ** 9):09d}",
+        'selected_hospital': rng.choice(hospitals),
+        'symptoms': ', '.join(rng.sample(SYMPTOMS, rng.randrange(1, 4))),
+        'medications': ', '.join(rng.sample(MEDICATIONS, rng.randrange(1, 3))),
+        'medicalHistory': ', '.join(rng.sample(HISTORY, rng.randrange(1, 3))),
+        'created_at': created_at,
+        'timestamp': created_at.strftime("%Y-%m-%d %H:%M:%S")
+    }
+
+def seed(db, count, hospitals, batch_size=10000):
+    """Insert count synthetic patients in insert_many batches"""
+    rng = random.Random(42)
+    now = datetime.now()
+    started = time.perf_counter()
+    for offset in range(0, count, batch_size):
+        batch = [make_patient(rng, hospitals, now) for _ in range(min(batch_size, count - offset))]
+        db.db.patients.insert_many(batch, ordered=False)
+        if (offset // batch_size) % 10 == 0:
+            print(f"   {offset + len(batch)}/{count} inserted")
+    return time.perf_counter() - started
+
+def time_queries(run, queries, repeat):
+    """Run each query ``repeat`` times; returns sorted latencies and the result sizes"""
+    latencies, sizes = [], {}
+    for query in queries:
+        for _ in range(repeat):
+            started = time.perf_counter()
+            sizes[query] = run(query)
+            latencies.append(time.perf_counter() - started)
+    return sorted(latencies), sizes
+
+def regex_search(db, query, hospital, limit):
+    """What search costs without the text index: every term as a case-insensitive regex"""
+    terms = [re.escape(term) for term in query.split()]
+    pattern = '|'.join(terms)
+    fields = ('firstName', 'lastName', 'symptoms', 'medications', 'medicalHistory')
+    cursor = db.db.patients.find(
+        {'selected_hospital': hospital, '$or': [{field: {'$regex': pattern, '$options': 'i'}} for field in fields]},
+        PATIENT_PROJECTIONS['card']
+    ).limit(limit)
+    return len(list(cursor))
+
+def main():
+    parser = argparse.ArgumentParser(description='Full-text patient search latency benchmark')
+    parser.add_argument('--count', type=int, default=1000000, help='Synthetic patients to seed')
+    parser.add_argument('--hospitals', type=int, default=20, help='Hospitals the patients are spread over')
+    parser.add_argument('--limit', type=int, default=25, help='Results per page')
+    parser.add_argument('--repeat', type=int, default=5, help='Runs per query')
+    parser.add_argument('--database', default='hospital_management_search_bench', help='Scratch database name')
+    parser.add_argument('--reuse', action='store_true', help='Keep existing data if the count matches')
+    parser.add_argument('--keep', action='store_true', help='Do not drop the scratch database afterwards')
+    parser.add_argument('--no-baseline', action='store_true', help='Skip the $regex baseline')
+    args = parser.parse_args()
+    
+    db = DatabaseManager(os.getenv('MONGODB_URI', 'mongodb://localhost:27017/'), args.database)
+    if not db.is_connected():
+        print('MongoDB not connected')
+        return 1
+    
+    hospitals = [f"Search Bench Hospital {i + 1}" for i in range(args.hospitals)]
+    hospital = hospitals[0]
+    
+    try:
+        existing = db.db.patients.estimated_document_count()
+        if args.reuse and existing == args.count:
+            print(f"♻️ Reusing {existing} patients in {args.database}")
+        else:
+            db.client.drop_database(args.database)
+            print(f"=== Seeding {args.count} patients over {args.hospitals} hospitals ===")
+            elapsed = seed(db, args.count, hospitals)
+            print(f"Seeded in {elapsed:.1f}s ({args.count / elapsed:.0f} patients/s)")
+        
+        started = time.perf_counter()
+        result = db.ensure_indexes(collections=['patients'])
+        print(f"Indexes: {len(result['created'])} built in {time.perf_counter() - started:.1f}s, "
+              f"{result['existing']} existing, {len(result['failed'])} failed")
+        
+        # Warm the text index before timing
+        for query in QUERIES:
+            db.search_patients(query, hospital, limit=args.limit)
+        
+        print(f"\n=== search_patients, {len(QUERIES)} queries x {args.repeat} ===")
+        first_page, sizes = time_queries(
+            lambda q: len(db.search_patients(q, hospital, limit=args.limit, projection='card')['patients']),
+            QUERIES, args.repeat)
+        deep_page, _ = time_queries(
+            lambda q: len(db.search_patients(q, hospital, limit=args.limit, skip=args.limit * 9,
+                                             projection='card')['patients']),
+            QUERIES, args.repeat)
+        
+        plan = db.db.patients.find(db._search_query('cough', hospital)).limit(args.limit).explain()
+        stats = plan.get('executionStats', {})
+        
+        rows = [('page 1', first_page), ('page 10', deep_page)]
+        if not args.no_baseline:
+            print(f"=== $regex baseline, {len(QUERIES)} queries x {args.repeat} ===")
+            baseline, _ = time_queries(lambda q: regex_search(db, q, hospital, args.limit), QUERIES, args.repeat)
+            rows.append(('$regex scan', baseline))
+    finally:
+        if not args.keep:
+            db.client.drop_database(args.database)
+        db.close_connection()
+    
+    print(f"\n=== Results: {args.count} patients, scoped to '{hospital}' ===")
+    print(f"{'search':<14} {'p50 ms':>8} {'p99 ms':>8} {'max ms':>8}")
+    for label, latencies in rows:
+        print(f"{label:<14} {percentile(latencies, 50) * 1000:8.1f} {percentile(latencies, 99) * 1000:8.1f} "
+              f"{latencies[-1] * 1000:8.1f}")
+    print("\nResults on page 1: " + ', '.join(f"{q!r}={n}" for q, n in sizes.items()))
+    if stats:
+        print(f"'cough' plan: {stats.get('totalKeysExamined')} keys, {stats.get('totalDocsExamined')} docs examined")
+    return 0
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+Worker Model Benchmark
+Starts gunicorn with each worker model in turn and drives /doctor/patients
+with concurrent logged-in clients, reporting throughput and latency.
+
+Models are given as class:workers or class:workersxthreads, e.g.
+    python benchmark_workers.py --models sync:4 gthread:2x8 gthread:4x4 gevent:4
+    python benchmark_workers.py --clients 32 --duration 20
+"""
+
+import argparse
+import http.cookiejar
+import os
+import subprocess
+import sys
+import threading
+import time
+import urllib.parse
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+def percentile(values, pct):
+    """Nearest-rank percentile of a sorted list"""
+    if not values:
+        return 0.0
+    rank = max(int(round(pct / 100.0 * len(values))) - 1, 0)
+    return values[min(rank, len(values) - 1)]
+
+def parse_model(model):
+    """'gthread:2x8' -> ('gthread', 2, 8); 'sync:4' -> ('sync', 4, 1)"""
+    worker_class, _, size = model.partition(':')
+    workers, _, threads = (size or '4').partition('x')
+    return worker_class, int(workers), int(threads or 1)
+
+def start_server(worker_class, workers, threads, port):
+    """Launch gunicorn with the production config and the given worker model"""
+    env = dict(os.environ,
+               GUNICORN_BIND=f"127.0.0.1:{port}",
+               GUNICORN_WORKER_CLASS=worker_class,
+               WEB_CONCURRENCY=str(workers),
+               GUNICORN_THREADS=str(threads),
+               GUNICORN_MAX_REQUESTS='0')
+    return subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py', 'wsgi:app'],
+        cwd=HERE, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+
+def wait_until_up(base_url, timeout=30):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            urllib.request.urlopen(f"{base_url}/", timeout=2).read()
+            return True
+        except Exception:
+            time.sleep(0.2)
+    return False
+
+def make_doctor_opener(base_url, username, password):
+    """Cookie-aware opener logged in as a doctor"""
+    opener = urllib.request.build_opener(urllib.request.HTTPCookieProcessor(http.cookiejar.CookieJar()))
+    body = urllib.parse.urlencode({'username': username, 'password': password}).encode()
+    opener.open(f"{base_url}/doctor/login", data=body, timeout=10).read()
+    return opener
+
+def drive(base_url, clients, duration, username, password):
+    """Hit /doctor/patients from ``clients`` threads for ``duration`` seconds"""
+    local = threading.local()
+    deadline = time.perf_counter() + duration
+    path = f"{base_url}/doctor/patients"
+    
+    def client_loop(_):
+        if not hasattr(local, 'opener'):
+            local.opener = make_doctor_opener(base_url, username, password)
+        latencies, errors = [], 0
+        while time.perf_counter() < deadline:
+            started = time.perf_counter()
+            try:
+                response = local.opener.open(path, timeout=30)
+                response.read()
+                if response.status != 200:
+                    errors += 1
+                    continue
+                latencies.append(time.perf_counter() - started)
+            except Exception:
+                errors += 1
+        return latencies, errors
+    
+    with ThreadPoolExecutor(max_workers=clients) as executor:
+        results = list(executor.map(client_loop, range(clients)))
+    
+    latencies = sorted(l for result in results for l in result[0])
+    errors = sum(result[1] for result in results)
+    return latencies, errors
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare gunicorn worker models on /doctor/patients')
+    parser.add_argument('--models', nargs='+', default=['sync:4', 'gthread:2x8', 'gthread:4x4'],
+                        help='Worker models as class:workers[xthreads]')
+    parser.add_argument('--clients', type=int, default=16, help='Concurrent client threads')
+    parser.add_argument('--duration', type=float, default=15, help='Seconds per model')
+    parser.add_argument('--port', type=int, default=5055, help='Port for the benchmark server')
+    parser.add_argument('--username', default='dr_smith', help='Doctor login')
+    parser.add_argument('--password', default='doctor123', help='Doctor password')
+    args = parser.parse_args()
+    
+    base_url = f"http://127.0.0.1:{args.port}"
+    rows = []
+    
+    for model in args.models:
+        worker_class, workers, threads = parse_model(model)
+        print(f"🚀 {model}: {workers} workers x {threads} threads ({worker_class}), {args.clients} clients for {args.duration:.0f}s")
+        
+        server = start_server(worker_class, workers, threads, args.port)
+        try:
+            if not wait_until_up(base_url):
+                print(f"❌ {model}: server did not start (is the worker class installed?)")
+                continue
+            # Warm every worker's lazy MongoDB connection before timing
+            drive(base_url, workers * threads, 2, args.username, args.password)
+            latencies, errors = drive(base_url, args.clients, args.duration, args.username, args.password)
+        finally:
+            server.terminate()
+            server.wait(timeout=30)
+        
+        rows.append((model, len(latencies) / args.duration, percentile(latencies, 50),
+                     percentile(latencies, 99), errors))
+    
+    print("\n=== Results: /doctor/patients ===")
+    print(f"{'model':<14} {'req/s':>8} {'p50 ms':>8} {'p99 ms':>8} {'errors':>7}")
+    for model, throughput, p50, p99, errors in rows:
+        print(f"{model:<14} {throughput:8.1f} {p50 * 1000:8.1f} {p99 * 1000:8.1f} {errors:7d}")
+    return 0
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+Database Bootstrap
+Creates the default hospitals, doctors and admins, builds the indexes in
+INDEX_SPECS and the daily statistics rollup. Run once per deployment
+instead of at every worker start.
+
+Usage:
+    python bootstrap.py
+    python bootstrap.py --skip-indexes
+"""
+
+import argparse
+
+from database import DatabaseManager
+
+DEFAULT_HOSPITALS = [
+    {'hospital_id': 'hospital1', 'name': 'City General Hospital', 'description': 'Emergency & Trauma Center'},
+    {'hospital_id': 'hospital2', 'name': 'Central Medical Center', 'description': 'Comprehensive Healthcare Services'},
+    {'hospital_id': 'hospital3', 'name': 'Specialized Cardiac Care', 'description': 'Heart & Cardiovascular Treatment'},
+    {'hospital_id': 'hospital4', 'name': 'Women\'s Health Clinic', 'description': 'Gynecology & Maternity Care'},
+    {'hospital_id': 'hospital5', 'name': 'Pediatric Medical Center', 'description': 'Children\'s Healthcare & Family Medicine'}
+]
+
+DEFAULT_DOCTORS = [
+    {'username': 'dr_smith', 'password': 'doctor123', 'display_name': 'Dr. Smith', 'department': 'General Medicine'},
+    {'username': 'dr_johnson', 'password': 'medical456', 'display_name': 'Dr. Johnson', 'department': 'Cardiology'},
+    {'username': 'dr_brown', 'password': 'doctor789', 'display_name': 'Dr. Brown', 'department': 'MBBS,MD'},
+    {'username': 'dr_davis', 'password': 'doctor456', 'display_name': 'Dr. Davis', 'department': 'Gynecologist'}
+]
+
+DEFAULT_ADMINS = [
+    {'username': 'admin', 'password': 'admin123', 'display_name': 'System Admin'},
+    {'username': 'superadmin', 'password': 'super456', 'display_name': 'Super Admin'},
+    {'username': 'hospital_admin', 'password': 'hospital789', 'display_name': 'Hospital Admin'}
+]
+
+def seed_defaults(db_manager):
+    """Ensure MongoDB has the default hospitals, doctors and admins"""
+    print("🔍 Initializing MongoDB database...")
+    
+    if not db_manager.is_connected():
+        print("❌ MongoDB not connected. Skipping default data.")
+        return False
+    
+    # Check if we have any hospitals configured
+    if not db_manager.get_all_hospitals_config():
+        print("📋 Creating default hospitals in MongoDB...")
+        for hospital in DEFAULT_HOSPITALS:
+            db_manager.add_hospital_config(dict(hospital))
+        print(f"✅ Created {len(DEFAULT_HOSPITALS)} default hospitals in MongoDB")
+    
+    # Check if we have any doctors configured
+    if not db_manager.get_all_users('doctor'):
+        print("👩‍⚕️ Creating default doctors in MongoDB...")
+        for doctor in DEFAULT_DOCTORS:
+            db_manager.create_user(doctor['username'], doctor['password'], 'doctor', {
+                'display_name': doctor['display_name'],
+                'department': doctor['department'],
+                'status': 'active'
+            })
+        print(f"✅ Created {len(DEFAULT_DOCTORS)} default doctors in MongoDB")
+    
+    # Check if we have any admins configured
+    if not db_manager.get_all_users('admin'):
+        print("👨‍💼 Creating default admins in MongoDB...")
+        for admin in DEFAULT_ADMINS:
+            db_manager.create_user(admin['username'], admin['password'], 'admin', {
+                'display_name': admin['display_name'],
+                'status': 'active'
+            })
+        print(f"✅ Created {len(DEFAULT_ADMINS)} default admins in MongoDB")
+    
+    # Build the daily statistics rollup for data that predates it
+    db_manager.ensure_daily_stats()
+    
+    print("✅ MongoDB initialization completed successfully")
+    return True
+
+def main():
+    parser = argparse.ArgumentParser(description='Seed default data and build indexes')
+    parser.add_argument('--skip-indexes', action='store_true', help='Do not build the INDEX_SPECS indexes')
+    args = parser.parse_args()
+    
+    # Indexes are built below, in the foreground, so close_connection never races a build
+    db = DatabaseManager(build_indexes=False)
+    if not db.is_connected():
+        print('MongoDB not connected')
+        return 1
+    
+    if args.skip_indexes:
+        print("⏭️ Skipping index build (--skip-indexes)")
+    else:
+        result = db.ensure_indexes()
+        print(f"🔨 Indexes: {len(result['created'])} created, {result['existing']} already present, {len(result['failed'])} failed")
+    
+    ok = seed_defaults(db)
+    db.close_connection()
+    return 0 if ok else 1
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+Index Drift Check
+Compares the live MongoDB indexes with the INDEX_SPECS registry in
+database.py and lists slow queries whose plan was a collection scan.
+
+Usage:
+    python check_indexes.py            # report only, exit 1 on drift
+    python check_indexes.py --create   # also build missing indexes
+"""
+
+import argparse
+
+from database import DatabaseManager
+
+def print_index_report(report):
+    """Print missing/extra/mismatched indexes; return True if anything drifted"""
+    drift = False
+    for collection_name, entry in sorted(report.items()):
+        if not (entry['missing'] or entry['extra'] or entry['mismatched']):
+            print(f"✅ {collection_name}: matches registry")
+            continue
+        
+        drift = True
+        print(f"⚠️ {collection_name}:")
+        for name in entry['missing']:
+            print(f"   - missing:    {name}")
+        for name in entry['extra']:
+            print(f"   - extra:      {name} (not in INDEX_SPECS)")
+        for mismatch in entry['mismatched']:
+            print(f"   - mismatched: {mismatch['name']}")
+            print(f"       expected {mismatch['expected']}")
+            print(f"       live     {mismatch['live']}")
+    return drift
+
+def print_collscans(collscans):
+    """Print the slow-query shapes that scanned whole collections"""
+    if not collscans:
+        print("✅ No collection scans in the slow query log")
+        return
+    
+    print(f"⚠️ {len(collscans)} slow query shapes ran a COLLSCAN:")
+    for row in collscans:
+        print(f"   - {row['method']} on {row.get('collection') or '?'}: {row['count']}x, max {row['max_ms']:.1f} ms")
+        print(f"       filter {row.get('filter_shape')}")
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare live indexes with the INDEX_SPECS registry')
+    parser.add_argument('--create', action='store_true', help='Create missing indexes before reporting')
+    parser.add_argument('--limit', type=int, default=20, help='Collection-scan shapes to list')
+    args = parser.parse_args()
+    
+    # Report-only unless --create; no background build racing the check
+    db = DatabaseManager(build_indexes=False)
+    if not db.is_connected():
+        print('MongoDB not connected')
+        return 1
+    
+    if args.create:
+        result = db.ensure_indexes()
+        print(f"🔨 Created {len(result['created'])} indexes, {len(result['failed'])} failed")
+    
+    print("\n=== Indexes vs registry ===")
+    drift = print_index_report(db.check_indexes())
+    
+    print("\n=== Collection scans in slow queries ===")
+    collscans = db.get_collscan_queries(limit=args.limit)
+    print_collscans(collscans)
+    
+    db.close_connection()
+    return 1 if drift or collscans else 0
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -3,28 +3,1176 @@ MongoDB Database Helper Module
 Handles all database operations for the hospital management system
 """
 
-from pymongo import MongoClient
-from datetime import datetime
+from pymongo import MongoClient, ReturnDocument, DeleteOne, UpdateMany, UpdateOne, monitoring
+from pymongo.errors import DuplicateKeyError, BulkWriteError
+from datetime import datetime, timedelta
 import os
+import threading
+import queue
+import time
+import functools
+import copy
+from collections import deque
+import base64
 from bson import ObjectId
+from bson.errors import InvalidId
 import json
 
+# Named projection profiles for patient list views (None fetches the full document)
+PATIENT_PROJECTIONS = {
+    # Patient management cards
+    'card': {
+        'firstName': 1, 'lastName': 1, 'age': 1, 'gender': 1, 'phone': 1,
+        'selected_hospital': 1, 'timestamp': 1, 'token_number': 1,
+        'slot_number': 1, 'time_range': 1, 'emergency_contact': 1, 'allergies': 1,
+        'reviewed': 1
+    },
+    # Token/slot board
+    'token_board': {
+        'firstName': 1, 'lastName': 1, 'selected_hospital': 1, 'timestamp': 1,
+        'token_number': 1, 'slot_number': 1, 'time_range': 1, 'position_in_slot': 1
+    },
+    # CSV exports
+    'export': {
+        'timestamp': 1, 'selected_hospital': 1, 'firstName': 1, 'lastName': 1,
+        'age': 1, 'gender': 1, 'phone': 1, 'address': 1, 'symptoms': 1,
+        'allergies': 1, 'medications': 1, 'medicalHistory': 1, 'emergencyName': 1,
+        'emergencyPhone': 1, 'emergencyRelation': 1, 'emergency_contact': 1
+    }
+}
+
+# Doctor fields behind the public hospital -> doctors index
+DOCTOR_INDEX_FIELDS = {'_id': 0, 'username': 1, 'display_name': 1, 'department': 1, 'assigned_hospital': 1}
+
+# Patient fields that feed the daily_stats rollup
+DAILY_STATS_FIELDS = ('selected_hospital', 'created_at', 'timestamp', 'gender', 'age', 'slot_number', 'token_number')
+
+# Patient fields the server stamps at registration; never taken from a client record
+SERVER_PATIENT_FIELDS = ('timestamp', 'created_at', 'token_number', 'token_date', 'slot_number', 'time_range',
+                         'start_time', 'end_time', 'position_in_slot', 'estimated_wait_time', 'status')
+
+# rebuild_daily_stats() fills this collection, then renames it over daily_stats
+DAILY_STATS_STAGING = 'daily_stats_rebuild'
+
+# Declarative index registry: every index the queries in this module rely on.
+# Names default to MongoDB's own "<field>_<direction>" naming.
+INDEX_SPECS = {
+    'patients': [
+        {'keys': [('selected_hospital', 1)]},
+        {'keys': [('timestamp', 1)]},
+        {'keys': [('created_at', 1)]},
+        # Keyset pagination on (timestamp, _id), per hospital and across hospitals
+        {'keys': [('selected_hospital', 1), ('timestamp', 1), ('_id', 1)]},
+        {'keys': [('timestamp', 1), ('_id', 1)]},
+        # Date-range counts and lists per hospital
+        {'keys': [('selected_hospital', 1), ('created_at', 1)]},
+        {'keys': [('token_number', 1)]},
+        {'keys': [('slot_number', 1)]},
+        {'keys': [('firstName', 1), ('lastName', 1)]},
+        # One token number per hospital per day, enforced by the storage layer
+        {
+            'keys': [('selected_hospital', 1), ('token_date', 1), ('token_number', 1)],
+            'name': 'unique_hospital_day_token',
+            'unique': True,
+            'partialFilterExpression': {'token_date': {'$exists': True}}
+        },
+        # Full-text search; a collection can only have one text index
+        {
+            'keys': [('firstName', 'text'), ('lastName', 'text'), ('symptoms', 'text'),
+                     ('medications', 'text'), ('medicalHistory', 'text')],
+            'name': 'patient_text_search',
+            'weights': {'firstName': 10, 'lastName': 10, 'symptoms': 5, 'medications': 3, 'medicalHistory': 1}
+        }
+    ],
+    'doctors': [{'keys': [('username', 1)], 'unique': True}],
+    'admins': [{'keys': [('username', 1)], 'unique': True}],
+    'patients_users': [{'keys': [('username', 1)], 'unique': True}],
+    'hospitals': [
+        {'keys': [('hospital_id', 1)], 'unique': True},
+        {'keys': [('name', 1)]}
+    ],
+    'system_config': [{'keys': [('config_key', 1)], 'unique': True}],
+    'token_counters': [{'keys': [('hospital', 1), ('date', 1)], 'unique': True}],
+    'daily_stats': [{'keys': [('hospital', 1), ('date', 1)], 'unique': True}],
+    'maintenance_jobs': [
+        # Latest background job of each type
+        {'keys': [('type', 1), ('created_at', -1)]},
+        # At most one running job per type, claimed atomically by insert
+        {
+            'keys': [('type', 1)],
+            'name': 'one_running_job_per_type',
+            'unique': True,
+            'partialFilterExpression': {'state': 'running'}
+        }
+    ]
+}
+
+# Index options compared between the registry and the live indexes
+INDEX_OPTIONS = ('unique', 'partialFilterExpression', 'weights')
+
+# Relevance of a $text match, for projections and sorts
+TEXT_SCORE = {'$meta': 'textScore'}
+
+def index_name(spec):
+    """Name of an INDEX_SPECS entry"""
+    return spec.get('name') or '_'.join(f"{field}_{direction}" for field, direction in spec['keys'])
+
+def index_options(spec):
+    """create_index() options of an INDEX_SPECS entry"""
+    return {option: spec[option] for option in INDEX_OPTIONS if option in spec}
+
+def _index_signature(keys, options):
+    """Comparable (keys, options) form of a registry entry or a live index"""
+    keys = [(field, int(direction) if isinstance(direction, (int, float)) else direction) for field, direction in keys]
+    if ('_fts', 'text') in keys:
+        # Live text indexes list their fields under weights
+        keys = [key for key in keys if key[0] not in ('_fts', '_ftsx')] + [(field, 'text') for field in options.get('weights', {})]
+    text_fields = sorted(field for field, direction in keys if direction == 'text')
+    keys = [key for key in keys if key[1] != 'text'] + ([('$text', text_fields)] if text_fields else [])
+    return keys, {option: options.get(option) or None for option in INDEX_OPTIONS}
+
+def mongo_client_options():
+    """MongoClient keyword options from the environment
+    
+    Only variables that are set are passed on, so unset ones keep the
+    driver defaults (and any options given in MONGODB_URI).
+    """
+    options = {}
+    for env_name, option, cast in (
+        ('MONGODB_MAX_POOL_SIZE', 'maxPoolSize', int),
+        ('MONGODB_MIN_POOL_SIZE', 'minPoolSize', int),
+        ('MONGODB_MAX_IDLE_TIME_MS', 'maxIdleTimeMS', int),
+        ('MONGODB_CONNECT_TIMEOUT_MS', 'connectTimeoutMS', int),
+        ('MONGODB_SOCKET_TIMEOUT_MS', 'socketTimeoutMS', int),
+        ('MONGODB_SERVER_SELECTION_TIMEOUT_MS', 'serverSelectionTimeoutMS', int),
+        ('MONGODB_WAIT_QUEUE_TIMEOUT_MS', 'waitQueueTimeoutMS', int),
+        # Comma-separated list, e.g. "zstd,snappy,zlib"
+        ('MONGODB_COMPRESSORS', 'compressors', str),
+        ('MONGODB_ZLIB_COMPRESSION_LEVEL', 'zlibCompressionLevel', int)
+    ):
+        value = os.getenv(env_name)
+        if value not in (None, ''):
+            options[option] = cast(value)
+    return options
+
+def resolve_projection(projection):
+    """Turn a projection profile name into a projection dict; dicts and None pass through"""
+    if isinstance(projection, str):
+        return PATIENT_PROJECTIONS[projection]
+    return projection
+
+def encode_page_cursor(patient):
+    """Encode a patient's (timestamp, _id) sort key as an opaque URL-safe cursor"""
+    key = json.dumps([patient.get('timestamp', ''), str(patient['_id'])])
+    return base64.urlsafe_b64encode(key.encode()).decode()
+
+def decode_page_cursor(cursor):
+    """Decode a page cursor back to (timestamp, ObjectId), or None if it is invalid"""
+    if not cursor:
+        return None
+    try:
+        timestamp, object_id = json.loads(base64.urlsafe_b64decode(cursor.encode()).decode())
+        return timestamp, ObjectId(object_id)
+    except (ValueError, TypeError, InvalidId):
+        return None
+
+class ConnectionMonitor:
+    """Background heartbeat that keeps a cached MongoDB connection state.
+
+    A daemon thread pings the server every ``interval`` seconds so request
+    handlers can ask ``is_healthy()`` without paying a round trip. After
+    ``failure_threshold`` consecutive failed pings the circuit opens and
+    callers are short-circuited until a heartbeat succeeds again.
+    """
+
+    def __init__(self, client, interval=None, failure_threshold=None, on_recover=None):
+        self.client = client
+        self.interval = interval or float(os.getenv('MONGODB_HEARTBEAT_INTERVAL', '5'))
+        self.failure_threshold = failure_threshold or int(os.getenv('MONGODB_FAILURE_THRESHOLD', '3'))
+        self.on_recover = on_recover
+        
+        self.connected = False
+        self.circuit_state = 'closed'
+        self.last_latency_ms = None
+        self.last_check = None
+        self.last_error = None
+        self.consecutive_failures = 0
+        self.total_failures = 0
+        self.total_checks = 0
+        self.state_changes = 0
+        self.circuit_opened_at = None
+        
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread = None
+    
+    def check(self):
+        """Ping the server once and update the cached state"""
+        started = time.perf_counter()
+        try:
+            self.client.admin.command('ping')
+            self._record_success((time.perf_counter() - started) * 1000)
+        except Exception as e:
+            self._record_failure(e)
+        return self.connected
+    
+    def _record_success(self, latency_ms):
+        recovered = False
+        with self._lock:
+            self.total_checks += 1
+            self.last_check = datetime.now()
+            self.last_latency_ms = round(latency_ms, 2)
+            self.last_error = None
+            self.consecutive_failures = 0
+            if not self.connected:
+                self.connected = True
+                self.state_changes += 1
+                recovered = True
+            if self.circuit_state != 'closed':
+                print("✅ MongoDB heartbeat recovered, closing circuit breaker")
+            self.circuit_state = 'closed'
+            self.circuit_opened_at = None
+        
+        if recovered and self.on_recover:
+            self.on_recover()
+    
+    def _record_failure(self, error):
+        with self._lock:
+            self.total_checks += 1
+            self.last_check = datetime.now()
+            self.last_error = str(error)
+            self.consecutive_failures += 1
+            self.total_failures += 1
+            if self.consecutive_failures >= self.failure_threshold and self.circuit_state != 'open':
+                print(f"⚠️ MongoDB heartbeat failed {self.consecutive_failures} times, opening circuit breaker: {error}")
+                self.circuit_state = 'open'
+                self.circuit_opened_at = datetime.now()
+                if self.connected:
+                    self.connected = False
+                    self.state_changes += 1
+    
+    def is_healthy(self):
+        """Return the cached connection state without touching the network"""
+        return self.connected and self.circuit_state == 'closed'
+    
+    def _run(self):
+        while not self._stop_event.wait(self.interval):
+            self.check()
+    
+    def start(self):
+        """Start the heartbeat thread"""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name='mongodb-heartbeat', daemon=True)
+        self._thread.start()
+    
+    def stop(self):
+        """Stop the heartbeat thread"""
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.interval)
+            self._thread = None
+    
+    def get_status(self):
+        """Get a snapshot of the monitor state for display"""
+        with self._lock:
+            return {
+                'connected': self.connected,
+                'circuit_state': self.circuit_state,
+                'last_latency_ms': self.last_latency_ms,
+                'last_check': self.last_check,
+                'last_error': self.last_error,
+                'consecutive_failures': self.consecutive_failures,
+                'total_failures': self.total_failures,
+                'total_checks': self.total_checks,
+                'state_changes': self.state_changes,
+                'circuit_opened_at': self.circuit_opened_at,
+                'heartbeat_interval': self.interval,
+                'failure_threshold': self.failure_threshold
+            }
+
+class AuditLogWriter:
+    """Write-behind buffer for a log collection (admin_logs, slow_queries).
+    
+    Entries go onto a bounded in-process queue and a daemon thread writes
+    them with ``insert_many`` once ``batch_size`` entries are waiting or
+    ``flush_interval`` seconds have passed. When the queue is full new
+    entries are dropped and counted rather than blocking the caller.
+    ``prepare``, if given, is called on each entry in the writer thread
+    just before it is written.
+    """
+    
+    def __init__(self, collection, max_queue=None, batch_size=None, flush_interval=None, name='admin-log-writer',
+                 prepare=None):
+        self.collection = collection
+        self.name = name
+        self.prepare = prepare
+        self.max_queue = max_queue or int(os.getenv('MONGODB_AUDIT_QUEUE_SIZE', '10000'))
+        self.batch_size = batch_size or int(os.getenv('MONGODB_AUDIT_BATCH_SIZE', '100'))
+        self.flush_interval = flush_interval or float(os.getenv('MONGODB_AUDIT_FLUSH_INTERVAL', '2'))
+        
+        self.enqueued = 0
+        self.written = 0
+        self.dropped = 0
+        self.failed = 0
+        self.batches = 0
+        self.last_flush = None
+        self.last_error = None
+        
+        self._queue = queue.Queue(maxsize=self.max_queue)
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread = None
+    
+    def submit(self, entry):
+        """Queue an entry for writing; returns False if it had to be dropped"""
+        try:
+            self._queue.put_nowait(entry)
+        except queue.Full:
+            with self._lock:
+                self.dropped += 1
+            return False
+        with self._lock:
+            self.enqueued += 1
+        return True
+    
+    def _write(self, batch):
+        if self.prepare is not None:
+            for entry in batch:
+                try:
+                    self.prepare(entry)
+                except Exception as e:
+                    print(f"⚠️ Error preparing {self.collection.name} entry: {e}")
+        try:
+            self.collection.insert_many(batch, ordered=False)
+            with self._lock:
+                self.written += len(batch)
+                self.batches += 1
+                self.last_flush = datetime.now()
+        except Exception as e:
+            with self._lock:
+                self.failed += len(batch)
+                self.last_error = str(e)
+            print(f"❌ Error writing {len(batch)} {self.collection.name} entries: {e}")
+    
+    def _next_batch(self):
+        """Collect up to batch_size entries, waiting at most flush_interval"""
+        batch = []
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=timeout))
+            except queue.Empty:
+                break
+        return batch
+    
+    def _run(self):
+        while not self._stop_event.is_set():
+            batch = self._next_batch()
+            if batch:
+                self._write(batch)
+    
+    def flush(self):
+        """Write everything currently queued and return how many entries were taken"""
+        taken = 0
+        while True:
+            batch = []
+            try:
+                while len(batch) < self.batch_size:
+                    batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                pass
+            if not batch:
+                return taken
+            self._write(batch)
+            taken += len(batch)
+    
+    def start(self):
+        """Start the writer thread"""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+        self._thread.start()
+    
+    def stop(self):
+        """Stop the writer thread and flush whatever is still queued"""
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.flush_interval + 5)
+            self._thread = None
+        flushed = self.flush()
+        if flushed:
+            print(f"📝 Flushed {flushed} queued {self.collection.name} entries")
+    
+    def get_status(self):
+        """Get a snapshot of the writer counters for display"""
+        with self._lock:
+            return {
+                'backlog': self._queue.qsize(),
+                'max_queue': self.max_queue,
+                'enqueued': self.enqueued,
+                'written': self.written,
+                'dropped': self.dropped,
+                'failed': self.failed,
+                'batches': self.batches,
+                'last_flush': self.last_flush,
+                'last_error': self.last_error,
+                'batch_size': self.batch_size,
+                'flush_interval': self.flush_interval
+            }
+
+class LastLoginBatcher:
+    """Collects last_login stamps in memory and writes them in batches.
+    
+    ``record()`` only touches a dict; a daemon thread flushes the pending
+    stamps every ``flush_interval`` seconds as one unordered bulk_write per
+    user collection. A user logging in twice between flushes costs one write.
+    """
+    
+    def __init__(self, db, flush_interval=None):
+        self.db = db
+        self.flush_interval = flush_interval or float(os.getenv('MONGODB_LAST_LOGIN_FLUSH_INTERVAL', '10'))
+        
+        self.recorded = 0
+        self.written = 0
+        self.failed = 0
+        self.flushes = 0
+        self.last_flush = None
+        self.last_error = None
+        self.max_staleness = 0.0
+        
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread = None
+    
+    def record(self, collection_name, user_id, when=None):
+        """Remember a login; the stamp reaches MongoDB on the next flush"""
+        when = when or datetime.now()
+        with self._lock:
+            self._pending[(collection_name, user_id)] = when
+            self.recorded += 1
+    
+    def _take_pending(self):
+        """Swap out the pending stamps; returns them and their UpdateOnes per collection"""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        
+        by_collection = {}
+        for (collection_name, user_id), when in pending.items():
+            by_collection.setdefault(collection_name, []).append(
+                UpdateOne({'_id': user_id}, {'$set': {'last_login': when}})
+            )
+        return pending, by_collection
+    
+    def _record_failure(self, collection_name, operations, error):
+        with self._lock:
+            self.failed += len(operations)
+            self.last_error = str(error)
+        print(f"❌ Error writing {len(operations)} last_login stamps to {collection_name}: {error}")
+    
+    def _record_flush(self, pending, written):
+        now = datetime.now()
+        with self._lock:
+            self.written += written
+            self.flushes += 1
+            self.last_flush = now
+            oldest = min(pending.values())
+            self.max_staleness = max(self.max_staleness, (now - oldest).total_seconds())
+    
+    def flush(self):
+        """Write all pending stamps and return how many users were updated"""
+        pending, by_collection = self._take_pending()
+        if not pending:
+            return 0
+        
+        written = 0
+        for collection_name, operations in by_collection.items():
+            try:
+                self.db[collection_name].bulk_write(operations, ordered=False)
+                written += len(operations)
+            except Exception as e:
+                self._record_failure(collection_name, operations, e)
+        
+        self._record_flush(pending, written)
+        return written
+    
+    def _run(self):
+        while not self._stop_event.wait(self.flush_interval):
+            self.flush()
+    
+    def start(self):
+        """Start the flush thread"""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name='last-login-flusher', daemon=True)
+        self._thread.start()
+    
+    def stop(self):
+        """Stop the flush thread and write any pending stamps"""
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.flush_interval)
+            self._thread = None
+        self.flush()
+    
+    def get_status(self):
+        """Get a snapshot of the batcher counters for display
+        
+        ``oldest_pending_seconds`` is how stale last_login is right now for
+        the longest-waiting user; ``max_staleness_seconds`` is the worst
+        delay seen at any flush so far.
+        """
+        with self._lock:
+            oldest = min(self._pending.values()) if self._pending else None
+            return {
+                'pending': len(self._pending),
+                'oldest_pending_seconds': round((datetime.now() - oldest).total_seconds(), 1) if oldest else 0.0,
+                'max_staleness_seconds': round(self.max_staleness, 1),
+                'recorded': self.recorded,
+                'written': self.written,
+                'failed': self.failed,
+                'flushes': self.flushes,
+                'last_flush': self.last_flush,
+                'last_error': self.last_error,
+                'flush_interval': self.flush_interval
+            }
+
+# Commands whose plan can be explained without running them
+EXPLAINABLE_COMMANDS = ('find', 'aggregate', 'count', 'distinct')
+
+def query_shape(value):
+    """Replace the literal values in a filter or pipeline with their type names"""
+    if isinstance(value, dict):
+        return {key: query_shape(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [query_shape(item) for item in value]
+    return type(value).__name__
+
+def summarize_explain(explain):
+    """Reduce explain() output to the winning plan's stages and indexes"""
+    stages = []
+    indexes = []
+    
+    def walk_plan(plan):
+        if not isinstance(plan, dict):
+            return
+        if 'stage' in plan:
+            stages.append(plan['stage'])
+        if 'indexName' in plan:
+            indexes.append(plan['indexName'])
+        for key in ('queryPlan', 'inputStage'):
+            walk_plan(plan.get(key))
+        for child in plan.get('inputStages', []):
+            walk_plan(child)
+    
+    def find_plans(node):
+        if isinstance(node, dict):
+            if 'winningPlan' in node:
+                walk_plan(node['winningPlan'])
+            for key, child in node.items():
+                if key != 'winningPlan':
+                    find_plans(child)
+        elif isinstance(node, list):
+            for child in node:
+                find_plans(child)
+    
+    find_plans(explain)
+    return {
+        'stages': ' > '.join(stages),
+        'indexes': indexes,
+        'collscan': 'COLLSCAN' in stages
+    }
+
+def _command_filter(command):
+    """The filter (or pipeline) part of a command document"""
+    for key in ('filter', 'query', 'pipeline'):
+        if key in command:
+            return command[key]
+    # update/delete/findAndModify carry their filters per statement
+    for key in ('updates', 'deletes'):
+        if key in command:
+            return [statement.get('q', {}) for statement in command[key]]
+    return {}
+
+def _documents_returned(result):
+    """Best-effort count of the documents a DatabaseManager method handed back"""
+    if isinstance(result, list):
+        return len(result)
+    if isinstance(result, dict):
+        if isinstance(result.get('patients'), list):
+            return len(result['patients'])
+        return 1
+    return 0
+
+def _percentile(values, pct):
+    """Nearest-rank percentile of a sorted list"""
+    if not values:
+        return 0.0
+    rank = max(int(round(pct / 100.0 * len(values))) - 1, 0)
+    return values[min(rank, len(values) - 1)]
+
+class QueryStats(monitoring.CommandListener):
+    """Per-method timing table plus the commands each call sent to MongoDB.
+    
+    Registered as a PyMongo command listener so the commands issued while a
+    DatabaseManager method runs can be attached to its slow-query entry.
+    Percentiles are computed over the last ``window`` calls of each method.
+    """
+    
+    def __init__(self, window=None, slow_threshold_ms=None):
+        self.window = window or int(os.getenv('MONGODB_QUERY_STATS_WINDOW', '1000'))
+        self.slow_threshold_ms = slow_threshold_ms if slow_threshold_ms is not None else \
+            float(os.getenv('MONGODB_SLOW_QUERY_MS', '100'))
+        
+        self._methods = {}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+    
+    # Call tracking
+    def begin(self):
+        """Start tracking a method call on this thread; returns True for the outermost call"""
+        depth = getattr(self._local, 'depth', 0)
+        if depth == 0:
+            self._local.commands = []
+            self._local.pending = {}
+        self._local.depth = depth + 1
+        return depth == 0
+    
+    def end(self):
+        """Finish tracking; returns the commands sent by the outermost call"""
+        self._local.depth -= 1
+        if self._local.depth == 0:
+            commands, self._local.commands = self._local.commands, None
+            self._local.pending = None
+            return commands
+        return None
+    
+    def record(self, method, elapsed_ms, documents):
+        with self._lock:
+            entry = self._methods.get(method)
+            if entry is None:
+                entry = self._methods[method] = {
+                    'count': 0, 'total_ms': 0.0, 'documents': 0, 'slow': 0,
+                    'samples': deque(maxlen=self.window)
+                }
+            entry['count'] += 1
+            entry['total_ms'] += elapsed_ms
+            entry['documents'] += documents
+            entry['samples'].append(elapsed_ms)
+            if elapsed_ms >= self.slow_threshold_ms:
+                entry['slow'] += 1
+    
+    # CommandListener interface
+    def started(self, event):
+        commands = getattr(self._local, 'commands', None)
+        if commands is None:
+            return
+        command = {k: v for k, v in event.command.items() if not k.startswith('$') and k != 'lsid'}
+        entry = {'name': event.command_name, 'database': event.database_name, 'command': command, 'duration_ms': None}
+        commands.append(entry)
+        self._local.pending[event.request_id] = entry
+    
+    def succeeded(self, event):
+        pending = getattr(self._local, 'pending', None)
+        if pending and event.request_id in pending:
+            pending.pop(event.request_id)['duration_ms'] = event.duration_micros / 1000.0
+    
+    def failed(self, event):
+        self.succeeded(event)
+    
+    def get_table(self):
+        """Aggregated timing rows, slowest total first"""
+        rows = []
+        with self._lock:
+            for method, entry in self._methods.items():
+                samples = sorted(entry['samples'])
+                rows.append({
+                    'method': method,
+                    'count': entry['count'],
+                    'total_ms': round(entry['total_ms'], 2),
+                    'avg_ms': round(entry['total_ms'] / entry['count'], 2),
+                    'p50_ms': round(_percentile(samples, 50), 2),
+                    'p95_ms': round(_percentile(samples, 95), 2),
+                    'p99_ms': round(_percentile(samples, 99), 2),
+                    'documents': entry['documents'],
+                    'slow': entry['slow']
+                })
+        rows.sort(key=lambda row: row['total_ms'], reverse=True)
+        return rows
+    
+    def reset(self):
+        with self._lock:
+            self._methods = {}
+
+class PoolStats(monitoring.ConnectionPoolListener):
+    """Connection pool gauges and counters fed by PyMongo pool events.
+    
+    Tracks open and checked-out connections per server, how long threads
+    wait to check a connection out, and why check-outs fail. A rising wait
+    time or any ``timeout`` failures mean the pool is smaller than the
+    number of threads competing for it.
+    """
+    
+    def __init__(self, window=None):
+        self.window = window or int(os.getenv('MONGODB_POOL_STATS_WINDOW', '1000'))
+        
+        self._pools = {}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+    
+    def _pool(self, address):
+        key = self._pool_key(address)
+        pool = self._pools.get(key)
+        if pool is None:
+            pool = self._pools[key] = {
+                'open': 0, 'checked_out': 0, 'max_checked_out': 0,
+                'waiting': 0, 'max_waiting': 0, 'created': 0, 'closed': 0,
+                'checkouts': 0, 'failures': {}, 'cleared': 0,
+                'wait_total_ms': 0.0, 'wait_max_ms': 0.0,
+                'wait_samples': deque(maxlen=self.window)
+            }
+        return pool
+    
+    # ConnectionPoolListener interface
+    def pool_created(self, event):
+        with self._lock:
+            self._pool(event.address)
+    
+    def pool_ready(self, event):
+        pass
+    
+    def pool_cleared(self, event):
+        with self._lock:
+            self._pool(event.address)['cleared'] += 1
+    
+    def pool_closed(self, event):
+        with self._lock:
+            self._pools.pop(self._pool_key(event.address), None)
+    
+    def connection_created(self, event):
+        with self._lock:
+            pool = self._pool(event.address)
+            pool['created'] += 1
+            pool['open'] += 1
+    
+    def connection_ready(self, event):
+        pass
+    
+    def connection_closed(self, event):
+        with self._lock:
+            pool = self._pool(event.address)
+            pool['closed'] += 1
+            pool['open'] = max(pool['open'] - 1, 0)
+    
+    def connection_check_out_started(self, event):
+        # Check-out events for one request fire on the requesting thread
+        self._local.started = time.perf_counter()
+        with self._lock:
+            pool = self._pool(event.address)
+            pool['waiting'] += 1
+            pool['max_waiting'] = max(pool['max_waiting'], pool['waiting'])
+    
+    def _finish_wait(self, pool):
+        started = getattr(self._local, 'started', None)
+        self._local.started = None
+        pool['waiting'] = max(pool['waiting'] - 1, 0)
+        if started is None:
+            return
+        wait_ms = (time.perf_counter() - started) * 1000
+        pool['wait_total_ms'] += wait_ms
+        pool['wait_max_ms'] = max(pool['wait_max_ms'], wait_ms)
+        pool['wait_samples'].append(wait_ms)
+    
+    def connection_checked_out(self, event):
+        with self._lock:
+            pool = self._pool(event.address)
+            self._finish_wait(pool)
+            pool['checkouts'] += 1
+            pool['checked_out'] += 1
+            pool['max_checked_out'] = max(pool['max_checked_out'], pool['checked_out'])
+    
+    def connection_check_out_failed(self, event):
+        with self._lock:
+            pool = self._pool(event.address)
+            self._finish_wait(pool)
+            pool['failures'][event.reason] = pool['failures'].get(event.reason, 0) + 1
+    
+    def connection_checked_in(self, event):
+        with self._lock:
+            pool = self._pool(event.address)
+            pool['checked_out'] = max(pool['checked_out'] - 1, 0)
+    
+    @staticmethod
+    def _pool_key(address):
+        return f"{address[0]}:{address[1]}" if isinstance(address, tuple) else str(address)
+    
+    def get_status(self):
+        """One row per server pool with gauges, counters and wait-time percentiles"""
+        rows = []
+        with self._lock:
+            for address, pool in self._pools.items():
+                samples = sorted(pool['wait_samples'])
+                waits = pool['checkouts'] + sum(pool['failures'].values())
+                rows.append({
+                    'address': address,
+                    'open': pool['open'],
+                    'checked_out': pool['checked_out'],
+                    'max_checked_out': pool['max_checked_out'],
+                    'waiting': pool['waiting'],
+                    'max_waiting': pool['max_waiting'],
+                    'created': pool['created'],
+                    'closed': pool['closed'],
+                    'cleared': pool['cleared'],
+                    'checkouts': pool['checkouts'],
+                    'timeouts': pool['failures'].get(monitoring.ConnectionCheckOutFailedReason.TIMEOUT, 0),
+                    'failures': dict(pool['failures']),
+                    'wait_avg_ms': round(pool['wait_total_ms'] / waits, 3) if waits else 0.0,
+                    'wait_p50_ms': round(_percentile(samples, 50), 3),
+                    'wait_p99_ms': round(_percentile(samples, 99), 3),
+                    'wait_max_ms': round(pool['wait_max_ms'], 3)
+                })
+        rows.sort(key=lambda row: row['address'])
+        return rows
+    
+    def reset(self):
+        """Clear counters and wait samples; live gauges (open, checked out) are kept"""
+        with self._lock:
+            for pool in self._pools.values():
+                pool.update(max_checked_out=pool['checked_out'], max_waiting=pool['waiting'],
+                            created=0, closed=0, checkouts=0, failures={}, cleared=0,
+                            wait_total_ms=0.0, wait_max_ms=0.0)
+                pool['wait_samples'].clear()
+
+# system_config document holding one version counter per cache, e.g.
+# {'config_key': '_cache_versions', 'config_value': {'hospitals': 3}}
+CACHE_VERSIONS_KEY = '_cache_versions'
+
+class VersionedCache:
+    """In-process snapshot of a rarely changing read, versioned through system_config.
+    
+    Writers bump the cache's counter in the CACHE_VERSIONS_KEY document.
+    Readers compare it with the version their snapshot was loaded at, at most
+    every ``check_interval`` seconds, so a write in one worker reaches the
+    others within that window; in between, reads do no I/O at all. The
+    snapshot is also reloaded after ``ttl`` seconds as a safety net for
+    writes made outside DatabaseManager.
+    """
+    
+    def __init__(self, name, loader, version_reader, ttl=None, check_interval=None):
+        self.name = name
+        self.loader = loader
+        self.version_reader = version_reader
+        self.ttl = ttl or float(os.getenv('MONGODB_CACHE_TTL', '300'))
+        self.check_interval = check_interval if check_interval is not None else \
+            float(os.getenv('MONGODB_CACHE_VERSION_CHECK_INTERVAL', '2'))
+        
+        self.hits = 0
+        self.misses = 0
+        self.version_checks = 0
+        self.invalidations = 0
+        self.last_reload = None
+        
+        self._value = None
+        self._version = None
+        self._loaded_at = 0.0
+        self._checked_at = 0.0
+        self._generation = 0
+        self._lock = threading.Lock()
+    
+    def get(self):
+        """Return the snapshot, reloading it if the version moved or the TTL expired"""
+        now = time.monotonic()
+        with self._lock:
+            value, version = self._value, self._version
+            fresh = value is not None and now - self._loaded_at < self.ttl
+            if fresh and now - self._checked_at < self.check_interval:
+                self.hits += 1
+                return value
+        
+        if fresh:
+            current = self.version_reader()
+            with self._lock:
+                self.version_checks += 1
+                if current == version and self._version == version:
+                    self._checked_at = now
+                    self.hits += 1
+                    return value
+        
+        return self._reload()
+    
+    def _reload(self):
+        with self._lock:
+            generation = self._generation
+        
+        # Read the version first so a bump during the load is not missed
+        version = self.version_reader()
+        value = self.loader()
+        
+        now = time.monotonic()
+        with self._lock:
+            self.misses += 1
+            # An invalidate() during the load means this value may be stale
+            if generation == self._generation:
+                self._value, self._version = value, version
+                self._loaded_at = self._checked_at = now
+                self.last_reload = datetime.now()
+        return value
+    
+    def invalidate(self):
+        """Drop the snapshot so the next get() reloads it"""
+        with self._lock:
+            self._value = None
+            self._version = None
+            self._generation += 1
+            self.invalidations += 1
+    
+    def get_status(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'name': self.name,
+                'loaded': self._value is not None,
+                'version': self._version,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_ratio': round(self.hits / lookups, 4) if lookups else None,
+                'version_checks': self.version_checks,
+                'invalidations': self.invalidations,
+                'age_seconds': round(time.monotonic() - self._loaded_at, 1) if self._value is not None else None,
+                'last_reload': self.last_reload,
+                'ttl': self.ttl,
+                'check_interval': self.check_interval
+            }
+
+# Typed system_config keys read on hot paths, with the values used when unset
+CONFIG_SCHEMA = {
+    # key: (type, default, min, max); None means unbounded
+    'slot_count': (int, 13, 1, 24),
+    'patients_per_slot': (int, 60, 1, None),
+    'slot_start_hour': (int, 7, 0, 23),
+    'slot_start_minute': (int, 30, 0, 59),
+    'minutes_per_patient': (int, 5, 0, None)
+}
+
+# Keys whose value plus another key's value is capped: slots must fit in one day
+CONFIG_SUM_LIMITS = {'slot_count': ('slot_start_hour', 24)}
+
+def _coerce_config(value, value_type):
+    """Convert a stored config value to value_type; raises ValueError/TypeError if it does not fit"""
+    if value_type is bool and isinstance(value, str):
+        lowered = value.strip().lower()
+        if lowered in ('true', '1', 'yes', 'on'):
+            return True
+        if lowered in ('false', '0', 'no', 'off', ''):
+            return False
+        raise ValueError(f"not a boolean: {value!r}")
+    return value_type(value)
+
+def typed_config_value(key, value, default=None, config=None):
+    """Stored value of a config key, typed, range-checked and defaulted through CONFIG_SCHEMA
+    
+    ``config`` holds the other stored values ({config_key: config_value}),
+    needed for the CONFIG_SUM_LIMITS checks.
+    """
+    if key not in CONFIG_SCHEMA:
+        return default if value is None else value
+    
+    value_type, schema_default, low, high = CONFIG_SCHEMA[key]
+    fallback = schema_default if default is None else default
+    if key in CONFIG_SUM_LIMITS:
+        other_key, total = CONFIG_SUM_LIMITS[key]
+        limit = total - typed_config_value(other_key, (config or {}).get(other_key))
+        high = limit if high is None else min(high, limit)
+        if isinstance(fallback, (int, float)) and fallback > high:
+            fallback = high
+    if value is None:
+        return fallback
+    try:
+        typed = _coerce_config(value, value_type)
+    except (ValueError, TypeError):
+        print(f"⚠️ Invalid value for config '{key}': {value!r}, using {fallback!r}")
+        return fallback
+    if (low is not None and typed < low) or (high is not None and typed > high):
+        print(f"⚠️ Config '{key}' = {typed!r} is outside [{low}, {high}], using {fallback!r}")
+        return fallback
+    return typed
+
+class SystemConfig:
+    """Typed, zero-I/O lookups over an in-memory snapshot of system_config.
+    
+    Keys in CONFIG_SCHEMA come back as their declared type, falling back to
+    the schema default when unset, malformed or out of range. The snapshot is the
+    'system_config' VersionedCache, so save_config() in any worker reaches
+    every other one within the version check interval.
+    """
+    
+    def __init__(self, cache, is_connected):
+        self.cache = cache
+        self.is_connected = is_connected
+    
+    def snapshot(self):
+        """The shared {config_key: config_value} dict; do not modify it"""
+        if not self.is_connected():
+            return {}
+        try:
+            return self.cache.get()
+        except Exception as e:
+            print(f"⚠️ Error loading system config: {e}")
+            return {}
+    
+    def get(self, key, default=None):
+        """Config value, typed and defaulted through CONFIG_SCHEMA when the key is declared there"""
+        snapshot = self.snapshot()
+        return typed_config_value(key, snapshot.get(key), default, snapshot)
+    
+    def get_int(self, key, default=0):
+        return self._get_typed(key, int, default)
+    
+    def get_float(self, key, default=0.0):
+        return self._get_typed(key, float, default)
+    
+    def get_bool(self, key, default=False):
+        return self._get_typed(key, bool, default)
+    
+    def _get_typed(self, key, value_type, default):
+        value = self.snapshot().get(key)
+        if value is None:
+            return default
+        try:
+            return _coerce_config(value, value_type)
+        except (ValueError, TypeError):
+            return default
+
+# Accessors and lifecycle methods that are not worth timing
+UNTIMED_METHODS = {
+    'is_connected', 'get_connection_status', 'get_audit_log_status', 'get_last_login_status',
+    'get_query_stats', 'get_slow_queries', 'get_index_build_status', 'get_pool_stats',
+    'get_cache_stats', 'get_purge_status', 'close_connection'
+}
+
+def _timed(name, method):
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        stats = self.query_stats
+        if stats is None:
+            return method(self, *args, **kwargs)
+        
+        outermost = stats.begin()
+        started = time.perf_counter()
+        try:
+            result = method(self, *args, **kwargs)
+        finally:
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            commands = stats.end()
+        
+        documents = _documents_returned(result)
+        stats.record(name, elapsed_ms, documents)
+        if outermost and elapsed_ms >= stats.slow_threshold_ms:
+            self._log_slow_query(name, elapsed_ms, documents, commands)
+        return result
+    return wrapper
+
+def instrument_methods(cls):
+    """Wrap every public method of cls with QueryStats timing"""
+    for name, member in list(vars(cls).items()):
+        if name.startswith('_') or name in UNTIMED_METHODS or not callable(member):
+            continue
+        setattr(cls, name, _timed(name, member))
+    return cls
+
+@instrument_methods
 class DatabaseManager:
-    def __init__(self, connection_string=None, database_name=None):
-        """Initialize MongoDB connection"""
+    def __init__(self, connection_string=None, database_name=None, max_pool_size=None, min_pool_size=None,
+                 wait_queue_timeout_ms=None, server_selection_timeout_ms=None, build_indexes=False):
+        """Initialize MongoDB connection
+        
+        Pool arguments override the MONGODB_* environment settings read by
+        mongo_client_options(); size max_pool_size to the worker's thread count.
+        ``build_indexes`` starts a background ensure_indexes() once the server
+        is reachable; only web workers (get_db) turn it on, CLIs call
+        ensure_indexes() themselves when they want it.
+        """
         self.connection_string = connection_string or os.getenv('MONGODB_URI', 'mongodb://localhost:27017/')
         self.database_name = database_name or os.getenv('DATABASE_NAME', 'hospital_management')
         
+        self.client_options = mongo_client_options()
+        for option, value in (
+            ('maxPoolSize', max_pool_size),
+            ('minPoolSize', min_pool_size),
+            ('waitQueueTimeoutMS', wait_queue_timeout_ms),
+            ('serverSelectionTimeoutMS', server_selection_timeout_ms)
+        ):
+            if value is not None:
+                self.client_options[option] = value
+        
+        self.monitor = None
+        self.audit_log = None
+        self.last_logins = None
+        self.slow_query_log = None
+        self.build_indexes = build_indexes
+        self._indexes_created = False
+        self.index_build = {'state': 'pending', 'started_at': None, 'finished_at': None, 'result': None}
+        self._purge_thread = None
+        # filter shape -> (monotonic time, plan summary), used by the slow-query writer thread only
+        self._explain_cache = {}
+        
+        # Timing table; also listens to the commands each method sends
+        self.query_stats = QueryStats()
+        # Checkout wait times, pool size and timeouts from pool events
+        self.pool_stats = PoolStats()
+        
+        # In-process caches for rarely changing reads, invalidated by version bumps
+        self.caches = {}
+        self.hospital_cache = self._register_cache(VersionedCache(
+            'hospitals', lambda: list(self.db.hospitals.find({'status': 'active'})),
+            lambda: self._read_cache_version('hospitals')
+        ))
+        self.doctor_index_cache = self._register_cache(VersionedCache(
+            'doctors_by_hospital', self._load_doctors_index,
+            lambda: self._read_cache_version('doctors_by_hospital'),
+            ttl=float(os.getenv('MONGODB_DOCTOR_INDEX_TTL', '60'))
+        ))
+        self.config_cache = self._register_cache(VersionedCache(
+            'system_config', self._load_configs,
+            lambda: self._read_cache_version('system_config'),
+            ttl=float(os.getenv('MONGODB_CONFIG_TTL', '60'))
+        ))
+        self.config = SystemConfig(self.config_cache, self.is_connected)
+        
         try:
-            self.client = MongoClient(self.connection_string)
+            self.client = MongoClient(self.connection_string,
+                                      event_listeners=[self.query_stats, self.pool_stats],
+                                      **self.client_options)
             self.db = self.client[self.database_name]
             
-            # Test connection
-            self.client.admin.command('ping')
-            print(f"✅ Connected to MongoDB: {self.database_name}")
+            # Test connection; the monitor keeps the state cached from here on
+            self.monitor = ConnectionMonitor(self.client, on_recover=self._on_reconnect)
+            if self.monitor.check():
+                print(f"✅ Connected to MongoDB: {self.database_name}")
+            else:
+                print(f"❌ MongoDB connection failed: {self.monitor.last_error}")
+                print("📝 Make sure MongoDB is installed and running on your system")
+            self.monitor.start()
             
-            # Create indexes for better performance
-            self._create_indexes()
+            # Admin audit entries are written behind the request thread
+            self.audit_log = AuditLogWriter(self.db.admin_logs)
+            self.audit_log.start()
+            
+            # last_login stamps are batched off the authentication path
+            self.last_logins = LastLoginBatcher(self.db)
+            self.last_logins.start()
+            
+            # Slow calls are written behind the request thread as well
+            self.slow_query_log = AuditLogWriter(self.db.slow_queries, name='slow-query-writer',
+                                                 prepare=self._explain_slow_query)
+            self.slow_query_log.start()
             
         except Exception as e:
             print(f"❌ MongoDB connection failed: {e}")
@@ -32,41 +1180,298 @@ class DatabaseManager:
             self.client = None
             self.db = None
     
-    def _create_indexes(self):
-        """Create database indexes for better performance"""
+    def _on_reconnect(self):
+        """Build indexes in the background the first time the server becomes reachable"""
+        if not self._indexes_created:
+            self._indexes_created = True
+            if not self.build_indexes:
+                self.index_build['state'] = 'skipped'
+                # The capped slow_queries collection must exist before the first entry is written
+                target = self._ensure_slow_query_collection
+            else:
+                target = self._build_indexes
+            threading.Thread(target=target, name='mongodb-index-build', daemon=True).start()
+    
+    def _build_indexes(self):
+        """Background index build; startup does not wait for it"""
+        self.index_build.update(state='running', started_at=datetime.now())
         try:
-            # Patients collection indexes
-            self.db.patients.create_index("selected_hospital")
-            self.db.patients.create_index("timestamp")
-            self.db.patients.create_index("token_number")
-            self.db.patients.create_index("slot_number")
-            self.db.patients.create_index([("firstName", 1), ("lastName", 1)])
-            
-            # Users collections indexes
-            self.db.doctors.create_index("username", unique=True)
-            self.db.admins.create_index("username", unique=True)
-            self.db.patients_users.create_index("username", unique=True)
-            
-            # System collections indexes
-            self.db.hospitals.create_index("hospital_id", unique=True)
-            self.db.hospitals.create_index("name")
-            self.db.system_config.create_index("config_key", unique=True)
-            
-            print("✅ Database indexes created successfully")
+            result = self.ensure_indexes()
+            self._ensure_slow_query_collection()
+            self.index_build.update(state='failed' if result['failed'] else 'done', result=result)
         except Exception as e:
-            print(f"⚠️ Error creating indexes: {e}")
-
-    def is_connected(self):
-        """Check if database is connected"""
+            print(f"⚠️ Error building indexes: {e}")
+            self.index_build.update(state='failed', result={'error': str(e)})
+        self.index_build['finished_at'] = datetime.now()
+    
+    def ensure_indexes(self, collections=None):
+        """Create the INDEX_SPECS indexes that do not exist yet
+        
+        ``collections`` limits the build to some registry collections.
+        Existing indexes whose keys or options differ from the registry are
+        reported, not rebuilt; use check_indexes() to review them.
+        """
+        result = {'created': [], 'existing': 0, 'mismatched': [], 'failed': []}
+        
+        for collection_name, specs in INDEX_SPECS.items():
+            if collections is not None and collection_name not in collections:
+                continue
+            try:
+                live = self.db[collection_name].index_information()
+            except Exception as e:
+                print(f"⚠️ Error reading indexes on {collection_name}: {e}")
+                live = {}
+            
+            for spec in specs:
+                name = index_name(spec)
+                if name in live:
+                    result['existing'] += 1
+                    if _index_signature(live[name]['key'], live[name]) != _index_signature(spec['keys'], spec):
+                        result['mismatched'].append(f"{collection_name}.{name}")
+                    continue
+                
+                try:
+                    self.db[collection_name].create_index(spec['keys'], name=name, **index_options(spec))
+                    result['created'].append(f"{collection_name}.{name}")
+                except Exception as e:
+                    print(f"⚠️ Error creating index {collection_name}.{name}: {e}")
+                    result['failed'].append(f"{collection_name}.{name}")
+        
+        if result['created']:
+            print(f"✅ Created {len(result['created'])} database indexes")
+        if result['mismatched']:
+            print(f"⚠️ Indexes differ from the registry: {', '.join(result['mismatched'])}")
+        return result
+    
+    def check_indexes(self):
+        """Compare live indexes with INDEX_SPECS, per collection
+        
+        Returns {collection: {'missing': [...], 'extra': [...], 'mismatched': [...]}}
+        where mismatched entries carry the expected and live definitions.
+        """
+        report = {}
+        if not self.is_connected():
+            return report
+        
+        for collection_name, specs in INDEX_SPECS.items():
+            live = self.db[collection_name].index_information()
+            live.pop('_id_', None)
+            expected = {index_name(spec): spec for spec in specs}
+            
+            entry = {'missing': [], 'extra': sorted(set(live) - set(expected)), 'mismatched': []}
+            for name, spec in expected.items():
+                if name not in live:
+                    entry['missing'].append(name)
+                    continue
+                expected_signature = _index_signature(spec['keys'], spec)
+                live_signature = _index_signature(live[name]['key'], live[name])
+                if expected_signature != live_signature:
+                    entry['mismatched'].append({
+                        'name': name,
+                        'expected': expected_signature,
+                        'live': live_signature
+                    })
+            report[collection_name] = entry
+        
+        return report
+    
+    def get_collscan_queries(self, limit=20):
+        """Group slow_queries entries whose plan was a collection scan by method and filter shape"""
+        if not self.is_connected():
+            return []
+        
         try:
-            if self.client is not None and self.db is not None:
-                # Simple test to check if connection is alive
-                self.client.admin.command('ping')
-                return True
-            return False
+            pipeline = [
+                {"$match": {"explain.collscan": True}},
+                {
+                    "$group": {
+                        "_id": {
+                            "method": "$method",
+                            "collection": "$collection",
+                            "filter_shape": "$filter_shape"
+                        },
+                        "count": {"$sum": 1},
+                        "max_ms": {"$max": "$duration_ms"},
+                        "last_seen": {"$max": "$logged_at"}
+                    }
+                },
+                {"$sort": {"count": -1}},
+                {"$limit": limit}
+            ]
+            return [
+                {**row['_id'], 'count': row['count'], 'max_ms': row['max_ms'], 'last_seen': row['last_seen']}
+                for row in self.db.slow_queries.aggregate(pipeline)
+            ]
+        except Exception as e:
+            print(f"❌ Error reading collection scans from slow queries: {e}")
+            return []
+    
+    def get_index_build_status(self):
+        """State of the background index build started at first connect"""
+        return dict(self.index_build)
+    
+    def _ensure_slow_query_collection(self):
+        """Create the capped slow_queries collection if it does not exist yet"""
+        try:
+            if 'slow_queries' not in self.db.list_collection_names(filter={'name': 'slow_queries'}):
+                size = int(os.getenv('MONGODB_SLOW_QUERY_LOG_BYTES', str(16 * 1024 * 1024)))
+                self.db.create_collection('slow_queries', capped=True, size=size)
         except Exception as e:
-            print(f"Connection check failed: {e}")
+            print(f"⚠️ Error creating slow_queries collection: {e}")
+    
+    def is_connected(self):
+        """Check if database is connected (cached by the heartbeat monitor, no round trip)"""
+        if self.client is None or self.db is None or self.monitor is None:
             return False
+        return self.monitor.is_healthy()
+    
+    def get_connection_status(self):
+        """Get connection health details from the heartbeat monitor"""
+        if self.monitor is None:
+            return {
+                'connected': False,
+                'circuit_state': 'open',
+                'last_error': 'MongoDB client not initialized'
+            }
+        return self.monitor.get_status()
+    
+    def get_audit_log_status(self):
+        """Get backlog and dropped counters from the admin log writer"""
+        if self.audit_log is None:
+            return {}
+        return self.audit_log.get_status()
+    
+    def get_query_stats(self):
+        """Get the per-method timing table (count, total, p50/p95/p99, documents)"""
+        return {
+            'slow_threshold_ms': self.query_stats.slow_threshold_ms,
+            'window': self.query_stats.window,
+            'methods': self.query_stats.get_table()
+        }
+    
+    def get_slow_queries(self, limit=50):
+        """Get the most recent slow_queries entries, newest first"""
+        if not self.is_connected():
+            return []
+        
+        try:
+            entries = list(self.db.slow_queries.find().sort('$natural', -1).limit(limit))
+            for entry in entries:
+                entry['_id'] = str(entry['_id'])
+            return entries
+        except Exception as e:
+            print(f"❌ Error getting slow queries: {e}")
+            return []
+    
+    def _log_slow_query(self, method, elapsed_ms, documents, commands):
+        """Queue a slow_queries entry with the filter shape and plan of the slowest command"""
+        if self.slow_query_log is None:
+            return
+        
+        entry = {
+            'method': method,
+            'duration_ms': round(elapsed_ms, 2),
+            'documents_returned': documents,
+            'command_count': len(commands or []),
+            'logged_at': datetime.now()
+        }
+        
+        timed_commands = [c for c in commands or [] if c['duration_ms'] is not None]
+        if timed_commands:
+            slowest = max(timed_commands, key=lambda c: c['duration_ms'])
+            command = slowest['command']
+            entry['command'] = slowest['name']
+            entry['collection'] = command.get(slowest['name'])
+            entry['command_ms'] = round(slowest['duration_ms'], 2)
+            entry['filter_shape'] = query_shape(_command_filter(command))
+            entry['sort_shape'] = query_shape(command['sort']) if 'sort' in command else None
+            
+            if slowest['name'] in EXPLAINABLE_COMMANDS:
+                # Explained by the writer thread, off the request path
+                entry['_explain'] = (slowest['database'], command)
+        
+        print(f"🐢 Slow query: {method} took {elapsed_ms:.1f} ms")
+        self.slow_query_log.submit(entry)
+    
+    def _explain_slow_query(self, entry):
+        """Attach the query plan to a queued slow_queries entry (runs in the slow-query-writer thread)
+        
+        One filter shape is explained at most once per MONGODB_EXPLAIN_INTERVAL
+        seconds; entries in between reuse that plan summary.
+        """
+        pending = entry.pop('_explain', None)
+        if pending is None:
+            return
+        
+        database, command = pending
+        shape_key = repr((entry.get('collection'), entry.get('filter_shape'), entry.get('sort_shape')))
+        interval = float(os.getenv('MONGODB_EXPLAIN_INTERVAL', '60'))
+        cached = self._explain_cache.get(shape_key)
+        if cached is not None and time.monotonic() - cached[0] < interval:
+            entry['explain'] = cached[1]
+            return
+        
+        try:
+            explain = self.client[database].command('explain', command, verbosity='queryPlanner')
+            entry['explain'] = summarize_explain(explain)
+        except Exception as e:
+            entry['explain'] = {'error': str(e)}
+        self._explain_cache[shape_key] = (time.monotonic(), entry['explain'])
+    
+    def get_last_login_status(self):
+        """Get pending and staleness figures for batched last_login stamps"""
+        if self.last_logins is None:
+            return {}
+        return self.last_logins.get_status()
+    
+    def get_pool_stats(self):
+        """Get the effective pool settings and per-server pool gauges and counters"""
+        config = {}
+        if self.client is not None:
+            pool_options = self.client.options.pool_options
+            config = {
+                'max_pool_size': pool_options.max_pool_size,
+                'min_pool_size': pool_options.min_pool_size,
+                'wait_queue_timeout_ms': pool_options.wait_queue_timeout * 1000 if pool_options.wait_queue_timeout else None,
+                'server_selection_timeout_ms': self.client.options.server_selection_timeout * 1000
+            }
+        
+        pools = self.pool_stats.get_status()
+        return {
+            'config': config,
+            'pools': pools,
+            'checkouts': sum(pool['checkouts'] for pool in pools),
+            'timeouts': sum(pool['timeouts'] for pool in pools),
+            'max_checked_out': max((pool['max_checked_out'] for pool in pools), default=0),
+            'wait_max_ms': max((pool['wait_max_ms'] for pool in pools), default=0.0)
+        }
+    
+    def get_cache_stats(self):
+        """Get hit/miss counters, version and age for every in-process cache"""
+        return [cache.get_status() for cache in self.caches.values()]
+    
+    def _register_cache(self, cache):
+        self.caches[cache.name] = cache
+        return cache
+    
+    def _read_cache_version(self, name):
+        """Current version counter of a cache (0 if it was never bumped)"""
+        doc = self.db.system_config.find_one({'config_key': CACHE_VERSIONS_KEY}, {f'config_value.{name}': 1})
+        return ((doc or {}).get('config_value') or {}).get(name, 0)
+    
+    @staticmethod
+    def _cache_version_bump(name):
+        """Update that increments a cache's version counter"""
+        return {'$inc': {f'config_value.{name}': 1}, '$set': {'updated_at': datetime.now()}}
+    
+    def _bump_cache_version(self, name):
+        """Invalidate a cache here and, through the version counter, in every other worker"""
+        try:
+            self.db.system_config.update_one({'config_key': CACHE_VERSIONS_KEY},
+                                             self._cache_version_bump(name), upsert=True)
+        except Exception as e:
+            print(f"⚠️ Error bumping {name} cache version: {e}")
+        self.caches[name].invalidate()
 
     # =========================
     # USER MANAGEMENT METHODS
@@ -95,6 +1500,8 @@ class DatabaseManager:
                 collection_name = 'patients_users'
             
             result = self.db[collection_name].insert_one(user_data)
+            if role == 'doctor':
+                self._bump_cache_version('doctors_by_hospital')
             print(f"✅ User created: {username} ({role})")
             return result.inserted_id
         except Exception as e:
@@ -118,12 +1525,9 @@ class DatabaseManager:
             })
             
             if user:
-                # Update last login
-                self.db[collection_name].update_one(
-                    {'_id': user['_id']},
-                    {'$set': {'last_login': datetime.now()}},
-                    upsert=False
-                )
+                # Stamp last login on the next batched flush
+                if self.last_logins:
+                    self.last_logins.record(collection_name, user['_id'])
                 return user
             return False
         except Exception as e:
@@ -167,6 +1571,8 @@ class DatabaseManager:
                 {'username': username},
                 {'$set': updates}
             )
+            if role == 'doctor' and result.matched_count:
+                self._bump_cache_version('doctors_by_hospital')
             return result.modified_count > 0
         except Exception as e:
             print(f"❌ Error updating user: {e}")
@@ -187,11 +1593,45 @@ class DatabaseManager:
                 {'$set': {'status': 'inactive', 'deleted_at': datetime.now()}},
                 upsert=False
             )
+            if role == 'doctor' and result.modified_count:
+                self._bump_cache_version('doctors_by_hospital')
             return result.modified_count > 0
         except Exception as e:
             print(f"❌ Error deleting user: {e}")
             return False
     
+    @staticmethod
+    def _doctors_index(doctors):
+        """Group active doctors into {hospital: [{'name', 'department', 'id'}]}"""
+        doctors_by_hospital = {}
+        for doctor in doctors:
+            hospital = doctor.get('assigned_hospital')
+            if not hospital:
+                continue
+            doctors_by_hospital.setdefault(hospital, []).append({
+                'name': doctor.get('display_name', doctor.get('username', '').replace('_', ' ').title()),
+                'department': doctor.get('department', 'General Medicine'),
+                'id': doctor.get('username')
+            })
+        return doctors_by_hospital
+    
+    def _load_doctors_index(self):
+        doctors = self.db.doctors.find({'status': 'active', 'assigned_hospital': {'$nin': [None, '']}},
+                                       DOCTOR_INDEX_FIELDS)
+        return self._doctors_index(doctors)
+    
+    def get_doctors_by_hospital(self):
+        """Get active doctors grouped by assigned hospital (served from the doctor index cache)"""
+        if not self.is_connected():
+            return {}
+        
+        try:
+            return {hospital: [dict(doctor) for doctor in doctors]
+                    for hospital, doctors in self.doctor_index_cache.get().items()}
+        except Exception as e:
+            print(f"❌ Error getting doctors by hospital: {e}")
+            return {}
+    
     # =========================
     # HOSPITAL MANAGEMENT METHODS
     # =========================
@@ -205,6 +1645,7 @@ class DatabaseManager:
             hospital_data['created_at'] = datetime.now()
             hospital_data['status'] = 'active'
             result = self.db.hospitals.insert_one(hospital_data)
+            self._bump_cache_version('hospitals')
             print(f"✅ Hospital created: {hospital_data.get('name', 'Unknown')}")
             return result.inserted_id
         except Exception as e:
@@ -220,6 +1661,7 @@ class DatabaseManager:
             hospital_data['created_at'] = datetime.now()
             hospital_data['status'] = 'active'
             result = self.db.hospitals.insert_one(hospital_data)
+            self._bump_cache_version('hospitals')
             print(f"✅ Hospital config added: {hospital_data.get('name', 'Unknown')}")
             return result.inserted_id
         except Exception as e:
@@ -227,12 +1669,13 @@ class DatabaseManager:
             return False
     
     def get_all_hospitals_config(self):
-        """Get all hospital configurations"""
+        """Get all hospital configurations (served from the versioned hospital cache)"""
         if not self.is_connected():
             return []
         
         try:
-            return list(self.db.hospitals.find({'status': 'active'}))
+            # Copies, so callers cannot change the shared snapshot
+            return [dict(hospital) for hospital in self.hospital_cache.get()]
         except Exception as e:
             print(f"❌ Error getting hospitals: {e}")
             return []
@@ -248,6 +1691,8 @@ class DatabaseManager:
                 {'hospital_id': hospital_id},
                 {'$set': updates}
             )
+            if result.matched_count:
+                self._bump_cache_version('hospitals')
             return result.modified_count > 0
         except Exception as e:
             print(f"❌ Error updating hospital: {e}")
@@ -263,47 +1708,38 @@ class DatabaseManager:
             return False
         
         try:
-            config_data = {
-                'config_key': config_key,
-                'config_value': config_value,
-                'updated_at': datetime.now()
-            }
-            
-            result = self.db.system_config.replace_one(
+            now = datetime.now()
+            self.db.system_config.update_one(
                 {'config_key': config_key},
-                config_data,
+                {'$set': {'config_value': config_value, 'updated_at': now},
+                 '$setOnInsert': {'created_at': now}},
                 upsert=True
             )
+            self._bump_cache_version('system_config')
             return True
         except Exception as e:
             print(f"❌ Error saving config: {e}")
             return False
     
+    def _load_configs(self):
+        configs = self.db.system_config.find({'config_key': {'$ne': CACHE_VERSIONS_KEY}},
+                                             {'_id': 0, 'config_key': 1, 'config_value': 1})
+        return {config['config_key']: config.get('config_value') for config in configs}
+    
     def get_config(self, config_key, default_value=None):
-        """Get system configuration"""
+        """Get system configuration (served from the in-memory config snapshot)"""
         if not self.is_connected():
             return default_value
         
-        try:
-            config = self.db.system_config.find_one({'config_key': config_key})
-            if config:
-                return config['config_value']
-            return default_value
-        except Exception as e:
-            print(f"❌ Error getting config: {e}")
-            return default_value
+        return self.config.get(config_key, default_value)
     
     def get_all_configs(self):
-        """Get all system configurations"""
+        """Get all system configurations (served from the in-memory config snapshot)"""
         if not self.is_connected():
             return {}
         
-        try:
-            configs = list(self.db.system_config.find())
-            return {config['config_key']: config['config_value'] for config in configs}
-        except Exception as e:
-            print(f"❌ Error getting all configs: {e}")
-            return {}
+        # Deep copy, so callers cannot change the shared snapshot
+        return copy.deepcopy(self.config.snapshot())
 
     # PATIENT OPERATIONS
     def save_patient(self, patient_data):
@@ -312,17 +1748,21 @@ class DatabaseManager:
             if not self.is_connected():
                 raise Exception("Database not connected")
             
-            # Add timestamp if not present
-            if 'timestamp' not in patient_data:
-                patient_data['timestamp'] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+            # created_at is the native datetime used for range queries
+            if not isinstance(patient_data.get('created_at'), datetime):
+                patient_data['created_at'] = datetime.now()
             
-            # Add created_at for MongoDB tracking
-            patient_data['created_at'] = datetime.now()
+            # Keep the display timestamp string in step with created_at
+            if 'timestamp' not in patient_data:
+                patient_data['timestamp'] = patient_data['created_at'].strftime("%Y-%m-%d %H:%M:%S")
             
             # Insert patient data
             result = self.db.patients.insert_one(patient_data)
             patient_data['_id'] = str(result.inserted_id)
             
+            # Keep the daily rollup in step
+            self._update_daily_stats(patient_data, 1)
+            
             print(f"✅ Patient saved: {patient_data.get('firstName', 'Unknown')} {patient_data.get('lastName', '')}")
             return patient_data
             
@@ -330,8 +1770,101 @@ class DatabaseManager:
             print(f"❌ Error saving patient: {e}")
             return None
     
-    def get_patients(self, hospital_name=None, limit=None):
-        """Get patients from MongoDB"""
+    @staticmethod
+    def _group_by_hospital(patients):
+        """Map each hospital name to the input indices of its patients"""
+        by_hospital = {}
+        for i, patient in enumerate(patients):
+            hospital_name = patient.get('selected_hospital') or 'Unknown Hospital'
+            by_hospital.setdefault(hospital_name, []).append(i)
+        return by_hospital
+    
+    @staticmethod
+    def _stamp_bulk_tokens(patients, indices, hospital_name, first_token, date_str, now, assign_slot=None):
+        """Hand out a reserved token range to the patients at ``indices``"""
+        for offset, i in enumerate(indices):
+            patient = patients[i]
+            for field in SERVER_PATIENT_FIELDS:
+                patient.pop(field, None)
+            token_number = first_token + offset
+            patient['selected_hospital'] = hospital_name
+            patient['token_number'] = token_number
+            patient['token_date'] = date_str
+            if assign_slot:
+                patient.update(assign_slot(token_number))
+            patient['created_at'] = now
+            patient['timestamp'] = now.strftime("%Y-%m-%d %H:%M:%S")
+    
+    @staticmethod
+    def _record_bulk_batch(results, batch_indices, documents, failed):
+        """Fill in per-record results for one insert_many batch and return the inserted documents"""
+        inserted = []
+        for k, i in enumerate(batch_indices):
+            if k in failed:
+                results[i] = {'index': i, 'success': False, 'error': failed[k]}
+            else:
+                inserted.append(documents[k])
+                results[i] = {
+                    'index': i,
+                    'success': True,
+                    'patient_id': str(documents[k]['_id']),
+                    'selected_hospital': documents[k]['selected_hospital'],
+                    'token_number': documents[k]['token_number']
+                }
+        return inserted
+    
+    def save_patients_bulk(self, patients, assign_slot=None, batch_size=500):
+        """Save many patients at once with contiguous per-hospital token ranges
+        
+        Tokens for each hospital are reserved in one atomic counter increment and
+        documents are written with unordered insert_many batches. ``assign_slot``
+        maps a token number to the slot fields stored with the patient. Returns
+        one result dict per input record, in input order.
+        """
+        results = [None] * len(patients)
+        
+        if not self.is_connected():
+            return [{'index': i, 'success': False, 'error': 'Database not connected'} for i in range(len(patients))]
+        
+        now = datetime.now()
+        date_str = now.strftime('%Y-%m-%d')
+        
+        # Reserve one contiguous token range per hospital
+        by_hospital = self._group_by_hospital(patients)
+        
+        for hospital_name, indices in by_hospital.items():
+            first_token = self.reserve_token_range(hospital_name, date_str, len(indices))
+            if first_token is None:
+                for i in indices:
+                    results[i] = {'index': i, 'success': False, 'error': 'Could not reserve token numbers'}
+                continue
+            
+            self._stamp_bulk_tokens(patients, indices, hospital_name, first_token, date_str, now, assign_slot)
+        
+        # Insert in unordered batches; one bad record does not stop the rest
+        ready = [i for i in range(len(patients)) if results[i] is None]
+        for start in range(0, len(ready), batch_size):
+            batch_indices = ready[start:start + batch_size]
+            documents = [patients[i] for i in batch_indices]
+            
+            failed = {}
+            try:
+                self.db.patients.insert_many(documents, ordered=False)
+            except BulkWriteError as e:
+                for error in e.details.get('writeErrors', []):
+                    failed[error['index']] = error.get('errmsg', 'Write error')
+            except Exception as e:
+                failed = {k: str(e) for k in range(len(documents))}
+            
+            inserted = self._record_bulk_batch(results, batch_indices, documents, failed)
+            self._update_daily_stats_bulk(inserted)
+        
+        saved = sum(1 for r in results if r['success'])
+        print(f"✅ Bulk saved {saved}/{len(patients)} patients across {len(by_hospital)} hospitals")
+        return results
+    
+    def get_patients(self, hospital_name=None, limit=None, projection=None):
+        """Get patients from MongoDB, optionally limited to a projection profile"""
         try:
             if not self.is_connected():
                 raise Exception("Database not connected")
@@ -342,30 +1875,270 @@ class DatabaseManager:
                 query['selected_hospital'] = hospital_name
             
             # Execute query
-            cursor = self.db.patients.find(query).sort("timestamp", -1)
+            cursor = self.db.patients.find(query, resolve_projection(projection)).sort([("timestamp", -1), ("_id", -1)])
             
             if limit:
                 cursor = cursor.limit(limit)
             
-            # Convert to list and handle ObjectId
-            patients = []
-            for patient in cursor:
-                patient['_id'] = str(patient['_id'])
-                patients.append(patient)
+            # Convert to list and handle ObjectId
+            patients = []
+            for patient in cursor:
+                patient['_id'] = str(patient['_id'])
+                patients.append(patient)
+            
+            return patients
+            
+        except Exception as e:
+            print(f"❌ Error retrieving patients: {e}")
+            return []
+    
+    def _page_query(self, hospital_name=None, after=None, before=None, sort='desc'):
+        """Build the keyset filter and scan direction for get_patients_page"""
+        direction = 1 if sort == 'asc' else -1
+        
+        # Paging backwards walks the index in the opposite direction from the cursor
+        position = decode_page_cursor(after)
+        backwards = False
+        if position is None and before:
+            position = decode_page_cursor(before)
+            backwards = position is not None
+        scan_direction = -direction if backwards else direction
+        
+        query = {}
+        if hospital_name:
+            query['selected_hospital'] = hospital_name
+        if position:
+            timestamp, object_id = position
+            op = '$gt' if scan_direction == 1 else '$lt'
+            query['$or'] = [
+                {'timestamp': {op: timestamp}},
+                {'timestamp': timestamp, '_id': {op: object_id}}
+            ]
+        
+        return query, scan_direction, backwards, position
+    
+    @staticmethod
+    def _fill_page(page, patients, limit, backwards, position):
+        """Trim the limit + 1 lookahead fetch into page rows and neighbour cursors"""
+        has_more = len(patients) > limit
+        patients = patients[:limit]
+        if backwards:
+            patients.reverse()
+        
+        page['has_next'] = True if backwards else has_more
+        page['has_prev'] = has_more if backwards else position is not None
+        
+        if patients:
+            if page['has_next']:
+                page['next_cursor'] = encode_page_cursor(patients[-1])
+            if page['has_prev']:
+                page['prev_cursor'] = encode_page_cursor(patients[0])
+        
+        for patient in patients:
+            patient['_id'] = str(patient['_id'])
+        page['patients'] = patients
+        return page
+    
+    def get_patients_page(self, hospital_name=None, after=None, limit=25, sort='desc', before=None, projection=None):
+        """Get one page of patients using keyset pagination on (timestamp, _id)
+        
+        ``after`` and ``before`` are cursors returned by a previous page; the
+        cost of a page does not depend on how far into the collection it is.
+        """
+        page = {
+            'patients': [],
+            'next_cursor': None,
+            'prev_cursor': None,
+            'has_next': False,
+            'has_prev': False
+        }
+        
+        try:
+            if not self.is_connected():
+                raise Exception("Database not connected")
+            
+            query, scan_direction, backwards, position = self._page_query(hospital_name, after, before, sort)
+            
+            cursor = self.db.patients.find(query, resolve_projection(projection)).sort([
+                ("timestamp", scan_direction),
+                ("_id", scan_direction)
+            ]).limit(limit + 1)
+            
+            self._fill_page(page, list(cursor), limit, backwards, position)
+            
+            return page
+            
+        except Exception as e:
+            print(f"❌ Error retrieving patients page: {e}")
+            return page
+    
+    def _search_query(self, query, hospital_name=None):
+        """Build a $text patient filter, optionally scoped to one hospital"""
+        search = {'$text': {'$search': query}}
+        if hospital_name:
+            search['selected_hospital'] = hospital_name
+        return search
+    
+    def search_patients(self, query, hospital_name=None, limit=25, skip=0, projection=None):
+        """Full-text search over names, symptoms, medications and medical history, best match first
+        
+        Returns a page like get_patients_page() with each patient's relevance in
+        ``score``. Results are ordered by score, so pages are skip-based; callers
+        should keep ``skip`` bounded. ``error`` is set when the search could not
+        run, e.g. the text index is missing or the server is unreachable.
+        """
+        page = {'patients': [], 'has_next': False, 'has_prev': skip > 0, 'error': None}
+        query = (query or '').strip()
+        if not query:
+            return page
+        
+        try:
+            if not self.is_connected():
+                raise Exception("Database not connected")
+            
+            fields = dict(resolve_projection(projection) or {})
+            fields['score'] = TEXT_SCORE
+            cursor = self.db.patients.find(self._search_query(query, hospital_name), fields).sort([
+                ('score', TEXT_SCORE),
+                ('_id', 1)
+            ]).skip(skip).limit(limit + 1)
+            
+            patients = list(cursor)
+            page['has_next'] = len(patients) > limit
+            for patient in patients[:limit]:
+                patient['_id'] = str(patient['_id'])
+                page['patients'].append(patient)
+            
+            return page
+            
+        except Exception as e:
+            print(f"❌ Error searching patients: {e}")
+            # An empty page alone would read as "no matches"
+            page['error'] = str(e)
+            return page
+    
+    def _date_range_query(self, hospital_name=None, start=None, end=None):
+        """Build a patient filter on selected_hospital and a [start, end) created_at range"""
+        query = {}
+        if hospital_name:
+            query['selected_hospital'] = hospital_name
+        if start is not None or end is not None:
+            query['created_at'] = {}
+            if start is not None:
+                query['created_at']['$gte'] = start
+            if end is not None:
+                query['created_at']['$lt'] = end
+        return query
+    
+    def count_patients(self, hospital_name=None, start=None, end=None, filters=None):
+        """Count patients registered in [start, end), served by the (selected_hospital, created_at) index"""
+        try:
+            if not self.is_connected():
+                raise Exception("Database not connected")
+            
+            query = self._date_range_query(hospital_name, start, end)
+            if filters:
+                query.update(filters)
+            
+            return self.db.patients.count_documents(query)
+            
+        except Exception as e:
+            print(f"❌ Error counting patients: {e}")
+            return 0
+    
+    def get_patients_by_date_range(self, hospital_name=None, start=None, end=None, limit=None):
+        """Get patients registered in [start, end), newest first"""
+        try:
+            if not self.is_connected():
+                raise Exception("Database not connected")
+            
+            query = self._date_range_query(hospital_name, start, end)
+            cursor = self.db.patients.find(query).sort("created_at", -1)
+            
+            if limit:
+                cursor = cursor.limit(limit)
+            
+            patients = []
+            for patient in cursor:
+                patient['_id'] = str(patient['_id'])
+                patients.append(patient)
+            
+            return patients
+            
+        except Exception as e:
+            print(f"❌ Error retrieving patients by date range: {e}")
+            return []
+    
+    def migrate_patient_timestamps(self, batch_size=1000):
+        """Backfill created_at as a native datetime parsed from the legacy timestamp string"""
+        if not self.is_connected():
+            return 0
+        
+        try:
+            # Documents without a usable created_at, or whose created_at is the JSON import time
+            query = {
+                'timestamp': {'$type': 'string'},
+                'timestamp_migrated': {'$ne': True},
+                '$or': [
+                    {'created_at': {'$exists': False}},
+                    {'created_at': {'$not': {'$type': 'date'}}},
+                    {'migrated_from_json': True}
+                ]
+            }
+            
+            migrated = 0
+            operations = []
+            for patient in self.db.patients.find(query, {'timestamp': 1}):
+                try:
+                    created_at = datetime.strptime(patient['timestamp'], "%Y-%m-%d %H:%M:%S")
+                except ValueError:
+                    print(f"⚠️ Skipping patient {patient['_id']}: unparseable timestamp '{patient['timestamp']}'")
+                    continue
+                
+                operations.append(UpdateOne(
+                    {'_id': patient['_id']},
+                    {'$set': {'created_at': created_at, 'timestamp_migrated': True}}
+                ))
+                
+                if len(operations) >= batch_size:
+                    migrated += self.db.patients.bulk_write(operations, ordered=False).modified_count
+                    operations = []
             
-            return patients
+            if operations:
+                migrated += self.db.patients.bulk_write(operations, ordered=False).modified_count
+            
+            print(f"✅ Migrated {migrated} patient timestamps to native datetime")
+            if migrated:
+                # Patients may have moved to a different rollup date
+                self.rebuild_daily_stats()
+            return migrated
             
         except Exception as e:
-            print(f"❌ Error retrieving patients: {e}")
-            return []
+            print(f"❌ Error migrating patient timestamps: {e}")
+            return 0
     
-    def get_patient_by_id(self, patient_id):
-        """Get single patient by MongoDB ObjectId"""
+    @staticmethod
+    def _patient_id_filter(patient_id, hospital_name=None):
+        """Filter for one patient by ObjectId, scoped to a hospital if given; None if the id is invalid"""
+        try:
+            query = {"_id": ObjectId(patient_id)}
+        except (InvalidId, TypeError):
+            return None
+        if hospital_name:
+            query["selected_hospital"] = hospital_name
+        return query
+    
+    def get_patient_by_id(self, patient_id, hospital_name=None, projection=None):
+        """Get single patient by MongoDB ObjectId, optionally only if it belongs to hospital_name"""
         try:
             if not self.is_connected():
                 raise Exception("Database not connected")
             
-            patient = self.db.patients.find_one({"_id": ObjectId(patient_id)})
+            query = self._patient_id_filter(patient_id, hospital_name)
+            if query is None:
+                return None
+            
+            patient = self.db.patients.find_one(query, resolve_projection(projection))
             
             if patient:
                 patient['_id'] = str(patient['_id'])
@@ -386,6 +2159,21 @@ class DatabaseManager:
             # Add updated timestamp
             update_data['updated_at'] = datetime.now()
             
+            if any(field in update_data for field in DAILY_STATS_FIELDS):
+                # Move the patient between rollup counters using the pre-update document
+                before = self.db.patients.find_one_and_update(
+                    {"_id": ObjectId(patient_id)},
+                    {"$set": update_data},
+                    projection={field: 1 for field in DAILY_STATS_FIELDS},
+                    return_document=ReturnDocument.BEFORE
+                )
+                if before is None:
+                    return False
+                
+                self._update_daily_stats(before, -1)
+                self._update_daily_stats({**before, **update_data}, 1)
+                return True
+            
             result = self.db.patients.update_one(
                 {"_id": ObjectId(patient_id)},
                 {"$set": update_data}
@@ -397,74 +2185,270 @@ class DatabaseManager:
             print(f"❌ Error updating patient: {e}")
             return False
     
-    def delete_patient(self, patient_id):
-        """Delete patient by ID"""
+    def delete_patient(self, patient_id, hospital_name=None):
+        """Delete patient by ID, optionally only if it belongs to hospital_name"""
         try:
             if not self.is_connected():
                 raise Exception("Database not connected")
             
-            result = self.db.patients.delete_one({"_id": ObjectId(patient_id)})
-            return result.deleted_count > 0
+            query = self._patient_id_filter(patient_id, hospital_name)
+            if query is None:
+                return False
+            
+            deleted = self.db.patients.find_one_and_delete(
+                query,
+                projection={field: 1 for field in DAILY_STATS_FIELDS}
+            )
+            if deleted is None:
+                return False
+            
+            self._update_daily_stats(deleted, -1)
+            return True
             
         except Exception as e:
             print(f"❌ Error deleting patient: {e}")
             return False
     
+    @staticmethod
+    def _patients_bulk_filter(patient_ids=None, hospital_name=None, query=None):
+        """Filter for many patients by ObjectId list and/or query, scoped to a hospital
+        
+        Invalid ids are skipped. Returns None when neither ids nor a query are
+        given, so a bulk call can never match the whole collection by accident.
+        """
+        conditions = dict(query or {})
+        if patient_ids is not None:
+            object_ids = []
+            for patient_id in patient_ids:
+                try:
+                    object_ids.append(ObjectId(patient_id))
+                except (InvalidId, TypeError):
+                    continue
+            conditions['_id'] = {'$in': object_ids}
+        elif not conditions:
+            return None
+        
+        if hospital_name:
+            conditions['selected_hospital'] = hospital_name
+        return conditions
+    
+    def delete_patients(self, patient_ids=None, hospital_name=None, query=None):
+        """Delete many patients with unordered bulk_writes; returns the number deleted
+        
+        Patients are chosen by ``patient_ids`` and/or ``query``, optionally only
+        within ``hospital_name``. Matches are deleted in batches of
+        MONGODB_BULK_DELETE_BATCH, each followed by one merged daily_stats $inc.
+        """
+        removed = 0
+        try:
+            if not self.is_connected():
+                raise Exception("Database not connected")
+            
+            conditions = self._patients_bulk_filter(patient_ids, hospital_name, query)
+            if conditions is None:
+                print("⚠️ delete_patients needs patient ids or a filter")
+                return 0
+            
+            batch_size = int(os.getenv('MONGODB_BULK_DELETE_BATCH', '5000'))
+            projection = {field: 1 for field in DAILY_STATS_FIELDS}
+            while True:
+                targets = list(self.db.patients.find(conditions, projection).limit(batch_size))
+                if not targets:
+                    break
+                
+                result = self.db.patients.bulk_write(
+                    [DeleteOne({'_id': patient['_id']}) for patient in targets], ordered=False
+                )
+                self._remove_from_daily_stats(targets, result.deleted_count)
+                removed += result.deleted_count
+                if len(targets) < batch_size or result.deleted_count == 0:
+                    break
+            
+            print(f"🗑️ Bulk deleted {removed} patients")
+            return removed
+            
+        except Exception as e:
+            print(f"❌ Error deleting patients: {e}")
+            return removed
+    
+    def update_patients(self, update_data, patient_ids=None, hospital_name=None, query=None):
+        """Apply the same $set to many patients with one bulk_write; returns the number modified
+        
+        Patients are chosen like delete_patients(). Updates that touch a
+        daily_stats field move the patients between rollup counters.
+        """
+        try:
+            if not self.is_connected():
+                raise Exception("Database not connected")
+            
+            conditions = self._patients_bulk_filter(patient_ids, hospital_name, query)
+            if conditions is None:
+                print("⚠️ update_patients needs patient ids or a filter")
+                return 0
+            
+            update_data = dict(update_data, updated_at=datetime.now())
+            
+            if not any(field in update_data for field in DAILY_STATS_FIELDS):
+                result = self.db.patients.bulk_write([UpdateMany(conditions, {'$set': update_data})])
+                return result.modified_count
+            
+            # Rollup counters move, so the pre-update documents are needed
+            before = list(self.db.patients.find(conditions, {field: 1 for field in DAILY_STATS_FIELDS}))
+            if not before:
+                return 0
+            
+            result = self.db.patients.bulk_write(
+                [UpdateOne({'_id': patient['_id']}, {'$set': update_data}) for patient in before], ordered=False
+            )
+            self._update_daily_stats_bulk([{**patient, **update_data} for patient in before], 1, previous=before)
+            return result.modified_count
+            
+        except Exception as e:
+            print(f"❌ Error updating patients: {e}")
+            return 0
+    
+    def delete_patients_in_range(self, hospital_name=None, start=None, end=None):
+        """delete_patients() for the patients of a hospital registered in [start, end)
+        
+        Needs a hospital or a date bound; emptying every hospital at once is
+        the purge job's task.
+        """
+        query = self._date_range_query(hospital_name, start, end)
+        if not query:
+            print("⚠️ delete_patients_in_range needs a hospital or a date range")
+            return 0
+        return self.delete_patients(hospital_name=hospital_name, query=query)
+    
+    def update_patients_in_range(self, update_data, hospital_name=None, start=None, end=None):
+        """update_patients() for the patients of a hospital registered in [start, end)"""
+        query = self._date_range_query(hospital_name, start, end)
+        if not query:
+            print("⚠️ update_patients_in_range needs a hospital or a date range")
+            return 0
+        return self.update_patients(update_data, hospital_name=hospital_name, query=query)
+    
     # HOSPITAL STATISTICS
     def get_hospital_stats(self, hospital_name=None):
-        """Get statistics for hospitals"""
+        """Get statistics for hospitals (read from the daily_stats rollup)"""
         try:
             if not self.is_connected():
                 raise Exception("Database not connected")
             
-            pipeline = []
+            summary = self.get_daily_stats_summary(hospital_name)
             
-            # Match stage - filter by hospital if specified
-            if hospital_name:
-                pipeline.append({"$match": {"selected_hospital": hospital_name}})
+            return {
+                'total_patients': summary['total_patients'],
+                'male_patients': summary['male_patients'],
+                'female_patients': summary['female_patients'],
+                'patients_with_tokens': summary['patients_with_tokens']
+            }
             
-            # Group and calculate statistics
-            pipeline.extend([
-                {
-                    "$group": {
-                        "_id": None,
-                        "total_patients": {"$sum": 1},
-                        "male_patients": {
-                            "$sum": {
-                                "$cond": [{"$eq": [{"$toLower": "$gender"}, "male"]}, 1, 0]
-                            }
-                        },
-                        "female_patients": {
-                            "$sum": {
-                                "$cond": [{"$eq": [{"$toLower": "$gender"}, "female"]}, 1, 0]
-                            }
-                        },
-                        "patients_with_tokens": {
-                            "$sum": {
-                                "$cond": [{"$gt": ["$token_number", 0]}, 1, 0]
+        except Exception as e:
+            print(f"❌ Error getting hospital stats: {e}")
+            return {}
+    
+    def _patient_management_pipeline(self, hospital_name=None, today_start=None, month_start=None):
+        """Build the $facet pipeline behind get_patient_management_stats"""
+        if today_start is None:
+            today_start = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+        if month_start is None:
+            month_start = today_start.replace(day=1)
+        
+        has_token = {"$gt": ["$token_number", 0]}
+        
+        pipeline = []
+        if hospital_name:
+            pipeline.append({"$match": {"selected_hospital": hospital_name}})
+        
+        pipeline.append({
+            "$facet": {
+                "overall": [
+                    {
+                        "$group": {
+                            "_id": None,
+                            "total_patients": {"$sum": 1},
+                            "male_patients": {
+                                "$sum": {"$cond": [{"$eq": [{"$toLower": "$gender"}, "male"]}, 1, 0]}
+                            },
+                            "female_patients": {
+                                "$sum": {"$cond": [{"$eq": [{"$toLower": "$gender"}, "female"]}, 1, 0]}
+                            },
+                            "patients_with_tokens": {"$sum": {"$cond": [has_token, 1, 0]}}
+                        }
+                    }
+                ],
+                "this_month": [
+                    {"$match": {"created_at": {"$gte": month_start}}},
+                    {
+                        "$group": {
+                            "_id": None,
+                            "this_month": {"$sum": 1},
+                            "patients_today": {
+                                "$sum": {"$cond": [{"$gte": ["$created_at", today_start]}, 1, 0]}
+                            },
+                            "today_tokens": {
+                                "$sum": {
+                                    "$cond": [
+                                        {"$and": [{"$gte": ["$created_at", today_start]}, has_token]},
+                                        1, 0
+                                    ]
+                                }
                             }
                         }
                     }
-                }
-            ])
+                ]
+            }
+        })
+        return pipeline
+    
+    @staticmethod
+    def _merge_facet_counters(stats, result, facets):
+        """Copy the single-group counters of each $facet branch into stats"""
+        if result:
+            for facet in facets:
+                if result[0][facet]:
+                    counters = dict(result[0][facet][0])
+                    counters.pop('_id', None)
+                    stats.update(counters)
+    
+    def get_patient_management_stats(self, hospital_name=None, today_start=None, month_start=None):
+        """Get all patient management counters from a single $facet aggregation"""
+        stats = {
+            'total_patients': 0,
+            'male_patients': 0,
+            'female_patients': 0,
+            'patients_with_tokens': 0,
+            'this_month': 0,
+            'patients_today': 0,
+            'today_tokens': 0
+        }
+        
+        try:
+            if not self.is_connected():
+                raise Exception("Database not connected")
             
+            pipeline = self._patient_management_pipeline(hospital_name, today_start, month_start)
             result = list(self.db.patients.aggregate(pipeline))
+            self._merge_facet_counters(stats, result, ('overall', 'this_month'))
             
-            if result:
-                stats = result[0]
-                del stats['_id']  # Remove MongoDB _id field
-                return stats
-            
-            return {
-                'total_patients': 0,
-                'male_patients': 0,
-                'female_patients': 0,
-                'patients_with_tokens': 0
-            }
+            return stats
             
         except Exception as e:
-            print(f"❌ Error getting hospital stats: {e}")
-            return {}
+            print(f"❌ Error getting patient management stats: {e}")
+            return stats
+    
+    def get_admin_dashboard_stats(self, recent_since=None):
+        """Get the admin dashboard statistics (read from the daily_stats rollup)"""
+        summary = self.get_daily_stats_summary(recent_since=recent_since)
+        
+        return {
+            'total_patients': summary['total_patients'],
+            'recent_patients': summary['recent_patients'],
+            'male_patients': summary['male_patients'],
+            'female_patients': summary['female_patients'],
+            'age_groups': summary['age_groups'],
+            'hospital_stats': summary['hospital_stats']
+        }
     
     def get_hospitals_list(self):
         """Get list of all hospitals with patient counts"""
@@ -501,6 +2485,285 @@ class DatabaseManager:
             print(f"❌ Error getting hospitals list: {e}")
             return []
     
+    # DAILY STATISTICS ROLLUP
+    @staticmethod
+    def _age_group(age):
+        """Map an age (int or string) to its reporting bucket, or None if it is not a number"""
+        try:
+            age = int(age)
+        except (TypeError, ValueError):
+            return None
+        
+        if age < 0:
+            return None
+        if age <= 18:
+            return '0-18'
+        if age <= 35:
+            return '19-35'
+        if age <= 60:
+            return '36-60'
+        return '60+'
+    
+    def _daily_stats_key(self, patient):
+        """Rollup key (hospital, date) for a patient document"""
+        created_at = patient.get('created_at')
+        if isinstance(created_at, datetime):
+            date_str = created_at.strftime('%Y-%m-%d')
+        else:
+            date_str = str(patient.get('timestamp') or '')[:10] or 'unknown'
+        
+        return {'hospital': patient.get('selected_hospital') or 'Unknown', 'date': date_str}
+    
+    def _daily_stats_increments(self, patient, sign=1):
+        """Counter paths a patient contributes to in its daily_stats document"""
+        # Field names cannot contain '.' or start with '$'
+        gender = str(patient.get('gender') or 'unknown').strip().lower() or 'unknown'
+        gender = gender.replace('.', '_').replace('$', '_')
+        
+        increments = {'total': sign, f'gender.{gender}': sign}
+        
+        age_group = self._age_group(patient.get('age'))
+        if age_group:
+            increments[f'age_groups.{age_group}'] = sign
+        
+        if patient.get('slot_number'):
+            increments[f"slots.{patient['slot_number']}"] = sign
+        
+        token_number = patient.get('token_number')
+        if isinstance(token_number, (int, float)) and token_number > 0:
+            increments['with_tokens'] = sign
+        
+        return increments
+    
+    def _update_daily_stats(self, patient, sign=1):
+        """Apply a patient's contribution to the daily_stats rollup with an atomic $inc"""
+        try:
+            self.db.daily_stats.update_one(
+                self._daily_stats_key(patient),
+                {
+                    '$inc': self._daily_stats_increments(patient, sign),
+                    '$set': {'updated_at': datetime.now()}
+                },
+                upsert=True
+            )
+        except Exception as e:
+            print(f"⚠️ Error updating daily stats: {e}")
+    
+    def _daily_stats_bulk_operations(self, patients, sign=1):
+        """Merge many patients into one upserting $inc per (hospital, date) rollup"""
+        merged = {}
+        for patient in patients:
+            key = self._daily_stats_key(patient)
+            _, increments = merged.setdefault((key['hospital'], key['date']), (key, {}))
+            for path, value in self._daily_stats_increments(patient, sign).items():
+                increments[path] = increments.get(path, 0) + value
+        
+        now = datetime.now()
+        return [
+            UpdateOne(key, {'$inc': increments, '$set': {'updated_at': now}}, upsert=True)
+            for key, increments in merged.values()
+        ]
+    
+    def _update_daily_stats_bulk(self, patients, sign=1, previous=None):
+        """Apply many patients to the daily_stats rollup with one unordered bulk_write
+        
+        ``previous`` are the same patients before an update; their contribution
+        is removed in the same bulk_write.
+        """
+        if not patients:
+            return
+        
+        operations = self._daily_stats_bulk_operations(patients, sign)
+        if previous:
+            operations = self._daily_stats_bulk_operations(previous, -sign) + operations
+        
+        try:
+            self.db.daily_stats.bulk_write(operations, ordered=False)
+        except Exception as e:
+            print(f"⚠️ Error updating daily stats: {e}")
+    
+    def _remove_from_daily_stats(self, targets, deleted_count):
+        """Take deleted patients out of the rollup
+        
+        When some targets were already deleted by someone else, which ones is
+        unknown, so the affected (hospital, date) rollups are recomputed instead.
+        """
+        if deleted_count == len(targets):
+            self._update_daily_stats_bulk(targets, -1)
+        else:
+            print(f"⚠️ {len(targets) - deleted_count} patients were deleted concurrently; recomputing their rollups")
+            self.recompute_daily_stats([self._daily_stats_key(patient) for patient in targets])
+    
+    @staticmethod
+    def _daily_stats_key_query(key):
+        """Patient filter matching one (hospital, date) rollup key, the inverse of _daily_stats_key"""
+        hospital = key['hospital']
+        query = {'selected_hospital': {'$in': [hospital, None, '']} if hospital == 'Unknown' else hospital}
+        try:
+            day = datetime.strptime(key['date'], '%Y-%m-%d')
+        except ValueError:
+            query['created_at'] = {'$exists': False}
+            return query
+        
+        query['$or'] = [
+            {'created_at': {'$gte': day, '$lt': day + timedelta(days=1)}},
+            {'created_at': {'$exists': False}, 'timestamp': {'$regex': f"^{key['date']}"}}
+        ]
+        return query
+    
+    def recompute_daily_stats(self, keys):
+        """Recompute some (hospital, date) rollups from the patients collection; returns how many"""
+        if not self.is_connected():
+            return 0
+        
+        projection = {field: 1 for field in DAILY_STATS_FIELDS}
+        unique_keys = {(key['hospital'], key['date']): key for key in keys}
+        try:
+            for key in unique_keys.values():
+                key = {'hospital': key['hospital'], 'date': key['date']}
+                rollups = self._build_daily_stats(
+                    patient for patient in self.db.patients.find(self._daily_stats_key_query(key), projection)
+                    if self._daily_stats_key(patient) == key
+                )
+                doc = rollups.get((key['hospital'], key['date']))
+                if doc:
+                    self.db.daily_stats.replace_one(key, doc, upsert=True)
+                else:
+                    self.db.daily_stats.delete_one(key)
+            return len(unique_keys)
+        except Exception as e:
+            print(f"❌ Error recomputing daily stats: {e}")
+            return 0
+    
+    def _build_daily_stats(self, patients):
+        """Fold patient documents into daily_stats documents keyed by (hospital, date)"""
+        rollups = {}
+        for patient in patients:
+            key = self._daily_stats_key(patient)
+            doc = rollups.setdefault((key['hospital'], key['date']), dict(key))
+            
+            for path, value in self._daily_stats_increments(patient).items():
+                target = doc
+                parts = path.split('.')
+                for part in parts[:-1]:
+                    target = target.setdefault(part, {})
+                target[parts[-1]] = target.get(parts[-1], 0) + value
+        
+        now = datetime.now()
+        for doc in rollups.values():
+            doc['updated_at'] = now
+        return rollups
+    
+    def rebuild_daily_stats(self):
+        """Recompute the daily_stats rollup from the patients collection
+        
+        The rollup is built in a staging collection and renamed over
+        daily_stats, so readers and concurrent upserts never see it empty or
+        half built. Days that took registrations during the rebuild are
+        recomputed after the swap; deletes in that window may be missed.
+        """
+        if not self.is_connected():
+            return 0
+        
+        staging = self.db[DAILY_STATS_STAGING]
+        try:
+            started_at = datetime.now()
+            projection = {field: 1 for field in DAILY_STATS_FIELDS}
+            rollups = self._build_daily_stats(self.db.patients.find({}, projection))
+            
+            staging.drop()
+            for spec in INDEX_SPECS['daily_stats']:
+                staging.create_index(spec['keys'], name=index_name(spec), **index_options(spec))
+            if rollups:
+                staging.insert_many(list(rollups.values()))
+            staging.rename('daily_stats', dropTarget=True)
+            
+            # Registrations after the scan were counted in the collection just replaced
+            late = self.db.patients.find({'created_at': {'$gte': started_at}}, projection)
+            self.recompute_daily_stats([self._daily_stats_key(patient) for patient in late])
+            
+            print(f"✅ Rebuilt daily stats: {len(rollups)} (hospital, date) rollups")
+            return len(rollups)
+            
+        except Exception as e:
+            print(f"❌ Error rebuilding daily stats: {e}")
+            try:
+                staging.drop()
+            except Exception:
+                pass
+            return 0
+    
+    def ensure_daily_stats(self):
+        """Build the daily_stats rollup once if patients exist but no rollup does"""
+        if not self.is_connected():
+            return False
+        
+        try:
+            if self.db.daily_stats.estimated_document_count() == 0 and \
+                    self.db.patients.estimated_document_count() > 0:
+                print("📊 Daily stats rollup is empty, rebuilding from patients...")
+                self.rebuild_daily_stats()
+            return True
+        except Exception as e:
+            print(f"❌ Error checking daily stats: {e}")
+            return False
+    
+    def _summarize_daily_stats(self, docs, recent_since=None):
+        """Sum daily_stats rollup documents into dashboard counters"""
+        summary = {
+            'total_patients': 0,
+            'recent_patients': 0,
+            'male_patients': 0,
+            'female_patients': 0,
+            'patients_with_tokens': 0,
+            'gender_stats': {},
+            'age_groups': {'0-18': 0, '19-35': 0, '36-60': 0, '60+': 0},
+            'slot_stats': {},
+            'hospital_stats': {}
+        }
+        
+        recent_date = recent_since.strftime('%Y-%m-%d') if recent_since else None
+        
+        for doc in docs:
+            total = doc.get('total', 0)
+            summary['total_patients'] += total
+            summary['patients_with_tokens'] += doc.get('with_tokens', 0)
+            summary['hospital_stats'][doc['hospital']] = summary['hospital_stats'].get(doc['hospital'], 0) + total
+            
+            if recent_date and doc['date'] >= recent_date:
+                summary['recent_patients'] += total
+            
+            for gender, count in doc.get('gender', {}).items():
+                summary['gender_stats'][gender] = summary['gender_stats'].get(gender, 0) + count
+            for group, count in doc.get('age_groups', {}).items():
+                summary['age_groups'][group] = summary['age_groups'].get(group, 0) + count
+            for slot, count in doc.get('slots', {}).items():
+                summary['slot_stats'][slot] = summary['slot_stats'].get(slot, 0) + count
+        
+        # Drop hospitals/genders whose counters went back to zero
+        summary['hospital_stats'] = {k: v for k, v in summary['hospital_stats'].items() if v}
+        summary['gender_stats'] = {k: v for k, v in summary['gender_stats'].items() if v}
+        summary['male_patients'] = summary['gender_stats'].get('male', 0)
+        summary['female_patients'] = summary['gender_stats'].get('female', 0)
+        
+        return summary
+    
+    def get_daily_stats_summary(self, hospital_name=None, recent_since=None):
+        """Sum the daily_stats rollup documents into dashboard counters"""
+        try:
+            if not self.is_connected():
+                raise Exception("Database not connected")
+            
+            query = {}
+            if hospital_name:
+                query['hospital'] = hospital_name
+            
+            return self._summarize_daily_stats(self.db.daily_stats.find(query), recent_since)
+            
+        except Exception as e:
+            print(f"❌ Error getting daily stats summary: {e}")
+            return self._summarize_daily_stats([])
+    
     # TOKEN AND SLOT MANAGEMENT
     def get_next_token_for_hospital(self, hospital_name):
         """Get next available token number for a hospital"""
@@ -523,7 +2786,7 @@ class DatabaseManager:
             print(f"❌ Error getting next token: {e}")
             return 1
     
-    def get_patients_in_slot(self, hospital_name, slot_number):
+    def get_patients_in_slot(self, hospital_name, slot_number, projection=None):
         """Get all patients in a specific time slot for a hospital"""
         try:
             if not self.is_connected():
@@ -532,7 +2795,7 @@ class DatabaseManager:
             patients = list(self.db.patients.find({
                 "selected_hospital": hospital_name,
                 "slot_number": slot_number
-            }).sort("token_number", 1))
+            }, resolve_projection(projection)).sort("token_number", 1))
             
             # Convert ObjectIds to strings
             for patient in patients:
@@ -556,6 +2819,8 @@ class DatabaseManager:
             
             result = self.db[collection_name].insert_one(user_data)
             user_data['_id'] = str(result.inserted_id)
+            if user_type == 'doctor':
+                self._bump_cache_version('doctors_by_hospital')
             
             return user_data
             
@@ -595,6 +2860,7 @@ class DatabaseManager:
             result = self.db.patients.insert_many(json_data)
             
             print(f"✅ Migrated {len(result.inserted_ids)} patients from {json_file_path}")
+            self.rebuild_daily_stats()
             return True
             
         except Exception as e:
@@ -603,98 +2869,351 @@ class DatabaseManager:
     
     def close_connection(self):
         """Close MongoDB connection"""
+        if self.audit_log:
+            self.audit_log.stop()
+        if self.last_logins:
+            self.last_logins.stop()
+        if self.slow_query_log:
+            self.slow_query_log.stop()
+        if self.monitor:
+            self.monitor.stop()
         if self.client:
             self.client.close()
             print("🔐 MongoDB connection closed")
     
     def clear_all_patients(self):
-        """Clear all patient records"""
+        """Clear all patient records in bounded _id-range chunks; returns the number removed
+        
+        Runs in the caller's thread. Web requests should use
+        start_patient_purge() instead, which does the same in the background.
+        """
         if not self.is_connected():
             return 0
         
         try:
-            result = self.db.patients.count_documents({})
-            self.db.patients.delete_many({})
-            print(f"🧹 Cleared {result} patient records")
-            return result
+            removed = self._purge_patients_chunked(throttle_ms=0)
+            print(f"🧹 Cleared {removed} patient records")
+            return removed
         except Exception as e:
             print(f"❌ Error clearing patients: {e}")
             return 0
     
-    def log_admin_action(self, action_data):
-        """Log admin actions"""
+    def _purge_patients_chunked(self, job_id=None, chunk_size=None, throttle_ms=None):
+        """Delete every patient in ascending _id-range chunks, pausing between chunks
+        
+        With a job_id, progress goes to that maintenance_jobs document after each
+        chunk and a cancel request stops the loop. Each chunk's patients are
+        taken out of the daily_stats rollup as they are deleted, so a cancelled
+        purge leaves it matching the patients that remain.
+        """
+        chunk_size = chunk_size or int(os.getenv('MONGODB_PURGE_CHUNK_SIZE', '5000'))
+        throttle_ms = throttle_ms if throttle_ms is not None else float(os.getenv('MONGODB_PURGE_THROTTLE_MS', '50'))
+        
+        projection = {field: 1 for field in DAILY_STATS_FIELDS}
+        removed = 0
+        last_id = None
+        while True:
+            query = {'_id': {'$gt': last_id}} if last_id is not None else {}
+            targets = list(self.db.patients.find(query, projection).sort('_id', 1).limit(chunk_size))
+            if not targets:
+                break
+            
+            # Each delete is bounded by the chunk's _id range and limited to the
+            # patients read, so the rollup adjustment matches what was removed
+            ids = [patient['_id'] for patient in targets]
+            result = self.db.patients.delete_many({'_id': {'$gte': ids[0], '$lte': ids[-1], '$in': ids}})
+            self._remove_from_daily_stats(targets, result.deleted_count)
+            removed += result.deleted_count
+            last_id = ids[-1]
+            
+            if job_id is not None:
+                job = self.db.maintenance_jobs.find_one_and_update(
+                    {'_id': job_id},
+                    {'$inc': {'deleted': result.deleted_count, 'chunks': 1},
+                     '$set': {'last_id': last_id, 'updated_at': datetime.now()}},
+                    projection={'cancel_requested': 1},
+                    return_document=ReturnDocument.AFTER
+                )
+                if job and job.get('cancel_requested'):
+                    print(f"⏹️ Patient purge cancelled after {removed} records")
+                    return removed
+            
+            if throttle_ms:
+                time.sleep(throttle_ms / 1000.0)
+        
+        return removed
+    
+    def _purge_patients_by_drop(self):
+        """Drop the patients collection and rebuild its INDEX_SPECS indexes; returns the records removed"""
+        removed = self.db.patients.estimated_document_count()
+        self.db.patients.drop()
+        self.db.daily_stats.delete_many({})
+        self.ensure_indexes(collections=['patients'])
+        return removed
+    
+    def start_patient_purge(self, mode='chunked', chunk_size=None, throttle_ms=None, requested_by=None):
+        """Start a background purge of all patients; returns the job id, or None if one is running
+        
+        ``mode`` is 'chunked' (bounded _id-range deletes with throttling) or
+        'drop' (drop the collection and rebuild its indexes from the registry).
+        Progress is kept in a maintenance_jobs document; see get_purge_status().
+        """
+        if not self.is_connected() or mode not in ('chunked', 'drop'):
+            return None
+        
+        if self._purge_thread is not None and self._purge_thread.is_alive():
+            print("⚠️ A patient purge is already running in this worker")
+            return None
+        
+        # The claim below relies on the one_running_job_per_type index
+        self.ensure_indexes(collections=['maintenance_jobs'])
+        
+        # Another worker may be running one too; its heartbeat is updated_at
+        stale_before = datetime.fromtimestamp(time.time() - float(os.getenv('MONGODB_PURGE_STALE_SECONDS', '600')))
+        self.db.maintenance_jobs.update_many(
+            {'type': 'purge_patients', 'state': 'running', 'updated_at': {'$lt': stale_before}},
+            {'$set': {'state': 'failed', 'error': 'abandoned (no progress)', 'finished_at': datetime.now()}}
+        )
+        
+        now = datetime.now()
+        job = {
+            'type': 'purge_patients',
+            'mode': mode,
+            'state': 'running',
+            'total': self.db.patients.estimated_document_count(),
+            'deleted': 0,
+            'chunks': 0,
+            'chunk_size': chunk_size or int(os.getenv('MONGODB_PURGE_CHUNK_SIZE', '5000')),
+            'throttle_ms': throttle_ms if throttle_ms is not None else float(os.getenv('MONGODB_PURGE_THROTTLE_MS', '50')),
+            'requested_by': requested_by,
+            'cancel_requested': False,
+            'created_at': now,
+            'started_at': now,
+            'updated_at': now,
+            'finished_at': None,
+            'error': None
+        }
+        try:
+            job_id = self.db.maintenance_jobs.insert_one(job).inserted_id
+        except DuplicateKeyError:
+            print("⚠️ A patient purge is already running")
+            return None
+        
+        self._purge_thread = threading.Thread(target=self._run_patient_purge, args=(job_id, job),
+                                              name='patient-purge', daemon=True)
+        self._purge_thread.start()
+        print(f"🧹 Patient purge started ({mode}, ~{job['total']} records)")
+        return str(job_id)
+    
+    def _run_patient_purge(self, job_id, job):
+        try:
+            if job['mode'] == 'drop':
+                removed = self._purge_patients_by_drop()
+                self.db.maintenance_jobs.update_one({'_id': job_id}, {'$set': {'deleted': removed}})
+            else:
+                removed = self._purge_patients_chunked(job_id, job['chunk_size'], job['throttle_ms'])
+            
+            finished = self.db.maintenance_jobs.find_one({'_id': job_id}, {'cancel_requested': 1})
+            state = 'cancelled' if finished and finished.get('cancel_requested') and job['mode'] == 'chunked' else 'done'
+            self.db.maintenance_jobs.update_one(
+                {'_id': job_id},
+                {'$set': {'state': state, 'finished_at': datetime.now(), 'updated_at': datetime.now()}}
+            )
+            print(f"✅ Patient purge {state}: {removed} records removed")
+        except Exception as e:
+            print(f"❌ Error purging patients: {e}")
+            try:
+                self.db.maintenance_jobs.update_one(
+                    {'_id': job_id},
+                    {'$set': {'state': 'failed', 'error': str(e), 'finished_at': datetime.now(), 'updated_at': datetime.now()}}
+                )
+            except Exception:
+                pass
+    
+    def cancel_patient_purge(self):
+        """Ask the running patient purge to stop after its current chunk"""
         if not self.is_connected():
             return False
         
         try:
-            action_data['logged_at'] = datetime.now()
-            result = self.db.admin_logs.insert_one(action_data)
-            print(f"📝 Admin action logged: {action_data.get('action', 'Unknown')}")
-            return result.inserted_id
+            result = self.db.maintenance_jobs.update_many(
+                {'type': 'purge_patients', 'state': 'running'},
+                {'$set': {'cancel_requested': True}}
+            )
+            return result.modified_count > 0
         except Exception as e:
-            print(f"❌ Error logging admin action: {e}")
+            print(f"❌ Error cancelling patient purge: {e}")
             return False
     
-    def get_next_token_number(self, hospital_name, date_str):
-        """Get next token number for a specific hospital and date"""
+    def get_purge_status(self):
+        """Latest patient purge job with its progress, or None if there never was one"""
         if not self.is_connected():
-            return 1
+            return None
         
         try:
-            # Find the highest token number for this hospital and date
-            pipeline = [
-                {
-                    "$match": {
-                        "selected_hospital": hospital_name,
-                        "timestamp": {"$regex": f"^{date_str}"}
-                    }
-                },
-                {
-                    "$group": {
-                        "_id": None,
-                        "max_token": {"$max": "$token_number"}
-                    }
+            job = self.db.maintenance_jobs.find_one({'type': 'purge_patients'}, sort=[('created_at', -1)])
+        except Exception as e:
+            print(f"❌ Error getting purge status: {e}")
+            return None
+        if job is None:
+            return None
+        
+        job['_id'] = str(job['_id'])
+        job['last_id'] = str(job['last_id']) if job.get('last_id') else None
+        total = job.get('total') or 0
+        job['percent'] = round(min(job.get('deleted', 0) / total * 100, 100), 1) if total else (100.0 if job['state'] == 'done' else 0.0)
+        elapsed = ((job.get('finished_at') or datetime.now()) - job['started_at']).total_seconds()
+        job['elapsed_seconds'] = round(elapsed, 1)
+        job['rate_per_second'] = round(job.get('deleted', 0) / elapsed, 1) if elapsed > 0 else None
+        return job
+    
+    def log_admin_action(self, action_data):
+        """Queue an admin action for the audit log; returns False if it was not accepted"""
+        if not self.is_connected() or self.audit_log is None:
+            return False
+        
+        action_data['logged_at'] = datetime.now()
+        return self.audit_log.submit(action_data)
+    
+    def _token_seed_pipeline(self, hospital_name, date_str):
+        """Highest token already issued for the hospital on date_str"""
+        # Patients registered before the counter existed still hold their tokens
+        return [
+            {
+                "$match": {
+                    "selected_hospital": hospital_name,
+                    "timestamp": {"$regex": f"^{date_str}"}
                 }
-            ]
+            },
+            {
+                "$group": {
+                    "_id": None,
+                    "max_token": {"$max": "$token_number"}
+                }
+            }
+        ]
+    
+    def _seed_token_counter(self, hospital_name, date_str):
+        """Create the day's token counter, starting after any tokens already issued that day"""
+        result = list(self.db.patients.aggregate(self._token_seed_pipeline(hospital_name, date_str)))
+        issued = result[0]['max_token'] if result and result[0]['max_token'] is not None else 0
+        
+        try:
+            self.db.token_counters.insert_one({
+                'hospital': hospital_name,
+                'date': date_str,
+                'seq': int(issued),
+                'created_at': datetime.now()
+            })
+        except DuplicateKeyError:
+            # Another worker seeded the counter first
+            pass
+    
+    def _increment_token_counter(self, hospital_name, date_str, count=1):
+        """Atomically advance the (hospital, date) token counter and return its new value"""
+        counter = self.db.token_counters.find_one_and_update(
+            {'hospital': hospital_name, 'date': date_str},
+            {'$inc': {'seq': count}, '$set': {'updated_at': datetime.now()}},
+            return_document=ReturnDocument.AFTER
+        )
+        
+        if counter is None:
+            # First token of the day for this hospital
+            self._seed_token_counter(hospital_name, date_str)
+            counter = self.db.token_counters.find_one_and_update(
+                {'hospital': hospital_name, 'date': date_str},
+                {'$inc': {'seq': count}, '$set': {'updated_at': datetime.now()}},
+                return_document=ReturnDocument.AFTER
+            )
+        
+        return counter['seq']
+    
+    def reserve_token_range(self, hospital_name, date_str, count):
+        """Atomically reserve ``count`` consecutive token numbers and return the first one"""
+        if not self.is_connected():
+            return None
+        
+        try:
+            last_token = self._increment_token_counter(hospital_name, date_str, count)
+            first_token = last_token - count + 1
             
-            result = list(self.db.patients.aggregate(pipeline))
-            if result and result[0]['max_token'] is not None:
-                next_token = result[0]['max_token'] + 1
-            else:
-                next_token = 1
+            print(f"🎫 Reserved tokens {first_token}-{last_token} for {hospital_name} on {date_str}")
+            return first_token
+            
+        except Exception as e:
+            print(f"❌ Error reserving token range: {e}")
+            return None
+    
+    def get_next_token_number(self, hospital_name, date_str):
+        """Get next token number for a specific hospital and date, or None if none could be reserved"""
+        if not self.is_connected():
+            return None
+        
+        try:
+            # Single atomic find-and-increment on the token_counters collection
+            next_token = self._increment_token_counter(hospital_name, date_str)
             
             print(f"🎫 Next token for {hospital_name} on {date_str}: {next_token}")
             return next_token
             
         except Exception as e:
             print(f"❌ Error getting next token number: {e}")
-            return 1
+            return None
 
-# Global database instance
+# Global database instance, one per process
 db_manager = None
+_db_pid = None
+_db_lock = threading.Lock()
 
 def get_db():
-    """Get global database manager instance"""
-    global db_manager
-    if db_manager is None:
-        db_manager = DatabaseManager()
+    """Get the database manager for this process, connecting on first use"""
+    global db_manager, _db_pid
+    if db_manager is None or _db_pid != os.getpid():
+        with _db_lock:
+            if db_manager is None or _db_pid != os.getpid():
+                # A manager inherited across fork shares the parent's sockets and threads
+                db_manager = DatabaseManager(build_indexes=True)
+                _db_pid = os.getpid()
     return db_manager
 
+def close_db():
+    """Close this process's database manager if it was ever opened"""
+    global db_manager, _db_pid
+    if db_manager is not None and _db_pid == os.getpid():
+        db_manager.close_connection()
+        db_manager = None
+        _db_pid = None
+
+def reset_db_after_fork():
+    """Drop a manager inherited from the parent process
+    
+    PyMongo clients are not fork-safe: the child must not reuse the parent's
+    sockets or monitor threads, and must not close them either. The next
+    get_db() call in the child builds a fresh client.
+    """
+    global db_manager, _db_pid, _db_lock
+    db_manager = None
+    _db_pid = None
+    # The lock may have been held by another thread at fork time
+    _db_lock = threading.Lock()
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=reset_db_after_fork)
+
 def init_db(app=None):
-    """Initialize database with Flask app"""
-    global db_manager
-    db_manager = DatabaseManager()
+    """Register database lifecycle hooks with the Flask app
     
+    No connection is made here; get_db() connects on first use, so this is
+    safe to call before a pre-forking server forks its workers.
+    """
     # Don't close connection after each request for MongoDB
     # MongoDB connections are designed to be persistent
     if app:
         @app.teardown_appcontext
-        def close_db(error):
+        def close_db_context(error):
             # Only close on application shutdown, not after each request
             pass
         
         # Properly close connection on app shutdown
         import atexit
-        atexit.register(lambda: db_manager.close_connection() if db_manager else None)
-    
-    return db_manager
+        atexit.register(close_db)
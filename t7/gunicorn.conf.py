@@ -0,0 +1,44 @@
+"""
+Gunicorn settings for the hospital management app
+
+    gunicorn -c gunicorn.conf.py wsgi:app
+
+Every value can be overridden through the environment. Requests spend most
+of their time waiting on MongoDB, so the default is a few processes with
+several threads each (gthread) rather than many single-threaded workers.
+Keep MONGODB_MAX_POOL_SIZE at or above GUNICORN_THREADS so threads do not
+queue for a connection.
+"""
+
+import multiprocessing
+import os
+
+bind = os.getenv('GUNICORN_BIND', f"0.0.0.0:{os.getenv('PORT', '5000')}")
+workers = int(os.getenv('WEB_CONCURRENCY', str(min(multiprocessing.cpu_count() * 2 + 1, 8))))
+worker_class = os.getenv('GUNICORN_WORKER_CLASS', 'gthread')
+threads = int(os.getenv('GUNICORN_THREADS', '8'))
+
+# Import the app once in the master; workers fork from it. Safe because
+# importing app does no MongoDB I/O and clients are rebuilt after fork.
+preload_app = os.getenv('GUNICORN_PRELOAD', 'true').lower() == 'true'
+
+timeout = int(os.getenv('GUNICORN_TIMEOUT', '30'))
+graceful_timeout = int(os.getenv('GUNICORN_GRACEFUL_TIMEOUT', '30'))
+keepalive = int(os.getenv('GUNICORN_KEEPALIVE', '5'))
+
+# Recycle workers now and then; jitter keeps them from restarting together
+max_requests = int(os.getenv('GUNICORN_MAX_REQUESTS', '2000'))
+max_requests_jitter = int(os.getenv('GUNICORN_MAX_REQUESTS_JITTER', '200'))
+
+accesslog = os.getenv('GUNICORN_ACCESS_LOG', None)
+errorlog = os.getenv('GUNICORN_ERROR_LOG', '-')
+
+def post_fork(server, worker):
+    """Make sure the worker never uses a MongoClient inherited from the master"""
+    from database import reset_db_after_fork
+    reset_db_after_fork()
+
+def worker_exit(server, worker):
+    """Close the worker's MongoClient and flush its buffered writes"""
+    from database import close_db
+    close_db()
@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+"""
+Token Assignment Load Test
+Fires concurrent /patient/form submissions from several processes against a
+running server and checks that no (hospital, date, token) triple is issued twice.
+
+Usage:
+    python load_test_tokens.py --url http://localhost:5000 --processes 4 --threads 8 --requests 2000
+"""
+
+import argparse
+import http.cookiejar
+import multiprocessing
+import os
+import threading
+import time
+import urllib.parse
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+from dotenv import load_dotenv
+from pymongo import MongoClient
+
+load_dotenv()
+
+def make_opener(base_url, hospital):
+    """Create a cookie-aware opener with a patient session for the hospital"""
+    opener = urllib.request.build_opener(urllib.request.HTTPCookieProcessor(http.cookiejar.CookieJar()))
+    body = urllib.parse.urlencode({'hospital': hospital}).encode()
+    opener.open(f"{base_url}/patient/hospital-selection", data=body).read()
+    return opener
+
+def submit_form(opener, base_url, worker_id, index):
+    """Submit one patient form and return its latency in seconds (None on failure)"""
+    body = urllib.parse.urlencode({
+        'firstName': f"Load{worker_id}",
+        'lastName': f"Test{index}",
+        'dateOfBirth': '1990-01-01',
+        'gender': 'other',
+        'countryCode': '+91',
+        'phone': '9000000000',
+        'symptoms': 'load test'
+    }).encode()
+
+    started = time.perf_counter()
+    try:
+        response = opener.open(f"{base_url}/patient/form", data=body)
+        response.read()
+        if response.status != 200:
+            return None
+    except Exception as e:
+        print(f"❌ Worker {worker_id} request {index} failed: {e}")
+        return None
+    return time.perf_counter() - started
+
+def run_worker(worker_id, base_url, hospital, requests_count, threads, results):
+    """Worker process: submit requests_count forms using a thread pool"""
+    local = threading.local()
+
+    def task(index):
+        # One session (cookie jar) per thread
+        if not hasattr(local, 'opener'):
+            local.opener = make_opener(base_url, hospital)
+        return submit_form(local.opener, base_url, worker_id, index)
+
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        latencies = list(executor.map(task, range(requests_count)))
+
+    results.put(latencies)
+
+def percentile(values, pct):
+    """Nearest-rank percentile of a sorted list"""
+    if not values:
+        return 0.0
+    rank = max(int(round(pct / 100.0 * len(values))) - 1, 0)
+    return values[min(rank, len(values) - 1)]
+
+def find_duplicate_tokens(db, hospital):
+    """Return (selected_hospital, date, token_number) triples issued more than once"""
+    pipeline = [
+        {"$match": {"selected_hospital": hospital, "token_number": {"$exists": True}}},
+        {
+            "$group": {
+                "_id": {
+                    "selected_hospital": "$selected_hospital",
+                    "date": {"$ifNull": ["$token_date", {"$substrBytes": ["$timestamp", 0, 10]}]},
+                    "token_number": "$token_number"
+                },
+                "count": {"$sum": 1}
+            }
+        },
+        {"$match": {"count": {"$gt": 1}}}
+    ]
+    return list(db.patients.aggregate(pipeline))
+
+def main():
+    parser = argparse.ArgumentParser(description='Concurrent token assignment load test')
+    parser.add_argument('--url', default='http://localhost:5000', help='Base URL of the running app')
+    parser.add_argument('--processes', type=int, default=4, help='Number of client processes')
+    parser.add_argument('--threads', type=int, default=8, help='Concurrent threads per process')
+    parser.add_argument('--requests', type=int, default=2000, help='Total form submissions')
+    parser.add_argument('--hospital', default='Load Test Hospital', help='Hospital name used for the test')
+    parser.add_argument('--keep', action='store_true', help='Keep test patients and counters afterwards')
+    args = parser.parse_args()
+
+    client = MongoClient(os.getenv('MONGODB_URI', 'mongodb://localhost:27017/'))
+    db = client[os.getenv('DATABASE_NAME', 'hospital_management')]
+
+    # Start from a clean slate for the test hospital
+    db.patients.delete_many({'selected_hospital': args.hospital})
+    db.token_counters.delete_many({'hospital': args.hospital})
+
+    per_process = [args.requests // args.processes] * args.processes
+    for i in range(args.requests % args.processes):
+        per_process[i] += 1
+
+    print(f"🚀 Sending {args.requests} submissions to {args.url} "
+          f"({args.processes} processes x {args.threads} threads) for '{args.hospital}'")
+
+    results = multiprocessing.Queue()
+    workers = [
+        multiprocessing.Process(target=run_worker,
+                                args=(i, args.url, args.hospital, count, args.threads, results))
+        for i, count in enumerate(per_process)
+    ]
+
+    started = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    latencies = []
+    for _ in workers:
+        latencies.extend(results.get())
+    for worker in workers:
+        worker.join()
+    elapsed = time.perf_counter() - started
+
+    succeeded = sorted(l for l in latencies if l is not None)
+    failed = len(latencies) - len(succeeded)
+
+    print("\n=== Results ===")
+    print(f"Requests:    {len(latencies)} ({failed} failed)")
+    print(f"Elapsed:     {elapsed:.2f}s")
+    print(f"Throughput:  {len(succeeded) / elapsed:.1f} req/s")
+    print(f"Latency p50: {percentile(succeeded, 50) * 1000:.1f} ms")
+    print(f"Latency p99: {percentile(succeeded, 99) * 1000:.1f} ms")
+
+    stored = db.patients.count_documents({'selected_hospital': args.hospital})
+    duplicates = find_duplicate_tokens(db, args.hospital)
+    print(f"Stored:      {stored} patients")
+    if stored < len(succeeded):
+        print(f"⚠️ {len(succeeded) - stored} submissions were not stored (rejected by the unique token index?)")
+
+    if duplicates:
+        print(f"❌ {len(duplicates)} duplicate token triples:")
+        for dup in duplicates[:20]:
+            key = dup['_id']
+            print(f"   - {key['selected_hospital']} {key['date']} token {key['token_number']} x{dup['count']}")
+    else:
+        print("✅ No duplicate (selected_hospital, date, token_number) triples")
+
+    if not args.keep:
+        db.patients.delete_many({'selected_hospital': args.hospital})
+        db.token_counters.delete_many({'hospital': args.hospital})
+
+    client.close()
+    return 1 if duplicates else 0
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Worker Cold-Start Measurement
+Starts fresh interpreters and times what a new worker pays before it can
+serve: importing app, create_app(), the first plain request and the first
+MongoDB-backed request (which opens the lazy connection). Also profiles
+module import time with ``python -X importtime``.
+
+Usage:
+    python measure_cold_start.py --runs 5 --top 15
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+# Runs inside a fresh interpreter; prints one JSON line of phase timings (ms)
+COLD_START_SNIPPET = '''
+import json, time
+started = time.perf_counter()
+import app
+imported = time.perf_counter()
+application = app.create_app()
+created = time.perf_counter()
+client = application.test_client()
+client.get('/')
+first_request = time.perf_counter()
+client.get('/patient/hospital-selection')
+first_db_request = time.perf_counter()
+print(json.dumps({
+    'import_ms': (imported - started) * 1000,
+    'create_app_ms': (created - imported) * 1000,
+    'first_request_ms': (first_request - created) * 1000,
+    'first_db_request_ms': (first_db_request - first_request) * 1000,
+    'total_ms': (first_db_request - started) * 1000
+}))
+'''
+
+PHASES = ('import_ms', 'create_app_ms', 'first_request_ms', 'first_db_request_ms', 'total_ms')
+
+def measure_cold_start(runs):
+    """Run the snippet in ``runs`` fresh interpreters and collect the timings"""
+    samples = []
+    for _ in range(runs):
+        result = subprocess.run([sys.executable, '-c', COLD_START_SNIPPET], cwd=HERE,
+                                capture_output=True, text=True)
+        lines = [line for line in result.stdout.splitlines() if line.startswith('{')]
+        if result.returncode != 0 or not lines:
+            print(f"❌ Cold start run failed:\n{result.stderr[-2000:]}")
+            continue
+        samples.append(json.loads(lines[-1]))
+    return samples
+
+def profile_imports(top):
+    """Return (total_us, [(cumulative_us, self_us, module)]) from python -X importtime"""
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', 'import app'], cwd=HERE,
+                            capture_output=True, text=True)
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, module = line[len('import time:'):].split('|')
+        rows.append((int(cumulative_us), int(self_us), module.rstrip()))
+    
+    total = next((row[0] for row in rows if row[2].strip() == 'app'), 0)
+    rows.sort(reverse=True)
+    return total, rows[:top]
+
+def main():
+    parser = argparse.ArgumentParser(description='Measure worker cold-start time and import cost')
+    parser.add_argument('--runs', type=int, default=5, help='Fresh interpreters to time')
+    parser.add_argument('--top', type=int, default=15, help='Slowest imports to list')
+    args = parser.parse_args()
+    
+    print(f"=== Cold start over {args.runs} fresh interpreters ===")
+    samples = measure_cold_start(args.runs)
+    if samples:
+        for phase in PHASES:
+            values = [sample[phase] for sample in samples]
+            print(f"{phase:<22} median {statistics.median(values):8.1f} ms   max {max(values):8.1f} ms")
+    
+    print("\n=== Import profile (python -X importtime -c 'import app') ===")
+    total, rows = profile_imports(args.top)
+    print(f"import app: {total / 1000:.1f} ms cumulative")
+    for cumulative_us, self_us, module in rows:
+        print(f"{cumulative_us / 1000:8.1f} ms cumulative {self_us / 1000:8.1f} ms self  {module}")
+    
+    return 0 if samples else 1
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,19 @@
+from database import get_db
+
+# Backfill native created_at datetimes from the legacy timestamp strings
+db = get_db()
+if db.is_connected():
+    print('Migrating patient timestamps...')
+    
+    migrated = db.migrate_patient_timestamps()
+    
+    print('\nVerifying migration:')
+    remaining = db.db.patients.count_documents({'created_at': {'$not': {'$type': 'date'}}})
+    print(f'Patients migrated: {migrated}')
+    print(f'Patients still without a datetime created_at: {remaining}')
+    
+    indexes = db.db.patients.index_information()
+    print(f'(selected_hospital, created_at) index present: {"selected_hospital_1_created_at_1" in indexes}')
+
+else:
+    print('MongoDB not connected')
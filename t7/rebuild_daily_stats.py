@@ -0,0 +1,20 @@
+from database import DatabaseManager
+
+# Recompute the daily_stats rollup from the patients collection
+db = DatabaseManager()
+if db.is_connected():
+    print('Rebuilding daily statistics rollup...')
+    
+    rollups = db.rebuild_daily_stats()
+    
+    print('\nVerifying rollup:')
+    summary = db.get_daily_stats_summary()
+    patients = db.db.patients.count_documents({})
+    print(f'Rollup documents: {rollups}')
+    print(f'Patients in rollup: {summary["total_patients"]} (patients collection: {patients})')
+    for hospital, count in sorted(summary['hospital_stats'].items()):
+        print(f'Hospital: {hospital} - Patients: {count}')
+    
+    db.close_connection()
+else:
+    print('MongoDB not connected')
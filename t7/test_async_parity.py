@@ -0,0 +1,349 @@
+"""
+Parity test for DatabaseManager and AsyncDatabaseManager
+Runs the same operations through both managers against the same local mongod
+(each in its own scratch database) and checks they return the same results.
+
+Usage:
+    python test_async_parity.py
+"""
+
+import asyncio
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+
+import pytest
+
+sys.path.append('.')
+from database import DatabaseManager
+from async_database import AsyncDatabaseManager
+
+MONGODB_URI = os.getenv('MONGODB_URI', 'mongodb://localhost:27017/')
+# Fail fast when no mongod is running instead of waiting out the default 30s
+SERVER_SELECTION_TIMEOUT_MS = int(os.getenv('MONGODB_TEST_TIMEOUT_MS', '3000'))
+SYNC_DB = 'hospital_management_parity_sync'
+ASYNC_DB = 'hospital_management_parity_async'
+
+# Values that legitimately differ between two runs
+VOLATILE_FIELDS = {'_id', 'created_at', 'updated_at', 'deleted_at',
+                   'timestamp', 'token_date', 'patient_id', 'next_cursor', 'prev_cursor'}
+
+# Write-behind stamps: the time differs, but whether it was written must not
+PRESENCE_FIELDS = {'last_login', 'logged_at'}
+
+TODAY = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+
+def normalize(value):
+    """Strip volatile fields so results from the two databases compare equal"""
+    if isinstance(value, dict):
+        return {k: (v is not None) if k in PRESENCE_FIELDS else normalize(v)
+                for k, v in value.items() if k not in VOLATILE_FIELDS}
+    if isinstance(value, list):
+        return [normalize(v) for v in value]
+    if hasattr(value, 'binary'):
+        # ObjectId: only its presence matters
+        return 'ObjectId'
+    return value
+
+def sample_patients():
+    """Fixed patient documents with deterministic created_at values"""
+    return [
+        {
+            'firstName': f"Parity{i}",
+            'lastName': 'Patient',
+            'age': 10 + i * 7,
+            'gender': 'male' if i % 2 else 'female',
+            'selected_hospital': 'Parity General' if i % 3 else 'Parity Clinic',
+            'symptoms': 'fever and persistent cough' if i % 2 else 'headache',
+            'token_number': i + 1,
+            'slot_number': i // 4 + 1,
+            'created_at': TODAY - timedelta(days=i % 5, minutes=i),
+            'timestamp': (TODAY - timedelta(days=i % 5, minutes=i)).strftime("%Y-%m-%d %H:%M:%S")
+        }
+        for i in range(12)
+    ]
+
+def wait_for_admin_log(database, timeout=5):
+    """The parity_check audit entry once the write-behind writer has stored it, or None"""
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        entry = database.admin_logs.find_one({'action': 'parity_check'})
+        if entry:
+            return entry
+        time.sleep(0.1)
+    return None
+
+async def wait_for_admin_log_async(database, timeout=5):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        entry = await database.admin_logs.find_one({'action': 'parity_check'})
+        if entry:
+            return entry
+        await asyncio.sleep(0.1)
+    return None
+
+def run_scenario_sync(db):
+    """Exercise every DatabaseManager method and collect the results"""
+    results = {}
+    
+    # Users
+    results['create_user'] = db.create_user('parity_doc', 'pw', 'doctor', {'name': 'Dr Parity'})
+    results['authenticate_user'] = db.authenticate_user('parity_doc', 'pw', 'doctor')
+    results['authenticate_bad'] = db.authenticate_user('parity_doc', 'wrong', 'doctor')
+    results['last_login_recorded'] = db.get_last_login_status()['recorded']
+    db.last_logins.flush()
+    results['last_login_flushed'] = db.db.doctors.find_one({'username': 'parity_doc'}, {'last_login': 1})
+    results['update_user'] = db.update_user('parity_doc', 'doctor', {'specialty': 'cardiology', 'assigned_hospital': 'Parity General'})
+    results['get_doctors_by_hospital'] = db.get_doctors_by_hospital()
+    results['save_user'] = db.save_user({'username': 'parity_admin', 'status': 'active'}, 'admin')
+    results['get_all_users'] = sorted(u['username'] for u in db.get_all_users())
+    results['delete_user'] = db.delete_user('parity_doc', 'doctor')
+    results['get_all_doctors'] = db.get_all_users('doctor')
+    
+    # Hospitals
+    results['create_hospital'] = db.create_hospital({'hospital_id': 'h1', 'name': 'Parity General'})
+    results['add_hospital_config'] = db.add_hospital_config({'hospital_id': 'h2', 'name': 'Parity Clinic'})
+    results['update_hospital'] = db.update_hospital('h1', {'beds': 40})
+    results['get_all_hospitals_config'] = sorted(db.get_all_hospitals_config(), key=lambda h: h['hospital_id'])
+    
+    # Config
+    results['save_config'] = db.save_config('slot_size', 5)
+    results['get_config'] = db.get_config('slot_size')
+    results['get_config_default'] = db.get_config('missing', 'fallback')
+    results['get_all_configs'] = db.get_all_configs()
+    
+    # Patients
+    saved = [db.save_patient(p) for p in sample_patients()]
+    results['save_patient'] = saved
+    results['get_patients'] = db.get_patients()
+    results['get_patients_hospital'] = db.get_patients('Parity Clinic', limit=2, projection='card')
+    pages = []
+    page = db.get_patients_page(limit=5)
+    while True:
+        pages.append(page)
+        if not page['has_next']:
+            break
+        page = db.get_patients_page(after=page['next_cursor'], limit=5)
+    pages.append(db.get_patients_page(before=pages[-1]['prev_cursor'], limit=5))
+    results['get_patients_page'] = pages
+    results['search_patients'] = [db.search_patients('cough', 'Parity General', limit=2, skip=skip, projection='card')
+                                  for skip in (0, 2)]
+    results['search_patients_empty'] = db.search_patients('  ')
+    results['count_patients'] = db.count_patients()
+    results['count_patients_range'] = db.count_patients('Parity General', TODAY - timedelta(days=2), TODAY + timedelta(days=1))
+    results['get_patients_by_date_range'] = db.get_patients_by_date_range(start=TODAY, limit=3)
+    results['get_patient_by_id'] = db.get_patient_by_id(saved[0]['_id'])
+    results['get_patient_by_id_scoped'] = db.get_patient_by_id(saved[0]['_id'], 'Parity Clinic')
+    results['get_patient_by_id_invalid'] = db.get_patient_by_id('not-an-id')
+    results['update_patient'] = db.update_patient(saved[1]['_id'], {'phone': '123'})
+    results['update_patient_stats'] = db.update_patient(saved[2]['_id'], {'gender': 'male', 'age': 70})
+    results['delete_patient_scoped'] = db.delete_patient(saved[3]['_id'], 'Parity General')
+    results['delete_patient'] = db.delete_patient(saved[3]['_id'])
+    results['update_patients'] = db.update_patients({'reviewed': True}, patient_ids=[saved[4]['_id'], saved[5]['_id'], 'bad-id'])
+    results['update_patients_stats'] = db.update_patients({'gender': 'other'}, hospital_name='Parity Clinic', query={'age': {'$gte': 40}})
+    results['update_patients_unscoped'] = db.update_patients({'reviewed': True})
+    results['update_patients_in_range'] = db.update_patients_in_range({'reviewed': True}, 'Parity Clinic', start=TODAY)
+    results['update_patients_in_range_unscoped'] = db.update_patients_in_range({'reviewed': True})
+    results['delete_patients'] = db.delete_patients([saved[7]['_id'], saved[8]['_id']], hospital_name='Parity General')
+    results['delete_patients_in_range'] = db.delete_patients_in_range('Parity General', end=TODAY)
+    results['summary_after_bulk'] = db.get_daily_stats_summary()
+    results['get_patients_in_slot'] = db.get_patients_in_slot('Parity General', 2, projection='token_board')
+    results['migrate_patient_timestamps'] = db.migrate_patient_timestamps()
+    
+    # Stats
+    results['get_hospital_stats'] = db.get_hospital_stats()
+    results['get_patient_management_stats'] = db.get_patient_management_stats(today_start=TODAY)
+    results['get_admin_dashboard_stats'] = db.get_admin_dashboard_stats(TODAY - timedelta(days=1))
+    results['get_hospitals_list'] = db.get_hospitals_list()
+    results['get_daily_stats_summary'] = db.get_daily_stats_summary('Parity General', TODAY)
+    results['rebuild_daily_stats'] = db.rebuild_daily_stats()
+    results['summary_after_rebuild'] = db.get_daily_stats_summary()
+    results['ensure_daily_stats'] = db.ensure_daily_stats()
+    
+    # Tokens
+    date_str = TODAY.strftime('%Y-%m-%d')
+    results['get_next_token_for_hospital'] = db.get_next_token_for_hospital('Parity General')
+    results['get_next_token_number'] = [db.get_next_token_number('Parity General', date_str) for _ in range(3)]
+    results['reserve_token_range'] = db.reserve_token_range('Parity General', date_str, 10)
+    results['save_patients_bulk'] = db.save_patients_bulk(
+        [{'firstName': f"Bulk{i}", 'selected_hospital': 'Parity Clinic', 'gender': 'female'} for i in range(5)],
+        assign_slot=lambda token: {'slot_number': (token - 1) // 3 + 1}
+    )
+    
+    # Logs
+    results['log_admin_action'] = bool(db.log_admin_action({'action': 'parity_check', 'user': 'parity_admin'}))
+    results['get_audit_log_status'] = db.get_audit_log_status()['enqueued']
+    results['admin_log_written'] = wait_for_admin_log(db.db)
+    results['clear_all_patients'] = db.clear_all_patients()
+    results['count_after_clear'] = db.count_patients()
+    results['is_connected'] = db.is_connected()
+    
+    return results
+
+async def run_scenario_async(db):
+    """Exercise every AsyncDatabaseManager method in the same order"""
+    results = {}
+    
+    # Users
+    results['create_user'] = await db.create_user('parity_doc', 'pw', 'doctor', {'name': 'Dr Parity'})
+    results['authenticate_user'] = await db.authenticate_user('parity_doc', 'pw', 'doctor')
+    results['authenticate_bad'] = await db.authenticate_user('parity_doc', 'wrong', 'doctor')
+    results['last_login_recorded'] = db.get_last_login_status()['recorded']
+    await db.last_logins.flush()
+    results['last_login_flushed'] = await db.db.doctors.find_one({'username': 'parity_doc'}, {'last_login': 1})
+    results['update_user'] = await db.update_user('parity_doc', 'doctor', {'specialty': 'cardiology', 'assigned_hospital': 'Parity General'})
+    results['get_doctors_by_hospital'] = await db.get_doctors_by_hospital()
+    results['save_user'] = await db.save_user({'username': 'parity_admin', 'status': 'active'}, 'admin')
+    results['get_all_users'] = sorted(u['username'] for u in await db.get_all_users())
+    results['delete_user'] = await db.delete_user('parity_doc', 'doctor')
+    results['get_all_doctors'] = await db.get_all_users('doctor')
+    
+    # Hospitals
+    results['create_hospital'] = await db.create_hospital({'hospital_id': 'h1', 'name': 'Parity General'})
+    results['add_hospital_config'] = await db.add_hospital_config({'hospital_id': 'h2', 'name': 'Parity Clinic'})
+    results['update_hospital'] = await db.update_hospital('h1', {'beds': 40})
+    results['get_all_hospitals_config'] = sorted(await db.get_all_hospitals_config(), key=lambda h: h['hospital_id'])
+    
+    # Config
+    results['save_config'] = await db.save_config('slot_size', 5)
+    results['get_config'] = await db.get_config('slot_size')
+    results['get_config_default'] = await db.get_config('missing', 'fallback')
+    results['get_all_configs'] = await db.get_all_configs()
+    
+    # Patients
+    saved = [await db.save_patient(p) for p in sample_patients()]
+    results['save_patient'] = saved
+    results['get_patients'] = await db.get_patients()
+    results['get_patients_hospital'] = await db.get_patients('Parity Clinic', limit=2, projection='card')
+    pages = []
+    page = await db.get_patients_page(limit=5)
+    while True:
+        pages.append(page)
+        if not page['has_next']:
+            break
+        page = await db.get_patients_page(after=page['next_cursor'], limit=5)
+    pages.append(await db.get_patients_page(before=pages[-1]['prev_cursor'], limit=5))
+    results['get_patients_page'] = pages
+    results['search_patients'] = [await db.search_patients('cough', 'Parity General', limit=2, skip=skip, projection='card')
+                                  for skip in (0, 2)]
+    results['search_patients_empty'] = await db.search_patients('  ')
+    results['count_patients'] = await db.count_patients()
+    results['count_patients_range'] = await db.count_patients('Parity General', TODAY - timedelta(days=2), TODAY + timedelta(days=1))
+    results['get_patients_by_date_range'] = await db.get_patients_by_date_range(start=TODAY, limit=3)
+    results['get_patient_by_id'] = await db.get_patient_by_id(saved[0]['_id'])
+    results['get_patient_by_id_scoped'] = await db.get_patient_by_id(saved[0]['_id'], 'Parity Clinic')
+    results['get_patient_by_id_invalid'] = await db.get_patient_by_id('not-an-id')
+    results['update_patient'] = await db.update_patient(saved[1]['_id'], {'phone': '123'})
+    results['update_patient_stats'] = await db.update_patient(saved[2]['_id'], {'gender': 'male', 'age': 70})
+    results['delete_patient_scoped'] = await db.delete_patient(saved[3]['_id'], 'Parity General')
+    results['delete_patient'] = await db.delete_patient(saved[3]['_id'])
+    results['update_patients'] = await db.update_patients({'reviewed': True}, patient_ids=[saved[4]['_id'], saved[5]['_id'], 'bad-id'])
+    results['update_patients_stats'] = await db.update_patients({'gender': 'other'}, hospital_name='Parity Clinic', query={'age': {'$gte': 40}})
+    results['update_patients_unscoped'] = await db.update_patients({'reviewed': True})
+    results['update_patients_in_range'] = await db.update_patients_in_range({'reviewed': True}, 'Parity Clinic', start=TODAY)
+    results['update_patients_in_range_unscoped'] = await db.update_patients_in_range({'reviewed': True})
+    results['delete_patients'] = await db.delete_patients([saved[7]['_id'], saved[8]['_id']], hospital_name='Parity General')
+    results['delete_patients_in_range'] = await db.delete_patients_in_range('Parity General', end=TODAY)
+    results['summary_after_bulk'] = await db.get_daily_stats_summary()
+    results['get_patients_in_slot'] = await db.get_patients_in_slot('Parity General', 2, projection='token_board')
+    results['migrate_patient_timestamps'] = await db.migrate_patient_timestamps()
+    
+    # Stats
+    results['get_hospital_stats'] = await db.get_hospital_stats()
+    results['get_patient_management_stats'] = await db.get_patient_management_stats(today_start=TODAY)
+    results['get_admin_dashboard_stats'] = await db.get_admin_dashboard_stats(TODAY - timedelta(days=1))
+    results['get_hospitals_list'] = await db.get_hospitals_list()
+    results['get_daily_stats_summary'] = await db.get_daily_stats_summary('Parity General', TODAY)
+    results['rebuild_daily_stats'] = await db.rebuild_daily_stats()
+    results['summary_after_rebuild'] = await db.get_daily_stats_summary()
+    results['ensure_daily_stats'] = await db.ensure_daily_stats()
+    
+    # Tokens
+    date_str = TODAY.strftime('%Y-%m-%d')
+    results['get_next_token_for_hospital'] = await db.get_next_token_for_hospital('Parity General')
+    results['get_next_token_number'] = [await db.get_next_token_number('Parity General', date_str) for _ in range(3)]
+    results['reserve_token_range'] = await db.reserve_token_range('Parity General', date_str, 10)
+    results['save_patients_bulk'] = await db.save_patients_bulk(
+        [{'firstName': f"Bulk{i}", 'selected_hospital': 'Parity Clinic', 'gender': 'female'} for i in range(5)],
+        assign_slot=lambda token: {'slot_number': (token - 1) // 3 + 1}
+    )
+    
+    # Logs
+    results['log_admin_action'] = bool(await db.log_admin_action({'action': 'parity_check', 'user': 'parity_admin'}))
+    results['get_audit_log_status'] = db.get_audit_log_status()['enqueued']
+    results['admin_log_written'] = await wait_for_admin_log_async(db.db)
+    results['clear_all_patients'] = await db.clear_all_patients()
+    results['count_after_clear'] = await db.count_patients()
+    results['is_connected'] = db.is_connected()
+    
+    return results
+
+def public_methods(cls):
+    return {name for name in dir(cls) if not name.startswith('_') and callable(getattr(cls, name))}
+
+def test_async_method_set():
+    """Every public DatabaseManager method is mirrored unless listed as sync-only"""
+    expected = public_methods(DatabaseManager) - AsyncDatabaseManager.SYNC_ONLY_METHODS
+    actual = public_methods(AsyncDatabaseManager) - {'connect'}
+    assert AsyncDatabaseManager.SYNC_ONLY_METHODS <= public_methods(DatabaseManager)
+    assert actual == expected, (f"missing in async: {sorted(expected - actual)}, "
+                                f"not in sync: {sorted(actual - expected)}")
+
+def drop_databases(client):
+    client.drop_database(SYNC_DB)
+    client.drop_database(ASYNC_DB)
+
+def test_async_parity():
+    print("🔍 Testing DatabaseManager / AsyncDatabaseManager parity")
+    print("=" * 50)
+    
+    sync_db = DatabaseManager(MONGODB_URI, SYNC_DB, server_selection_timeout_ms=SERVER_SELECTION_TIMEOUT_MS)
+    if not sync_db.is_connected():
+        sync_db.close_connection()
+        pytest.skip(f"MongoDB not reachable at {MONGODB_URI}")
+    
+    drop_databases(sync_db.client)
+    # Same indexes on both scratch databases
+    sync_db.ensure_indexes()
+    index_db = DatabaseManager(MONGODB_URI, ASYNC_DB)
+    index_db.ensure_indexes()
+    index_db.close_connection()
+    
+    async def run_async():
+        async_db = AsyncDatabaseManager(MONGODB_URI, ASYNC_DB)
+        await async_db.connect()
+        try:
+            return await run_scenario_async(async_db)
+        finally:
+            await async_db.close_connection()
+    
+    try:
+        expected = normalize(run_scenario_sync(sync_db))
+        actual = normalize(asyncio.run(run_async()))
+    finally:
+        drop_databases(sync_db.client)
+        sync_db.close_connection()
+    
+    mismatches = [name for name in expected if expected[name] != actual.get(name)]
+    for name in expected:
+        status = '❌' if name in mismatches else '✅'
+        print(f"   {status} {name}")
+        if name in mismatches:
+            print(f"      sync:  {expected[name]}")
+            print(f"      async: {actual.get(name)}")
+    
+    print()
+    print(f"📊 {len(expected) - len(mismatches)}/{len(expected)} methods match")
+    assert not mismatches, f"Async results differ for: {', '.join(mismatches)}"
+
+if __name__ == "__main__":
+    try:
+        test_async_method_set()
+        test_async_parity()
+    except AssertionError as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+    except pytest.skip.Exception as e:
+        print(f"⏭️ Skipped: {e}")
+        sys.exit(1)
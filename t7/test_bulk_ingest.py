@@ -0,0 +1,64 @@
+"""
+Bulk ingestion test: server-owned patient fields
+Posts records with forged timestamps, tokens and status to /api/patients/bulk
+against a scratch database on the local mongod and checks the server stamps
+those fields itself.
+
+Usage:
+    python -m pytest test_bulk_ingest.py
+"""
+
+import os
+import sys
+from datetime import datetime
+
+import pytest
+
+sys.path.append('.')
+# Must be set before get_db() creates the app's manager
+os.environ['DATABASE_NAME'] = 'hospital_management_bulk_test'
+os.environ.setdefault('MONGODB_SERVER_SELECTION_TIMEOUT_MS', os.getenv('MONGODB_TEST_TIMEOUT_MS', '3000'))
+
+from app import app, normalize_bulk_record
+from database import get_db, close_db
+
+HOSPITAL = 'Bulk Test Hospital'
+
+def test_normalize_drops_server_fields():
+    record = normalize_bulk_record({'firstName': 'Z', '_id': 'x', 'timestamp': {'x': 1},
+                                    'created_at': '2019-01-01', 'token_number': 7, 'status': 'discharged'})
+    assert record == {'firstName': 'Z'}
+
+def test_bulk_ingest_ignores_client_timestamp():
+    db = get_db()
+    if not db.is_connected():
+        close_db()
+        pytest.skip('MongoDB not reachable')
+    
+    db.client.drop_database(db.database_name)
+    db.create_user('bulk_admin', 'bulk123', 'admin', {'status': 'active'})
+    try:
+        client = app.test_client()
+        client.post('/admin/login', data={'username': 'bulk_admin', 'password': 'bulk123'})
+        response = client.post('/api/patients/bulk', json=[
+            {'firstName': 'Z', 'selected_hospital': HOSPITAL, 'timestamp': {'x': 1}},
+            {'firstName': 'Y', 'selected_hospital': HOSPITAL, 'timestamp': '2019-01-01 00:00:00',
+             'token_number': 999, 'status': 'discharged'}
+        ])
+        assert response.status_code == 200
+        assert response.get_json()['inserted'] == 2
+        
+        today = datetime.now().strftime('%Y-%m-%d')
+        patients = list(db.db.patients.find({'selected_hospital': HOSPITAL}))
+        assert len(patients) == 2
+        for patient in patients:
+            assert isinstance(patient['timestamp'], str) and patient['timestamp'].startswith(today)
+            assert patient['token_date'] == today
+            assert patient['token_number'] in (1, 2)
+            assert 'status' not in patient
+        
+        # The reports page slices timestamp[:10]; a dict there used to 500
+        assert client.get('/doctor/reports').status_code == 200
+    finally:
+        db.client.drop_database(db.database_name)
+        close_db()
@@ -0,0 +1,12 @@
+"""
+Production WSGI Entry Point
+
+    gunicorn -c gunicorn.conf.py wsgi:app
+
+Importing this module does no MongoDB I/O; each worker opens its own
+client on its first request (see database.get_db).
+"""
+
+from app import create_app
+
+app = application = create_app()